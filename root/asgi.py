@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'root.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from speedtest.utils import issue_feed, latency, measurement  # noqa: E402 (Django sozlangandan keyin)
+
+
+async def application(scope, receive, send):
+    """
+    HTTP - Django ga; latency WebSocket, upload o'lchovi va tarmoq muammolari
+    SSE oqimi - to'g'ridan-to'g'ri ASGI ilovalarga (uzoq ulanishlar Django
+    stekini band qilmaydi, upload tanasi oldindan buferlanmaydi)
+    """
+    if scope['type'] == 'websocket' and scope['path'] == latency.PATH:
+        return await latency.latency_probe_app(scope, receive, send)
+    if scope['type'] == 'http' and scope['path'] == measurement.UPLOAD_PATH:
+        return await measurement.upload_app(scope, receive, send)
+    if scope['type'] == 'http' and scope['path'] == issue_feed.PATH:
+        return await issue_feed.live_feed_app(scope, receive, send)
+    return await django_application(scope, receive, send)
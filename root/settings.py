@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'speedtest.middleware.RequestMetricsMiddleware',  # Eng tashqarida - butun so'rovni o'lchaydi
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,14 +54,13 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django.middleware.cache.UpdateCacheMiddleware',  # YANGI
-    'django.middleware.cache.FetchFromCacheMiddleware',  # YANGI
 ]
 ROOT_URLCONF = 'root.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates + render vaqtini o'lchash (speedtest/utils/instrumentation.py)
+        'BACKEND': 'speedtest.utils.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -164,6 +164,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        # RequestMetricsMiddleware: har bir so'rov uchun JSON qator
+        'speedtest.requests': {
+            'handlers': ['file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -189,6 +195,161 @@ SESSION_COOKIE_HTTPONLY = True
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False  # Browser yopilsa ham session saqlanadi
 
 # Cache settings
-CACHE_MIDDLEWARE_ALIAS = 'default'
-CACHE_MIDDLEWARE_SECONDS = 0  # No cache for logged users
-CACHE_MIDDLEWARE_KEY_PREFIX = ''
\ No newline at end of file
+# 'default' barcha worker lar uchun umumiy bo'lishi shart: o'lchov oqimlari
+# (download/upload/latency va /test/run/ turli jarayonlarga tushadi) va
+# provayderlar katalogi versiyasi. LocMemCache har jarayonda alohida -
+# bir nechta worker da ishlamaydi.
+# Production da REDIS_URL tavsiya etiladi. Berilmasa PostgreSQL dagi jadval
+# (migratsiya yaratadi) - to'g'ri ishlaydi, lekin har bir cache o'qishi DB so'rovi.
+# 'local' - jarayon ichidagi tez qatlam: umumiy bo'lishi shart bo'lmagan
+# narsalar (bosh sahifa qobig'i) uchun
+SHARED_CACHE_IS_DB = not os.getenv('REDIS_URL')
+if not SHARED_CACHE_IS_DB:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'speedtest_cache',
+            'OPTIONS': {'MAX_ENTRIES': 100_000},
+        },
+    }
+CACHES['local'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'speedtest-local',
+}
+
+# Butun sahifa keshi (UpdateCache/FetchFromCache middleware) o'rniga: bosh
+# sahifaning anonim "qobig'i" keshlanadi, shaxsiy qism /home/fragment/ dan.
+# 0 - o'chirilgan (har so'rovda to'liq render). Qobiq hamma uchun bir xil -
+# har worker o'z nusxasini jarayon ichida saqlaydi
+HOME_SHELL_CACHE_SECONDS = 300
+HOME_SHELL_CACHE_ALIAS = 'local'
+
+# Geolocation cache settings
+# Redis bo'lmasa umumiy qatlam o'tkazib yuboriladi: DatabaseCache ResolvedIP
+# oldida ikkinchi jadval bo'lib qolardi
+GEO_CACHE_ALIAS = None if SHARED_CACHE_IS_DB else 'default'
+GEO_CACHE_TTL = 60 * 60 * 24  # 1 kun
+GEO_NEGATIVE_TTL = 300  # API lar ishlamasa, 5 daqiqa qayta so'ramaslik
+GEO_LRU_MAXSIZE = 4096
+
+# Offline IP diapazon bazasi (manage.py build_ip_index bilan quriladi)
+GEO_OFFLINE_DB = BASE_DIR / 'data' / 'ip_ranges.idx'
+GEO_REMOTE_FALLBACK = True  # Offline bazada topilmasa tashqi API lar
+
+# Geolokatsiya API lariga hedged (parallel) so'rovlar
+GEO_HEDGED_REQUESTS = True
+GEO_HEDGE_DELAY = 0.3  # Keyingi API ga o'tishdan oldin kutish (soniya)
+GEO_HEDGE_WORKERS = 16
+GEO_BREAKER_THRESHOLD = 3  # Ketma-ket xatolar soni
+GEO_BREAKER_RESET = 30  # Breaker ochiq turadigan vaqt (soniya)
+
+# Tashqi HTTP klient (geolokatsiya API lari)
+GEO_HTTP_TIMEOUT = 5
+GEO_HTTP_POOL_CONNECTIONS = 10  # Nechta host uchun pool saqlanadi
+GEO_HTTP_POOL_MAXSIZE = 10  # Har bir host uchun ulanishlar (POOL_BLOCK=True da qat'iy chegara)
+GEO_HTTP_POOL_BLOCK = True  # False - yumshoq chegara: pool to'lsa vaqtinchalik ulanish ochiladi
+GEO_HTTP_POOL_TIMEOUT = 2  # Pool to'lganda bo'sh ulanishni kutish (soniya)
+GEO_HTTP_RETRIES = 2
+GEO_HTTP_BACKOFF = 0.2  # Qayta urinishlar orasidagi backoff koeffitsienti
+
+# Tezlik o'lchovi
+SPEEDTEST_DOWNLOAD_SIZE = 25 * 1024 * 1024  # Klient yuklab oladigan hajm
+SPEEDTEST_UPLOAD_SIZE = 10 * 1024 * 1024  # Klient yuboradigan hajm
+SPEEDTEST_MAX_TRANSFER = 256 * 1024 * 1024  # Bitta oqim uchun maksimal hajm
+SPEEDTEST_MEASUREMENT_TTL = 600  # O'lchov natijalari cache da saqlanadigan vaqt
+SPEEDTEST_MAX_STREAMS = 8  # Multi rejimda parallel oqimlar chegarasi
+SPEEDTEST_DEFAULT_STREAMS = 4
+SPEEDTEST_WARMUP_SECONDS = 0.5  # Har bir oqim boshidagi TCP slow start davri hisobga olinmaydi
+
+# WebSocket latency probe (root/asgi.py orqali /ws/latency/)
+LATENCY_PROBE_COUNT = 20
+LATENCY_PROBE_INTERVAL = 0.05  # Probe lar orasidagi interval (soniya)
+LATENCY_PROBE_TIMEOUT = 2.0  # Oxirgi probe dan keyin javob kutish vaqti
+
+# Natijalarni navbat orqali partiyalab yozish
+INGEST_ASYNC = True  # False bo'lsa natija so'rov ichida yoziladi
+INGEST_QUEUE_SIZE = 10000
+INGEST_BATCH_SIZE = 500
+INGEST_FLUSH_INTERVAL = 0.2  # Partiya yig'ish uchun maksimal kutish (soniya)
+INGEST_PENDING_MAX_WAIT = 15  # Kutish sahifasi shuncha soniyadan keyin so'rashni to'xtatadi
+
+# Provayder indeksi (jarayon ichidagi xarita, boshqa jarayonlar uchun TTL)
+PROVIDER_INDEX_TTL = 300
+# Provayderlar katalogi (view, forma, admin filtri) - signal umumiy cache dagi versiyani
+# yangilaydi; TTL - jarayon ichidagi nusxa uchun zaxira (umumiy bo'lmagan cache da eskirish chegarasi)
+PROVIDER_CATALOGUE_TTL = 300
+# Umumiy cache dagi versiya jarayon ichida shuncha soniyada bir marta tekshiriladi -
+# boshqa worker dagi o'zgarish ko'pi bilan shuncha kechikadi (0 - har so'rovda)
+PROVIDER_CATALOGUE_VERSION_CHECK = 5
+
+# Statistika: tezlik taqsimoti oraliqlari (Mbps, kamayish tartibida) va persentillar
+SPEEDTEST_SPEED_BUCKETS = (
+    (100, "A'lo"),
+    (50, "Yaxshi"),
+    (25, "O'rtacha"),
+    (0, "Past"),
+)
+SPEEDTEST_PERCENTILES = (50, 90, 99)
+
+# Tarix sahifasi: 'cursor' (keyset, COUNT(*) siz) yoki 'offset' (klassik ?page=)
+HISTORY_PAGINATION = 'cursor'
+HISTORY_APPROX_TOTAL = True  # Jami son yig'ma jadvaldan (UserDailyStats) olinadi
+
+# Eksport: server tomonidagi kursordan bir martada o'qiladigan qatorlar
+EXPORT_CHUNK_SIZE = 2000
+
+# Retention: shundan eski natijalar archive_results buyrug'i bilan arxivga ko'chiriladi
+RESULTS_RETENTION_DAYS = 365
+RESULTS_ARCHIVE_BATCH_SIZE = 5000
+
+# So'rov o'lchovlari (RequestMetricsMiddleware, /metrics/requests/)
+REQUEST_METRICS_LOG = True
+REQUEST_METRICS_QUERY_WARN = 50  # Bundan ko'p DB so'rov - WARNING (N+1 shubhasi)
+REQUEST_METRICS_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+REQUEST_METRICS_QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+# /metrics/* ga kirish: staff foydalanuvchi, "Authorization: Bearer <token>" yoki ro'yxatdagi IP
+# (REMOTE_ADDR - X-Forwarded-For soxtalashtirilishi mumkin)
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = tuple(filter(None, os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')))
+
+# Admin: katta jadvallar uchun ro'yxat (taxminiy count, yil/oy filtri date_hierarchy o'rniga)
+ADMIN_FAST_CHANGELIST = True
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 100_000  # Bahodan kichik bo'lsa aniq COUNT(*)
+
+# Provayderlar reytingi (manage.py refresh_leaderboard - cron bilan)
+LEADERBOARD_WINDOWS = (('24h', 24), ('7d', 24 * 7), ('30d', 24 * 30))  # (nom, soatlar)
+LEADERBOARD_MIN_TESTS = 5  # Kamroq testli provayder reytingga kirmaydi
+LEADERBOARD_USE_SKETCHES = True  # Kunlik eskizlardan (O(kunlar)); False - xom natijalardan aniq
+LEADERBOARD_EXACT_MAX_HOURS = 48  # Bundan qisqa oynalar (24h) eskizsiz - aniq, siljuvchi (kun boshida bo'sh qolmaydi)
+
+# Provayder/kun kvantil eskizlari (DDSketch) - nisbiy xato; o'zgartirilsa manage.py rebuild_sketches
+SPEEDTEST_SKETCH_ACCURACY = 0.01
+SPEEDTEST_SKETCH_SHARDS = 16  # Kunga worker jarayonlar bo'yicha qatorlar (o'qishda birlashtiriladi)
+
+# Avtomatik degradatsiya aniqlash (manage.py detect_anomalies - cron bilan, har soatda)
+ANOMALY_BASELINE_DAYS = 14  # Har soat oldingi N kunning shu soati bilan solishtiriladi
+ANOMALY_THRESHOLD = 3.5  # Robust z-ball (median/MAD) chegarasi - 'slow'
+ANOMALY_MIN_SAMPLES = 3  # Soatda kamroq test bo'lsa tezlik baholanmaydi
+ANOMALY_OUTAGE_MIN_EXPECTED = 5  # Kutilgan testlar soni shundan ko'p, lekin 0 - 'outage'
+ANOMALY_MIN_HOURS = 2  # Qisqaroq (tugagan) signal hodisa hisoblanmaydi
+ANOMALY_EWMA_ALPHA = 0.1  # --method ewma uchun silliqlash koeffitsienti
+
+# Tarmoq muammolari: shu oraliqda kelgan bir xil xizmat/tur xabarlari bitta hodisaga yig'iladi
+NETWORK_ISSUE_MERGE_MINUTES = 120  # Oxirgi xabardan keyin shuncha jimlik - hodisa yopiladi
+NETWORK_ISSUES_PAGE_SIZE = 20
+NETWORK_ISSUES_TOP_LIMIT = 5  # "Eng ko'p xabar berilganlar" bloki
+NETWORK_ISSUES_TOP_CACHE_SECONDS = 30
+
+# Tarmoq muammolari jonli oqimi (SSE, /network-issues/live/ - faqat ASGI, root/asgi.py)
+NETWORK_ISSUES_LIVE_HEARTBEAT = 20  # soniya; bo'sh ulanishlarga ': ping' (proksi timeout dan kichik)
+NETWORK_ISSUES_LIVE_QUEUE = 64  # Obunachi navbati; to'lsa sekin klient uziladi va qayta ulanadi
+NETWORK_ISSUES_LIVE_SNAPSHOT = 50  # Ulanishda yuboriladigan faol hodisalar
+NETWORK_ISSUES_LIVE_RETRY_MS = 5000  # EventSource qayta ulanish oralig'i
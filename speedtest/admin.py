@@ -1,7 +1,82 @@
 # admin.py
+from datetime import datetime
+
+from django.conf import settings
 from django.contrib import admin
+from django.db.models import F, Max, Min
+from django.utils import timezone
 from django.utils.html import format_html
 from .models import InternetProvider, SpeedTestResult, UserFeedback, NetworkIssue
+from .utils import issues
+from .utils.distribution import rating_case
+from .utils.pagination import EstimatedCountPaginator
+from .utils.providers import provider_catalogue
+
+# Katta jadvallar uchun: taxminiy count, indeksli sana filtri
+FAST_CHANGELIST = getattr(settings, 'ADMIN_FAST_CHANGELIST', True)
+
+
+class ProviderListFilter(admin.SimpleListFilter):
+    """Provayder filtri - ro'yxat keshlangan katalogdan (DB so'rovisiz)"""
+    title = 'Provayder'
+    parameter_name = 'provider'
+
+    def lookups(self, request, model_admin):
+        return [(provider.pk, provider.name) for provider in provider_catalogue.all()]
+
+    def queryset(self, request, queryset):
+        if self.value() and self.value().isdigit():
+            return queryset.filter(provider_id=self.value())
+        return queryset
+
+
+class TestDateDrilldownFilter(admin.SimpleListFilter):
+    """
+    date_hierarchy o'rniga yil -> oy filtri. Yillar MIN/MAX(test_date) dan
+    (indeks bo'yicha ikki qiymat), filtr esa test_date oralig'i - butun
+    jadval bo'yicha DISTINCT date_trunc bajarilmaydi
+    """
+    title = 'Test davri'
+    parameter_name = 'period'
+
+    def _parse(self):
+        """'2025' -> (2025, None), '2025-03' -> (2025, 3), noto'g'ri -> (None, None)"""
+        try:
+            if len(self.value() or '') == 4:
+                return int(self.value()), None
+            year, month = map(int, self.value().split('-'))
+        except (AttributeError, ValueError):
+            return None, None
+        return (year, month) if 1 <= month <= 12 else (None, None)
+
+    def lookups(self, request, model_admin):
+        bounds = model_admin.model.objects.aggregate(first=Min('test_date'), last=Max('test_date'))
+        if bounds['first'] is None:
+            return []
+        first = timezone.localtime(bounds['first']).year
+        last = timezone.localtime(bounds['last']).year
+        options = [(str(year), str(year)) for year in range(last, first - 1, -1)]
+
+        # Tanlangan yil ostida uning oylari
+        year, _ = self._parse()
+        if year is not None and first <= year <= last:
+            index = last - year + 1
+            options[index:index] = [(f'{year}-{month:02d}', f'{year}-{month:02d}') for month in range(12, 0, -1)]
+        return options
+
+    def queryset(self, request, queryset):
+        year, month = self._parse()
+        if year is None or not 1 <= year <= 9998:
+            return queryset
+        if month is None:
+            start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+        else:
+            start = datetime(year, month, 1)
+            end = datetime(year + month // 12, month % 12 + 1, 1)
+        return queryset.filter(
+            test_date__gte=timezone.make_aware(start),
+            test_date__lt=timezone.make_aware(end),
+        )
 
 
 @admin.register(InternetProvider)
@@ -26,13 +101,21 @@ class InternetProviderAdmin(admin.ModelAdmin):
 @admin.register(SpeedTestResult)
 class SpeedTestResultAdmin(admin.ModelAdmin):
     list_display = ['provider', 'download_speed_colored', 'upload_speed_colored',
-                    'ping_colored', 'connection_type', 'speed_rating', 'test_date']
-    list_filter = ['connection_type', 'test_date', 'provider']
+                    'ping_colored', 'connection_type', 'rating', 'test_date']
+    list_filter = ['connection_type', 'test_date', ProviderListFilter]
+    list_select_related = ['provider']
     search_fields = ['provider__name', 'ip_address']
     readonly_fields = ['test_date', 'speed_rating']
     date_hierarchy = 'test_date'
     list_per_page = 25
 
+    if FAST_CHANGELIST:
+        list_filter = [TestDateDrilldownFilter, 'connection_type', 'test_date', ProviderListFilter]
+        date_hierarchy = None
+        paginator = EstimatedCountPaginator
+        # "N ta (jami M)" uchun ikkinchi COUNT(*) bajarilmasin
+        show_full_result_count = False
+
     fieldsets = (
         ('Umumiy Ma\'lumot', {
             'fields': ('user', 'provider', 'connection_type', 'test_date')
@@ -47,6 +130,19 @@ class SpeedTestResultAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Baho Python da emas, SQL da - saralash ham mumkin
+        average = (F('download_speed') + F('upload_speed')) / 2
+        return super().get_queryset(request).annotate(
+            average_speed=average, rating_label=rating_case(average),
+        )
+
+    def rating(self, obj):
+        return obj.rating_label
+
+    rating.short_description = 'Baho'
+    rating.admin_order_field = 'average_speed'
+
     def download_speed_colored(self, obj):
         speed = float(obj.download_speed)
         if speed >= 100:
@@ -55,9 +151,10 @@ class SpeedTestResultAdmin(admin.ModelAdmin):
             color = '#ffc107'
         else:
             color = '#dc3545'
+        # format_html argumentlarni SafeString ga aylantiradi - {:.2f} ishlamaydi
         return format_html(
-            '<strong style="color: {};">{:.2f} Mbps</strong>',
-            color, speed
+            '<strong style="color: {};">{} Mbps</strong>',
+            color, f'{speed:.2f}'
         )
 
     download_speed_colored.short_description = 'Download'
@@ -71,9 +168,10 @@ class SpeedTestResultAdmin(admin.ModelAdmin):
             color = '#ffc107'
         else:
             color = '#dc3545'
+        # format_html argumentlarni SafeString ga aylantiradi - {:.2f} ishlamaydi
         return format_html(
-            '<strong style="color: {};">{:.2f} Mbps</strong>',
-            color, speed
+            '<strong style="color: {};">{} Mbps</strong>',
+            color, f'{speed:.2f}'
         )
 
     upload_speed_colored.short_description = 'Upload'
@@ -98,6 +196,7 @@ class SpeedTestResultAdmin(admin.ModelAdmin):
 @admin.register(UserFeedback)
 class UserFeedbackAdmin(admin.ModelAdmin):
     list_display = ['result', 'rating_stars', 'comment_preview', 'created_at']
+    list_select_related = ['result__provider']  # result.__str__ provayderni o'qiydi
     list_filter = ['rating', 'created_at']
     search_fields = ['comment', 'result__provider__name']
     readonly_fields = ['created_at']
@@ -120,10 +219,10 @@ class UserFeedbackAdmin(admin.ModelAdmin):
 @admin.register(NetworkIssue)
 class NetworkIssueAdmin(admin.ModelAdmin):
     list_display = ['service_name', 'issue_type_badge', 'severity_badge',
-                    'status_badge', 'reported_at']
+                    'status_badge', 'report_count', 'reported_at', 'last_reported_at']
     list_filter = ['issue_type', 'severity', 'is_resolved', 'reported_at']
     search_fields = ['service_name']
-    readonly_fields = ['reported_at']
+    readonly_fields = ['reported_at', 'last_reported_at', 'report_count']
     date_hierarchy = 'reported_at'
 
     actions = ['mark_as_resolved']
@@ -170,6 +269,7 @@ class NetworkIssueAdmin(admin.ModelAdmin):
     def mark_as_resolved(self, request, queryset):
         from django.utils import timezone
         updated = queryset.update(is_resolved=True, resolved_at=timezone.now())
+        issues.resolved(queryset)
         self.message_user(request, f'{updated} ta muammo hal qilindi deb belgilandi.')
 
     mark_as_resolved.short_description = "Tanlangan muammolarni hal qilindi deb belgilash"
\ No newline at end of file
@@ -3,3 +3,12 @@ from django.apps import AppConfig
 
 class AppsConfig(AppConfig):
     name = 'speedtest'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import signals  # noqa: F401
+        from .utils.instrumentation import install_db_wrapper
+
+        # DB so'rovlar soni/vaqti RequestMetricsMiddleware uchun
+        connection_created.connect(install_db_wrapper, dispatch_uid='speedtest_db_metrics')
@@ -1,8 +1,14 @@
 # speedtest/forms.py
 from django import forms
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from .models import SpeedTestResult, UserFeedback, NetworkIssue, InternetProvider
+from .utils.providers import provider_catalogue
+
+
+def provider_choices():
+    return [('', 'Barcha provayderlar')] + provider_catalogue.choices()
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -63,16 +69,40 @@ class UserLoginForm(AuthenticationForm):
 class SpeedTestForm(forms.ModelForm):
     class Meta:
         model = SpeedTestResult
-        fields = ['connection_type']
+        fields = ['connection_type', 'streams']
         widgets = {
             'connection_type': forms.RadioSelect(attrs={
                 'class': 'form-check-input'
+            }),
+            'streams': forms.NumberInput(attrs={
+                'class': 'form-control'
             })
         }
         labels = {
-            'connection_type': 'Ulanish turi'
+            'connection_type': 'Ulanish turi',
+            'streams': 'Parallel oqimlar soni'
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Single rejimda yuborilmaydi
+        self.fields['streams'].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        connection_type = cleaned_data.get('connection_type')
+        streams = cleaned_data.get('streams')
+        max_streams = getattr(settings, 'SPEEDTEST_MAX_STREAMS', 8)
+
+        if connection_type == 'single':
+            cleaned_data['streams'] = 1
+        elif connection_type == 'multi':
+            if streams is None:
+                cleaned_data['streams'] = getattr(settings, 'SPEEDTEST_DEFAULT_STREAMS', 4)
+            elif not 2 <= streams <= max_streams:
+                self.add_error('streams', f'Oqimlar soni 2 dan {max_streams} gacha bo\'lishi kerak!')
+        return cleaned_data
+
 
 class FeedbackForm(forms.ModelForm):
     class Meta:
@@ -119,10 +149,11 @@ class NetworkIssueReportForm(forms.ModelForm):
 
 
 class ProviderFilterForm(forms.Form):
-    provider = forms.ModelChoiceField(
-        queryset=InternetProvider.objects.filter(is_active=True),
+    # Tanlovlar keshlangan katalogdan - har render da DB so'rovi yo'q
+    provider = forms.TypedChoiceField(
+        choices=provider_choices,
+        coerce=int,
         required=False,
-        empty_label="Barcha provayderlar",
         widget=forms.Select(attrs={
             'class': 'form-control'
         }),
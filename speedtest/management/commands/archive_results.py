@@ -0,0 +1,53 @@
+# speedtest/management/commands/archive_results.py
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from speedtest.utils import archive
+
+
+class Command(BaseCommand):
+    help = "Eski natijalarni arxiv jadvaliga yoki siqilgan NDJSON faylga ko'chirish (retention)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None,
+                            help="Shundan eski natijalar (default: settings.RESULTS_RETENTION_DAYS)")
+        parser.add_argument('--batch-size', type=int,
+                            default=getattr(settings, 'RESULTS_ARCHIVE_BATCH_SIZE', 5000),
+                            help="Bitta tranzaksiyada ko'chiriladigan natijalar")
+        parser.add_argument('--to-file', default=None, metavar='PATH',
+                            help="Jadval o'rniga .ndjson.gz faylga yozish (import_results bilan qaytariladi)")
+        parser.add_argument('--limit', type=int, default=0,
+                            help="Bir ishga tushirishda ko'pi bilan shuncha natija (0 - cheklovsiz)")
+
+    def handle(self, *args, **options):
+        days = options['older_than_days']
+        if days is None:
+            days = archive.retention_days()
+        if days < 1:
+            raise CommandError("--older-than-days kamida 1 bo'lishi kerak")
+        if options['batch_size'] <= 0:
+            raise CommandError("--batch-size musbat bo'lishi kerak")
+
+        # Ish davomida o'zgarmasligi uchun bir marta hisoblanadi
+        cutoff = timezone.now() - timedelta(days=days)
+        moved = 0
+        started = time.perf_counter()
+        while not options['limit'] or moved < options['limit']:
+            batch_size = options['batch_size']
+            if options['limit']:
+                batch_size = min(batch_size, options['limit'] - moved)
+            count = archive.archive_batch(cutoff, batch_size, to_file=options['to_file'])
+            if not count:
+                break
+            moved += count
+            self.stdout.write(f"{moved} ta ko'chirildi ({moved / max(time.perf_counter() - started, 1e-6):,.0f} qator/s)")
+
+        target = options['to_file'] or 'arxiv jadvali'
+        self.stdout.write(self.style.SUCCESS(
+            f"{cutoff:%Y-%m-%d} dan eski {moved} ta natija -> {target} "
+            f"({time.perf_counter() - started:.1f} s)"
+        ))
@@ -0,0 +1,198 @@
+# speedtest/management/commands/benchmark.py
+import json
+import platform
+import random
+import sys
+from urllib.parse import quote
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from speedtest.models import SpeedTestResult
+from speedtest.utils import measurement, pagination
+from speedtest.utils.benchmark import PREFIX, Scenario, compare, stub_geo_apis
+from speedtest.utils.geo_service import geo_service
+from speedtest.utils.geo_utils import IPGeolocation
+from speedtest.utils.ingest import ingestor
+from speedtest.views import ResultsHistoryView
+
+
+def expect(status):
+    def check(response):
+        if response.status_code != status:
+            raise CommandError(f"Kutilgan status {status}, keldi {response.status_code}")
+    return check
+
+
+class Command(BaseCommand):
+    help = "View lar va geolokatsiya qatlami bo'yicha benchmark (p50/p99, DB so'rovlar soni) - JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--only', action='append', default=[], metavar='NAME',
+                            help="Faqat shu ssenariy(lar)")
+        parser.add_argument('--user', default=f'{PREFIX}_0',
+                            help="O'lchanadigan foydalanuvchi (seed_benchmark dagi eng og'iri - bench_0)")
+        parser.add_argument('--history-depth', type=int, default=50,
+                            help="history_deep ssenariysi uchun sahifa chuqurligi")
+        parser.add_argument('--geo-delay', type=float, default=0.0,
+                            help="Stub geolokatsiya API javob kechikishi (soniya)")
+        parser.add_argument('--output', default=None, help="JSON fayl (default: stdout)")
+        parser.add_argument('--baseline', default=None, help="Oldingi JSON bilan solishtirish")
+        parser.add_argument('--threshold', type=float, default=1.2,
+                            help="p50 shuncha marta sekinlashsa - regression")
+        parser.add_argument('--min-delta', type=float, default=1.0,
+                            help="p50 farqi shu millisekunddan kichik bo'lsa - shovqin, regression emas")
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, *args, **options):
+        try:
+            self.user = User.objects.get(username=options['user'])
+            self.admin = User.objects.get(username=f'{PREFIX}_admin')
+        except User.DoesNotExist:
+            raise CommandError("Avval: manage.py seed_benchmark")
+        self.options = options
+        self.rng = random.Random(0)
+
+        # Test klienti 'testserver' host va http bilan ishlaydi; so'rov loglari o'chiriladi
+        with override_settings(ALLOWED_HOSTS=['*'], SECURE_SSL_REDIRECT=False, REQUEST_METRICS_LOG=False), \
+                stub_geo_apis(delay=options['geo_delay']):
+            scenarios = self.build_scenarios()
+            unknown = set(options['only']) - {s.name for s in scenarios}
+            if unknown:
+                raise CommandError(f"Noma'lum ssenariy: {', '.join(sorted(unknown))}")
+
+            results = {}
+            for scenario in scenarios:
+                if options['only'] and scenario.name not in options['only']:
+                    continue
+                results[scenario.name] = scenario.measure(options['iterations'], options['warmup'])
+                self.stderr.write(
+                    f"{scenario.name:24} p50={results[scenario.name]['p50_ms']:9.2f} ms "
+                    f"p99={results[scenario.name]['p99_ms']:9.2f} ms "
+                    f"queries={results[scenario.name]['queries_p50']}"
+                )
+            ingestor.flush()
+
+        report = {'meta': self.meta(), 'scenarios': results}
+        output = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            self.report_baseline(report)
+
+    def meta(self):
+        return {
+            'created_at': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'results': SpeedTestResult.objects.count(),
+            'user_results': SpeedTestResult.objects.filter(user=self.user).count(),
+            'iterations': self.options['iterations'],
+            'warmup': self.options['warmup'],
+        }
+
+    def report_baseline(self, report):
+        try:
+            with open(self.options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Baseline ni o'qib bo'lmadi: {e}")
+
+        rows = compare(report, baseline, self.options['threshold'], self.options['min_delta'])
+        for row in rows:
+            flag = 'REGRESSION' if row['regression'] else 'ok'
+            self.stderr.write(
+                f"{row['scenario']:24} p50 x{row['p50_ms_ratio']} p99 x{row['p99_ms_ratio']} "
+                f"queries {row['queries_p50_baseline']} -> {row['queries_p50']}  {flag}"
+            )
+        if self.options['fail_on_regression'] and any(row['regression'] for row in rows):
+            sys.exit(1)
+
+    # ============================================
+    # SSENARIYLAR
+    # ============================================
+    def build_scenarios(self):
+        anonymous = Client()
+        client = Client()
+        client.force_login(self.user)
+        admin = Client()
+        admin.force_login(self.admin)
+
+        latest = SpeedTestResult.objects.filter(user=self.user).order_by('-test_date').first()
+        if latest is None:
+            raise CommandError(f"{self.user} uchun natija yo'q")
+        deep_cursor = self.deep_history_cursor()
+
+        def get(c, path):
+            return lambda: c.get(path)
+
+        scenarios = [
+            Scenario('home_anonymous', get(anonymous, '/'), check=expect(200)),
+            Scenario('home', get(client, '/'), check=expect(200)),
+            Scenario('run_test', lambda _: client.post('/test/run/', {'connection_type': 'single', 'streams': 1}),
+                     setup=lambda: self.prime_measurement(client), check=expect(302)),
+            Scenario('test_result', get(client, f'/test/result/{latest.pk}/'), check=expect(200)),
+            Scenario('history', get(client, '/history/'), check=expect(200)),
+            Scenario('history_filtered', get(client, '/history/?connection_type=single'), check=expect(200)),
+            Scenario('history_deep', get(client, f'/history/?cursor={deep_cursor}'), check=expect(200)),
+            Scenario('statistics', get(client, '/statistics/'), check=expect(200)),
+            Scenario('admin_results', get(admin, '/admin/speedtest/speedtestresult/'), check=expect(200)),
+            Scenario('admin_providers', get(admin, '/admin/speedtest/internetprovider/'), check=expect(200)),
+            Scenario('admin_feedback', get(admin, '/admin/speedtest/userfeedback/'), check=expect(200)),
+            Scenario('admin_issues', get(admin, '/admin/speedtest/networkissue/'), check=expect(200)),
+            # Geolokatsiya: API lar mahalliy stub da
+            Scenario('geo_sequential', lambda ip: IPGeolocation.fetch_sequential(ip), setup=self.random_ip),
+            Scenario('geo_hedged', lambda ip: IPGeolocation.fetch_hedged(ip), setup=self.random_ip),
+            Scenario('geo_service_cold', lambda ip: geo_service.lookup(ip), setup=self.cold_ip),
+            Scenario('geo_service_cached', lambda: geo_service.lookup('203.0.113.10')),
+        ]
+        return scenarios
+
+    def deep_history_cursor(self):
+        """--history-depth sahifagacha cursor bo'yicha yurish"""
+        queryset = SpeedTestResult.objects.filter(user=self.user)
+        cursor = ''
+        for _ in range(self.options['history_depth']):
+            page = pagination.paginate(queryset, cursor, ResultsHistoryView.paginate_by)
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        return quote(cursor)
+
+    def prime_measurement(self, client):
+        """RunTestView uchun: sessiya tokeni va cache dagi o'lchovlar (WebSocket/stream siz)"""
+        token = measurement.new_token()
+        session = client.session
+        session[measurement.SESSION_KEY] = token
+        session.save()
+        for direction in measurement.DIRECTIONS:
+            counter = measurement.StreamCounter()
+            counter.add(50 * 1024 * 1024)
+            counter.finished = counter.started + 1.0
+            measurement.record_stream(token, direction, 0, counter)
+        cache.set(measurement.latency_key(token), {
+            'ping': 12.0, 'jitter': 1.5, 'packet_loss': 0.0, 'sent': 20, 'received': 20,
+        }, 600)
+
+    def cold_ip(self):
+        """Barcha kesh qatlamlaridan (xotira, Django cache, ResolvedIP) tozalangan IP"""
+        ip = self.random_ip()
+        geo_service.invalidate(ip)
+        return ip
+
+    def random_ip(self):
+        # Hujjatlar uchun ajratilgan diapazon (RFC 5737) - haqiqiy IP ga to'g'ri kelmaydi
+        return f'198.51.{self.rng.randrange(256)}.{self.rng.randrange(1, 255)}'
@@ -0,0 +1,71 @@
+# speedtest/management/commands/build_ip_index.py
+import ipaddress
+import random
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from speedtest.utils.ip_ranges import (
+    IPRangeIndex, build_index, read_csv_ranges, reset_offline_index
+)
+
+
+class Command(BaseCommand):
+    help = "CSV fayldan offline IP diapazon indeksini qayta qurish"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help="CSV fayl (network yoki start_ip,end_ip ustunlari bilan)")
+        parser.add_argument('--output', default=None, help="Indeks fayli (default: settings.GEO_OFFLINE_DB)")
+        parser.add_argument('--benchmark', type=int, default=0, metavar='N',
+                            help="Qurilgandan keyin N ta tasodifiy qidiruv tezligini o'lchash")
+
+    def handle(self, *args, **options):
+        output = options['output'] or getattr(settings, 'GEO_OFFLINE_DB', None)
+        if not output:
+            raise CommandError("--output yoki settings.GEO_OFFLINE_DB ko'rsatilishi kerak")
+
+        if options['source']:
+            started = time.perf_counter()
+            try:
+                stats = build_index(read_csv_ranges(options['source']), output)
+            except (OSError, KeyError, ValueError) as e:
+                raise CommandError(f"Indeksni qurib bo'lmadi: {e}")
+            reset_offline_index()
+            self.stdout.write(self.style.SUCCESS(
+                f"{output}: {stats['ipv4']} IPv4, {stats['ipv6']} IPv6 diapazon, "
+                f"{stats['meta']} meta yozuv, {stats['overlaps']} ustma-ust (eng aniqi olindi) "
+                f"({time.perf_counter() - started:.2f} s)"
+            ))
+        elif not options['benchmark']:
+            raise CommandError("CSV fayl yoki --benchmark ko'rsating")
+
+        if options['benchmark']:
+            self.benchmark(output, options['benchmark'])
+
+    def benchmark(self, path, count):
+        index = IPRangeIndex(path)
+        if not len(index):
+            raise CommandError("Indeks bo'sh")
+
+        # Yarmi diapazonlar ichidan, yarmi tasodifiy IPv4
+        rng = random.Random(42)
+        ips = []
+        for _ in range(count):
+            if len(index.v4_start) and rng.random() < 0.5:
+                i = rng.randrange(len(index.v4_start))
+                ips.append(str(ipaddress.IPv4Address(rng.randint(index.v4_start[i], index.v4_end[i]))))
+            else:
+                ips.append(str(ipaddress.IPv4Address(rng.getrandbits(32))))
+
+        find = index.find
+        started = time.perf_counter()
+        found = sum(1 for ip in ips if find(ip) is not None)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{count} ta qidiruv: {elapsed:.3f} s, "
+            f"{count / elapsed:,.0f} qidiruv/s, "
+            f"{elapsed / count * 1e6:.2f} µs/qidiruv, topildi: {found}"
+        )
+        index.close()
@@ -0,0 +1,63 @@
+# speedtest/management/commands/detect_anomalies.py
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from speedtest.utils import anomalies
+
+
+class Command(BaseCommand):
+    help = ("Provayderlar degradatsiyasini aniqlash va NetworkIssue yozish - "
+            "cron orqali, masalan har soatda")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help="Oxirgi necha soat tekshiriladi")
+        parser.add_argument('--since', help="Shu sanadan (YYYY-MM-DD) boshlab tekshirish (backfill)")
+        parser.add_argument('--method', choices=('mad', 'ewma'), default='mad',
+                            help="Detektor: mad (mavsumiy median/MAD) yoki ewma")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Faqat chiqarish, NetworkIssue yozmaslik")
+
+    def handle(self, *args, **options):
+        end = timezone.now().replace(minute=0, second=0, microsecond=0)
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError("--since YYYY-MM-DD formatida bo'lishi kerak")
+            evaluate_start = timezone.make_aware(since)
+        else:
+            evaluate_start = end - timedelta(hours=options['hours'])
+        if evaluate_start >= end:
+            raise CommandError("Tekshiriladigan davr bo'sh")
+
+        baseline_days = getattr(settings, 'ANOMALY_BASELINE_DAYS', 14)
+        started = time.perf_counter()
+        series = anomalies.hourly_series(evaluate_start - timedelta(days=baseline_days), end)
+        loaded = time.perf_counter()
+        evaluate_from = max(0, int((evaluate_start - series.start).total_seconds()) // anomalies.HOUR)
+        detections = anomalies.detect(series, evaluate_from, method=options['method'])
+        detected = time.perf_counter()
+
+        self.stdout.write(
+            f"{len(series.provider_ids)} provayder x {series.hours} soat: "
+            f"yuklash {loaded - started:.2f} s, aniqlash {detected - loaded:.2f} s"
+        )
+        for detection in detections:
+            self.stdout.write(
+                f"  provider={detection.provider_id} {detection.issue_type} {detection.severity} "
+                f"{detection.started:%Y-%m-%d %H:%M} - {detection.last:%Y-%m-%d %H:%M} "
+                f"(ball {detection.score:.1f}{', davom etmoqda' if detection.ongoing else ''})"
+            )
+        if options['dry_run']:
+            self.stdout.write(f"{len(detections)} ta hodisa topildi (dry-run, yozilmadi)")
+            return
+
+        created = anomalies.record(detections, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(detections)} ta hodisa topildi, {created} ta NetworkIssue yaratildi"
+        ))
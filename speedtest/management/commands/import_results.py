@@ -0,0 +1,271 @@
+# speedtest/management/commands/import_results.py
+import csv
+import gzip
+import io
+import ipaddress
+import itertools
+import json
+import sys
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from speedtest.models import SpeedTestResult
+from speedtest.utils import rollups, sketches
+from speedtest.utils.providers import provider_resolver
+
+# Eksport ustun nomlari (utils/export.py) va model maydon nomlari qabul qilinadi
+ALIASES = {
+    'download_speed': 'download_mbps',
+    'upload_speed': 'upload_mbps',
+    'ping': 'ping_ms',
+    'jitter': 'jitter_ms',
+    'provider__name': 'provider',
+    'provider__location': 'location',
+}
+CONNECTION_TYPES = {'multi', 'single'}
+
+
+class RowError(ValueError):
+    pass
+
+
+def _get(row, name):
+    value = row.get(name)
+    if isinstance(value, str):
+        value = value.strip()
+    return None if value == '' else value
+
+
+def _decimal(row, name, limit, required=True, default=None):
+    value = _get(row, name)
+    if value is None:
+        if required:
+            raise RowError(f"{name} yo'q")
+        return default
+    try:
+        number = Decimal(str(value))
+    except InvalidOperation:
+        raise RowError(f"{name} noto'g'ri: {value!r}")
+    if not number.is_finite() or not 0 <= number < limit:
+        raise RowError(f"{name} chegaradan tashqarida: {value!r}")
+    return number
+
+
+def _int(row, name, required=False, default=None):
+    value = _get(row, name)
+    if value is None:
+        if required:
+            raise RowError(f"{name} yo'q")
+        return default
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} noto'g'ri: {value!r}")
+    if number < 0:
+        raise RowError(f"{name} manfiy: {value!r}")
+    return number
+
+
+def _datetime(row, name='test_date'):
+    value = _get(row, name)
+    parsed = parse_datetime(value) if isinstance(value, str) else None
+    if parsed is None:
+        raise RowError(f"{name} noto'g'ri: {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _ip(row):
+    value = _get(row, 'ip_address')
+    if value is None:
+        return None
+    try:
+        return str(ipaddress.ip_address(value))
+    except ValueError:
+        raise RowError(f"ip_address noto'g'ri: {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Eski tizimdan CSV / NDJSON natijalarni oqim bilan import qilish (export formatini ham o'qiydi)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Fayl yo'li (.csv, .ndjson, .gz bilan ham) yoki '-' (stdin)")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                            help="Fayl kengaytmasidan aniqlanmasa")
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help="Bitta bulk_create / tranzaksiyadagi qatorlar soni")
+        parser.add_argument('--resume-from', type=int, default=0, metavar='N',
+                            help="Birinchi N ta ma'lumot qatorini o'tkazib yuborish (oldingi ishdan davom)")
+        parser.add_argument('--user', default=None,
+                            help="user_id ustuni bo'lmagan qatorlar uchun foydalanuvchi (username)")
+        parser.add_argument('--max-errors', type=int, default=1000,
+                            help="Shuncha noto'g'ri qatordan keyin to'xtash")
+        parser.add_argument('--dry-run', action='store_true', help="Faqat tekshirish, yozmaslik")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or self._detect_format(options['source'])
+        batch_size = options['batch_size']
+        if batch_size <= 0:
+            raise CommandError("--batch-size musbat bo'lishi kerak")
+
+        default_user_id = None
+        if options['user']:
+            try:
+                default_user_id = User.objects.only('pk').get(username=options['user']).pk
+            except User.DoesNotExist:
+                raise CommandError(f"Foydalanuvchi topilmadi: {options['user']}")
+
+        self.providers = {}
+        self.errors = 0
+        self.max_errors = options['max_errors']
+        self.dry_run = options['dry_run']
+
+        offset = options['resume_from']
+        written = 0
+        started = time.perf_counter()
+
+        with self._open(options['source']) as stream:
+            rows = self._rows(stream, fmt)
+            # Qayta ishga tushirishda oldingi qatorlar faqat o'qiladi, tekshirilmaydi
+            rows = itertools.islice(rows, offset, None)
+
+            while True:
+                chunk = list(itertools.islice(rows, batch_size))
+                if not chunk:
+                    break
+                written += self._write_chunk(chunk, offset, default_user_id)
+                offset += len(chunk)
+
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"offset={offset} yozildi={written} xato={self.errors} "
+                    f"({written / max(elapsed, 1e-6):,.0f} qator/s)"
+                )
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Tayyor: {written} qator {elapsed:.1f} s da "
+            f"({written / max(elapsed, 1e-6):,.0f} qator/s), {self.errors} ta xato, "
+            f"oxirgi offset={offset}"
+        ))
+
+    def _detect_format(self, source):
+        name = source[:-3] if source.endswith('.gz') else source
+        if name.endswith('.csv'):
+            return 'csv'
+        if name.endswith(('.ndjson', '.jsonl')):
+            return 'ndjson'
+        raise CommandError("Formatni aniqlab bo'lmadi, --format ko'rsating")
+
+    def _open(self, source):
+        if source == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8', newline='')
+        try:
+            if source.endswith('.gz'):
+                return gzip.open(source, 'rt', encoding='utf-8', newline='')
+            return open(source, encoding='utf-8', newline='')
+        except OSError as e:
+            raise CommandError(f"Faylni ochib bo'lmadi: {e}")
+
+    def _rows(self, stream, fmt):
+        """(qator raqami, dict) oqimi - fayl to'liq o'qilmaydi"""
+        if fmt == 'csv':
+            yield from enumerate(csv.DictReader(stream), start=1)
+            return
+        for number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+
+    def _provider_id(self, row):
+        name = _get(row, 'provider')
+        if name is None:
+            return None
+        location = _get(row, 'location') or ''
+        cache_key = (name, location)
+        if cache_key not in self.providers:
+            city, _, region = location.partition(', ')
+            provider = provider_resolver.resolve({
+                'isp': name,
+                'city': city or "Noma'lum",
+                'region': region,
+                'ip': _ip(row) or '0.0.0.0',
+            })
+            self.providers[cache_key] = provider.pk
+        return self.providers[cache_key]
+
+    def _parse(self, row, default_user_id):
+        if not isinstance(row, dict):
+            raise RowError("JSON obyekt emas")
+        row = {ALIASES.get(key, key): value for key, value in row.items()}
+        connection_type = _get(row, 'connection_type') or 'multi'
+        if connection_type not in CONNECTION_TYPES:
+            raise RowError(f"connection_type noto'g'ri: {connection_type!r}")
+        return SpeedTestResult(
+            user_id=_int(row, 'user_id', default=default_user_id),
+            test_date=_datetime(row),
+            download_speed=_decimal(row, 'download_mbps', Decimal('1e8')),
+            upload_speed=_decimal(row, 'upload_mbps', Decimal('1e8')),
+            ping=_int(row, 'ping_ms', required=True),
+            jitter=_int(row, 'jitter_ms'),
+            packet_loss=_decimal(row, 'packet_loss', Decimal('1000'), required=False, default=Decimal(0)),
+            connection_type=connection_type,
+            streams=_int(row, 'streams', default=1),
+            download_bytes=_int(row, 'download_bytes'),
+            upload_bytes=_int(row, 'upload_bytes'),
+            ip_address=_ip(row),
+            location=_get(row, 'test_location') or '',
+        ), row
+
+    def _error(self, number, message):
+        self.errors += 1
+        if self.errors <= 20:
+            self.stderr.write(f"{number}-qator: {message}")
+        if self.errors > self.max_errors:
+            raise CommandError(f"Xatolar soni {self.max_errors} dan oshdi")
+
+    def _write_chunk(self, chunk, offset, default_user_id) -> int:
+        """Bitta partiya: tekshirish, provayderlar, bitta tranzaksiyada bulk_create"""
+        parsed = []
+        for number, row in chunk:
+            try:
+                parsed.append((number, *self._parse(row, default_user_id)))
+            except RowError as e:
+                self._error(number, e)
+
+        # Mavjud bo'lmagan foydalanuvchilar - partiya uchun bitta so'rov
+        user_ids = {obj.user_id for _, obj, _ in parsed if obj.user_id is not None}
+        known = set(User.objects.filter(pk__in=user_ids).values_list('pk', flat=True)) if user_ids else set()
+
+        objs = []
+        for number, obj, row in parsed:
+            if obj.user_id is not None and obj.user_id not in known:
+                self._error(number, f"user_id topilmadi: {obj.user_id}")
+                continue
+            obj.provider_id = self._provider_id(row)
+            objs.append(obj)
+
+        if self.dry_run or not objs:
+            return len(objs)
+        try:
+            with transaction.atomic():
+                SpeedTestResult.objects.bulk_create(objs)
+                # bulk_create post_save yubormaydi - yig'ma jadval va eskizlar shu yerda
+                rollups.apply_results(objs)
+                sketches.apply_results(objs)
+        except Exception as e:
+            raise CommandError(
+                f"Partiya yozilmadi ({e}). Davom ettirish uchun: --resume-from {offset}"
+            )
+        return len(objs)
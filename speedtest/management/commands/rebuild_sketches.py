@@ -0,0 +1,21 @@
+# speedtest/management/commands/rebuild_sketches.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from speedtest.utils.sketches import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "ProviderDailySketch kvantil eskizlarini xom natijalardan qayta qurish (backfill yoki aniqlik o'zgarganda)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="O'qish va bulk_create partiya hajmi")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ta (provayder, kun) eskizi yozildi ({time.perf_counter() - started:.2f} s)"
+        ))
@@ -0,0 +1,22 @@
+# speedtest/management/commands/rebuild_user_stats.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from speedtest.utils.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = "UserDailyStats yig'ma jadvalini xom natijalardan qayta qurish (backfill)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="bulk_create partiya hajmi")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = rebuild_all(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ta (foydalanuvchi, provayder, kun) guruhi yozildi "
+            f"({time.perf_counter() - started:.2f} s)"
+        ))
@@ -0,0 +1,17 @@
+# speedtest/management/commands/refresh_leaderboard.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from speedtest.utils.leaderboard import refresh
+
+
+class Command(BaseCommand):
+    help = "Provayderlar reytingini (ProviderLeaderboard) qayta hisoblash - cron orqali, masalan har 10 daqiqada"
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} ta reyting qatori yozildi ({time.perf_counter() - started:.2f} s)"
+        ))
@@ -0,0 +1,138 @@
+# speedtest/management/commands/seed_benchmark.py
+import itertools
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from speedtest.models import InternetProvider, SpeedTestResult, UserFeedback
+from speedtest.utils import rollups, sketches
+from speedtest.utils.benchmark import PREFIX
+from speedtest.utils.geo_utils import provider_key
+
+PROVIDER_NAMES = [
+    'UZTELECOM', 'Beeline', 'Ucell', 'Uzmobile', 'Sarkor Telecom', 'TPS',
+    'Comnet', 'EVO', 'Turon Telecom', 'Uzonline', 'Perfectum Mobile', 'Humans',
+]
+CITIES = ['Toshkent', 'Samarqand', 'Buxoro', 'Andijon', 'Namangan', "Farg'ona", 'Nukus']
+
+
+class Command(BaseCommand):
+    help = "Benchmark uchun sintetik ma'lumotlar (foydalanuvchilar, provayderlar, natijalar)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--providers', type=int, default=12)
+        parser.add_argument('--results', type=int, default=10_000,
+                            help="SpeedTestResult qatorlari soni (masalan 10000 yoki 1000000)")
+        parser.add_argument('--days', type=int, default=730, help="Natijalar tarqalgan kunlar")
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42, help="Takrorlanuvchi ma'lumot uchun")
+        parser.add_argument('--clear', action='store_true', help="Avvalgi benchmark ma'lumotlarini o'chirish")
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['providers'] < 1:
+            raise CommandError("--users va --providers kamida 1")
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+
+        if options['clear']:
+            self._clear()
+
+        users = self._users(options['users'])
+        providers = self._providers(options['providers'])
+        # Birinchi foydalanuvchi "og'ir" - natijalarning katta qismi unga (chuqur tarix)
+        cum_weights = list(itertools.accumulate([len(users)] + [1] * (len(users) - 1)))
+
+        now = timezone.now()
+        span = options['days'] * 86400
+        total = options['results']
+        created = 0
+        while created < total:
+            size = min(options['batch_size'], total - created)
+            batch = []
+            for _ in range(size):
+                download = rng.lognormvariate(3.5, 0.8)
+                batch.append(SpeedTestResult(
+                    user_id=rng.choices(users, cum_weights=cum_weights)[0],
+                    provider_id=rng.choice(providers),
+                    download_speed=Decimal(f'{min(download, 9999):.2f}'),
+                    upload_speed=Decimal(f'{min(download * rng.uniform(0.2, 0.9), 9999):.2f}'),
+                    ping=rng.randint(3, 120),
+                    jitter=rng.randint(0, 30),
+                    packet_loss=Decimal(f'{rng.choice([0, 0, 0, rng.uniform(0, 5)]):.2f}'),
+                    connection_type=rng.choice(['multi', 'single']),
+                    streams=rng.choice([1, 4, 8]),
+                    test_date=now - timedelta(seconds=rng.randrange(span)),
+                    ip_address=f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+                    # Provayder bir necha shaharda - reyting joylashuv bo'yicha
+                    location=f'{rng.choice(CITIES)}, Uzbekistan',
+                ))
+            with transaction.atomic():
+                SpeedTestResult.objects.bulk_create(batch)
+            created += size
+            self.stdout.write(f"{created}/{total} natija")
+
+        # Admin FeedBack ro'yxati uchun bir oz fikr-mulohaza
+        results = SpeedTestResult.objects.filter(user_id__in=users).values_list('pk', flat=True)[:200]
+        UserFeedback.objects.bulk_create([
+            UserFeedback(result_id=pk, rating=rng.randint(0, 10), comment='benchmark') for pk in results
+        ])
+
+        groups = rollups.rebuild_all()
+        sketches.rebuild_all()
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(users)} foydalanuvchi, {len(providers)} provayder, {created} natija, "
+            f"{groups} yig'ma guruh ({time.perf_counter() - started:.1f} s)"
+        ))
+
+    def _users(self, count):
+        # Parol xeshi bir marta - minglab foydalanuvchida PBKDF2 sekin
+        password = make_password(PREFIX)
+        existing = set(User.objects.filter(username__startswith=f'{PREFIX}_').values_list('username', flat=True))
+        User.objects.bulk_create([
+            User(username=f'{PREFIX}_{i}', password=password)
+            for i in range(count) if f'{PREFIX}_{i}' not in existing
+        ])
+        if not User.objects.filter(username=f'{PREFIX}_admin').exists():
+            User.objects.create(username=f'{PREFIX}_admin', password=password, is_staff=True, is_superuser=True)
+        ids = dict(User.objects.filter(username__startswith=f'{PREFIX}_').values_list('username', 'pk'))
+        return [ids[f'{PREFIX}_{i}'] for i in range(count)]
+
+    def _providers(self, count):
+        ids = []
+        for i in range(count):
+            name = PROVIDER_NAMES[i % len(PROVIDER_NAMES)]
+            if i >= len(PROVIDER_NAMES):
+                name = f'{name} {i // len(PROVIDER_NAMES)}'
+            provider, _ = InternetProvider.objects.get_or_create(
+                normalized_name=provider_key(name),
+                defaults={
+                    'name': name,
+                    'location': f'{CITIES[i % len(CITIES)]}, Uzbekistan',
+                    'ip_address': f'10.0.{i // 256}.{i % 256}',
+                },
+            )
+            ids.append(provider.pk)
+        return ids
+
+    def _clear(self):
+        users = User.objects.filter(username__startswith=f'{PREFIX}_')
+        results = SpeedTestResult.objects.filter(user__in=users)
+        deleted = 0
+        # Bo'laklab - collector millionlab obyektni xotiraga yuklamasin
+        with rollups.paused():
+            while True:
+                ids = list(results.values_list('pk', flat=True)[:10_000])
+                if not ids:
+                    break
+                SpeedTestResult.objects.filter(pk__in=ids).delete()
+                deleted += len(ids)
+        users.delete()
+        self.stdout.write(f"{deleted} ta eski natija o'chirildi")
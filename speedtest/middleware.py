@@ -0,0 +1,77 @@
+# speedtest/middleware.py
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .utils import instrumentation
+
+logger = logging.getLogger('speedtest.requests')
+
+
+class RequestMetricsMiddleware:
+    """
+    Har bir so'rov uchun: umumiy vaqt, DB so'rovlar soni/vaqti, tashqi HTTP
+    vaqti va shablon render vaqti. Strukturali (JSON) log qatori yoziladi va
+    view bo'yicha gistogrammalarga qo'shiladi (/metrics/requests/).
+    Oqimli javoblarda vaqt javob obyekti qaytgunchagacha o'lchanadi.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = instrumentation.start()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.get_response(request)
+            return response
+        finally:
+            self._record(request, response, time.perf_counter() - started, instrumentation.finish(token))
+
+    async def __acall__(self, request):
+        token = instrumentation.start()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.get_response(request)
+            return response
+        finally:
+            self._record(request, response, time.perf_counter() - started, instrumentation.finish(token))
+
+    def _record(self, request, response, duration, metrics):
+        match = getattr(request, 'resolver_match', None)
+        # URL emas, view nomi - label lar soni cheklangan bo'lsin
+        view = (match.view_name or match._func_path) if match else 'unmatched'
+        status = response.status_code if response is not None else 500
+
+        instrumentation.registry.observe(view, request.method, status, duration, metrics)
+
+        if not getattr(settings, 'REQUEST_METRICS_LOG', True):
+            return
+        line = {
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_seconds * 1000, 2),
+            'http_requests': metrics.http_requests,
+            'http_ms': round(metrics.http_seconds * 1000, 2),
+            'template_ms': round(metrics.template_seconds * 1000, 2),
+        }
+        # N+1 shubhasi - alohida darajada
+        level = logging.INFO
+        if metrics.db_queries > getattr(settings, 'REQUEST_METRICS_QUERY_WARN', 50):
+            level = logging.WARNING
+        logger.log(level, json.dumps(line))
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 01:46
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0002_userprofile_speedtestresult_session_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResolvedIP',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ip_address', models.GenericIPAddressField(unique=True, verbose_name='IP Manzil')),
+                ('data', models.JSONField(default=dict, verbose_name="Joylashuv ma'lumotlari")),
+                ('resolved_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Aniqlangan vaqt')),
+            ],
+            options={
+                'verbose_name': 'Aniqlangan IP',
+                'verbose_name_plural': 'Aniqlangan IP lar',
+            },
+        ),
+    ]
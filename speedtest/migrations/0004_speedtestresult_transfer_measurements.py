@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0003_resolvedip'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='download_bytes',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Yuklab olingan baytlar'),
+        ),
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='download_duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='Download vaqti (s)'),
+        ),
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='upload_bytes',
+            field=models.BigIntegerField(blank=True, null=True, verbose_name='Yuklangan baytlar'),
+        ),
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='upload_duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='Upload vaqti (s)'),
+        ),
+    ]
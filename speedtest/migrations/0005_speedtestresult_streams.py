@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 01:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0004_speedtestresult_transfer_measurements'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='streams',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Parallel oqimlar soni'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 01:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0005_speedtestresult_streams'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='ingest_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 01:55
+
+from django.db import migrations, models
+
+
+def fill_normalized_name(apps, schema_editor):
+    """Mavjud provayderlar uchun kalit; takrorlanganlar (eng eskisidan tashqari) NULL qoladi - 0017 birlashtiradi"""
+    InternetProvider = apps.get_model('speedtest', 'InternetProvider')
+    seen = set()
+    for provider in InternetProvider.objects.order_by('created_at', 'pk'):
+        key = ' '.join(provider.name.split()).casefold()
+        if key in seen:
+            continue
+        seen.add(key)
+        provider.normalized_name = key
+        provider.save(update_fields=['normalized_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0006_speedtestresult_ingest_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='internetprovider',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=200, null=True, unique=True),
+        ),
+        migrations.RunPython(fill_normalized_name, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-17 01:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0007_internetprovider_normalized_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('test_count', models.PositiveIntegerField(default=0, verbose_name='Testlar soni')),
+                ('sum_download', models.FloatField(default=0)),
+                ('sum_upload', models.FloatField(default=0)),
+                ('sum_ping', models.FloatField(default=0)),
+                ('sum_sq_download', models.FloatField(default=0)),
+                ('sum_sq_upload', models.FloatField(default=0)),
+                ('sum_sq_ping', models.FloatField(default=0)),
+                ('min_download', models.FloatField(blank=True, null=True)),
+                ('max_download', models.FloatField(blank=True, null=True)),
+                ('min_upload', models.FloatField(blank=True, null=True)),
+                ('max_upload', models.FloatField(blank=True, null=True)),
+                ('min_ping', models.IntegerField(blank=True, null=True)),
+                ('max_ping', models.IntegerField(blank=True, null=True)),
+                ('provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='speedtest.internetprovider')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Kunlik Statistika',
+                'verbose_name_plural': 'Kunlik Statistikalar',
+                'indexes': [models.Index(fields=['user', 'date'], name='speedtest_u_user_id_5e5bfb_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'provider', 'date'), name='uniq_user_provider_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 6.0 on 2026-10-17 02:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_archive_table(apps, schema_editor):
+    """PostgreSQL da test_date bo'yicha RANGE bo'limlangan jadval, boshqa bazalarda oddiy jadval"""
+    model = apps.get_model('speedtest', 'SpeedTestResultArchive')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(model)
+        return
+
+    sql, params = schema_editor.table_sql(model)
+    schema_editor.execute(f'{sql} PARTITION BY RANGE ("test_date")', params or None)
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('speedtest', 'SpeedTestResultArchive'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0008_userdailystats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Jadval RunPython da yaratiladi (PostgreSQL da PARTITION BY RANGE kerak)
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='SpeedTestResultArchive',
+                    fields=[
+                        ('pk', models.CompositePrimaryKey('id', 'test_date', blank=True, editable=False, primary_key=True, serialize=False)),
+                        ('id', models.BigIntegerField(verbose_name='Asl ID')),
+                        ('test_date', models.DateTimeField(verbose_name='Test sanasi')),
+                        ('session_id', models.CharField(blank=True, max_length=255, null=True)),
+                        ('download_speed', models.DecimalField(decimal_places=2, max_digits=10)),
+                        ('upload_speed', models.DecimalField(decimal_places=2, max_digits=10)),
+                        ('ping', models.IntegerField()),
+                        ('jitter', models.IntegerField(blank=True, null=True)),
+                        ('packet_loss', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                        ('connection_type', models.CharField(default='multi', max_length=50)),
+                        ('streams', models.PositiveSmallIntegerField(default=1)),
+                        ('ip_address', models.GenericIPAddressField(blank=True, null=True)),
+                        ('download_bytes', models.BigIntegerField(blank=True, null=True)),
+                        ('upload_bytes', models.BigIntegerField(blank=True, null=True)),
+                        ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                        ('provider', models.ForeignKey(db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='speedtest.internetprovider')),
+                        ('user', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'verbose_name': 'Arxivlangan Natija',
+                        'verbose_name_plural': 'Arxivlangan Natijalar',
+                        'indexes': [models.Index(fields=['user', '-test_date'], name='speedtest_s_user_id_16b4e6_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-17 02:14
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0009_speedtestresultarchive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='speedtestresult',
+            index=models.Index(fields=['-test_date'], name='speedtest_s_test_da_c8f11e_idx'),
+        ),
+    ]
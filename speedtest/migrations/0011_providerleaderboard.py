@@ -0,0 +1,37 @@
+# Generated by Django 6.0 on 2026-10-17 02:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0010_speedtestresult_test_date_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderLeaderboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(max_length=8, verbose_name='Davr')),
+                ('location', models.CharField(max_length=200, verbose_name='Joylashuv')),
+                ('test_count', models.PositiveIntegerField(verbose_name='Testlar soni')),
+                ('download_median', models.FloatField()),
+                ('download_p90', models.FloatField()),
+                ('upload_median', models.FloatField()),
+                ('upload_p90', models.FloatField()),
+                ('ping_median', models.FloatField()),
+                ('ping_p90', models.FloatField()),
+                ('refreshed_at', models.DateTimeField()),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='speedtest.internetprovider')),
+            ],
+            options={
+                'verbose_name': 'Provayder Reytingi',
+                'verbose_name_plural': 'Provayderlar Reytingi',
+                'indexes': [models.Index(fields=['window', '-download_median'], name='speedtest_p_window_4652c6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('window', 'provider'), name='uniq_leaderboard_window_provider')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-17 02:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0011_providerleaderboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderDailySketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('test_count', models.PositiveIntegerField(default=0, verbose_name='Testlar soni')),
+                ('download_sketch', models.BinaryField()),
+                ('upload_sketch', models.BinaryField()),
+                ('ping_sketch', models.BinaryField()),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sketches', to='speedtest.internetprovider')),
+            ],
+            options={
+                'verbose_name': 'Kunlik Kvantil Eskizi',
+                'verbose_name_plural': 'Kunlik Kvantil Eskizlari',
+                'indexes': [models.Index(fields=['date'], name='speedtest_p_date_ab1ffa_idx')],
+                'constraints': [models.UniqueConstraint(fields=('provider', 'date'), name='uniq_sketch_provider_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 6.0 on 2026-10-17 02:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fold_open_issues(apps, schema_editor):
+    """
+    Kalit va last_reported_at ni to'ldirish; bir xil xizmat/turdagi faol
+    xabarlar eng eskisiga yig'iladi (unikal shart uchun)
+    """
+    NetworkIssue = apps.get_model('speedtest', 'NetworkIssue')
+    incidents = {}
+    duplicates = []
+    for issue in NetworkIssue.objects.order_by('reported_at', 'pk'):
+        issue.normalized_service = ' '.join(issue.service_name.split()).casefold()
+        issue.last_reported_at = issue.reported_at
+        incident = incidents.get((issue.normalized_service, issue.issue_type))
+        if issue.is_resolved or incident is None:
+            if not issue.is_resolved:
+                incidents[issue.normalized_service, issue.issue_type] = issue
+            issue.save(update_fields=['normalized_service', 'last_reported_at'])
+            continue
+        incident.report_count += issue.report_count
+        incident.last_reported_at = issue.reported_at
+        duplicates.append(issue.pk)
+    for incident in incidents.values():
+        incident.save(update_fields=['report_count', 'last_reported_at'])
+    NetworkIssue.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0012_providerdailysketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='networkissue',
+            name='last_reported_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Oxirgi xabar'),
+        ),
+        migrations.AddField(
+            model_name='networkissue',
+            name='normalized_service',
+            field=models.CharField(default='', editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='networkissue',
+            name='report_count',
+            field=models.PositiveIntegerField(default=1, verbose_name='Xabarlar soni'),
+        ),
+        migrations.RunPython(fold_open_issues, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='networkissue',
+            index=models.Index(condition=models.Q(('is_resolved', False)), fields=['-last_reported_at'], name='networkissue_open_recent_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='networkissue',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_resolved', False)), fields=('normalized_service', 'issue_type'), name='networkissue_one_open_incident'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 6.0 on 2026-10-17 02:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0013_networkissue_incidents'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileArchivedDailySketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('test_count', models.PositiveIntegerField(default=0, verbose_name='Testlar soni')),
+                ('download_sketch', models.BinaryField()),
+                ('upload_sketch', models.BinaryField()),
+                ('ping_sketch', models.BinaryField()),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='speedtest.internetprovider')),
+            ],
+            options={
+                'verbose_name': 'Faylga Arxivlangan Eskiz',
+                'verbose_name_plural': 'Faylga Arxivlangan Eskizlar',
+                'constraints': [models.UniqueConstraint(fields=('provider', 'date'), name='uniq_file_archived_sketch_provider_date')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FileArchivedDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('test_count', models.PositiveIntegerField(default=0, verbose_name='Testlar soni')),
+                ('sum_download', models.FloatField(default=0)),
+                ('sum_upload', models.FloatField(default=0)),
+                ('sum_ping', models.FloatField(default=0)),
+                ('sum_sq_download', models.FloatField(default=0)),
+                ('sum_sq_upload', models.FloatField(default=0)),
+                ('sum_sq_ping', models.FloatField(default=0)),
+                ('min_download', models.FloatField(blank=True, null=True)),
+                ('max_download', models.FloatField(blank=True, null=True)),
+                ('min_upload', models.FloatField(blank=True, null=True)),
+                ('max_upload', models.FloatField(blank=True, null=True)),
+                ('min_ping', models.IntegerField(blank=True, null=True)),
+                ('max_ping', models.IntegerField(blank=True, null=True)),
+                ('date', models.DateField(verbose_name='Sana')),
+                ('provider', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='speedtest.internetprovider')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Faylga Arxivlangan Statistika',
+                'verbose_name_plural': 'Faylga Arxivlangan Statistikalar',
+                'constraints': [models.UniqueConstraint(fields=('user', 'provider', 'date'), name='uniq_file_archived_user_provider_date')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Umumiy cache jadvali (settings.CACHES - DatabaseCache) migratsiya bilan
+# yaratiladi: alohida createcachetable qadami unutilmasin
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # Jadval bor bo'lsa yoki backend DatabaseCache bo'lmasa hech narsa qilmaydi
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0014_filearchiveddailysketch_filearchiveddailystats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
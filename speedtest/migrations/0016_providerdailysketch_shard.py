@@ -0,0 +1,26 @@
+# Generated by Django 6.0 on 2026-10-17 02:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0015_create_cache_table'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='providerdailysketch',
+            name='uniq_sketch_provider_date',
+        ),
+        migrations.AddField(
+            model_name='providerdailysketch',
+            name='shard',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name="Bo'lak"),
+        ),
+        migrations.AddConstraint(
+            model_name='providerdailysketch',
+            constraint=models.UniqueConstraint(fields=('provider', 'date', 'shard'), name='uniq_sketch_provider_date_shard'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 6.0 on 2026-10-17 03:10
+
+from django.db import migrations
+
+from speedtest.utils.ddsketch import DDSketch
+
+SKETCH_FIELDS = ('download_sketch', 'upload_sketch', 'ping_sketch')
+
+
+def provider_key(name):
+    return ' '.join((name or '').split()).casefold()
+
+
+def merge_stats(row, other):
+    """Yig'ma ustunlarni (DailyStatsColumns) qo'shish: sum/count - yig'indi, min/max - chegaralar"""
+    for field in row._meta.get_fields():
+        name = field.name
+        if name == 'test_count' or name.startswith('sum_'):
+            setattr(row, name, getattr(row, name) + getattr(other, name))
+        elif name.startswith(('min_', 'max_')):
+            values = [v for v in (getattr(row, name), getattr(other, name)) if v is not None]
+            pick = min if name.startswith('min_') else max
+            setattr(row, name, pick(values) if values else None)
+
+
+def merge_sketches(row, other):
+    """Eskiz ustunlarini (DailySketchColumns) birlashtirish"""
+    row.test_count += other.test_count
+    for name in SKETCH_FIELDS:
+        merged = DDSketch.from_bytes(getattr(row, name)).merge(DDSketch.from_bytes(getattr(other, name)))
+        setattr(row, name, merged.to_bytes())
+
+
+def move_rows(model, duplicate_id, target_id, unique_fields, merge):
+    """Takror provayder qatorlarini asosiysiga ko'chirish; unikal kalit band bo'lsa - qo'shib yuborish"""
+    for row in model.objects.filter(provider_id=duplicate_id):
+        lookup = {field: getattr(row, field) for field in unique_fields}
+        existing = model.objects.filter(provider_id=target_id, **lookup).first()
+        if existing is None:
+            row.provider_id = target_id
+            row.save(update_fields=['provider'])
+        else:
+            merge(existing, row)
+            existing.save()
+            row.delete()
+
+
+def merge_duplicate_providers(apps, schema_editor):
+    """
+    0007 da kalit berilmagan (normalized_name NULL) takror provayderlar eng
+    eski provayderga birlashtiriladi: natijalar va yig'ma jadvallar ko'chiriladi,
+    takrorlar o'chiriladi. Aks holda ularni keyingi save() unikal kalitga uriladi
+    """
+    InternetProvider = apps.get_model('speedtest', 'InternetProvider')
+    survivors = dict(
+        InternetProvider.objects.filter(normalized_name__isnull=False).values_list('normalized_name', 'pk')
+    )
+    for provider in InternetProvider.objects.filter(normalized_name__isnull=True).order_by('created_at', 'pk'):
+        key = provider_key(provider.name)
+        target_id = survivors.get(key)
+        if target_id is None:
+            provider.normalized_name = key
+            provider.save(update_fields=['normalized_name'])
+            survivors[key] = provider.pk
+            continue
+
+        for name in ('SpeedTestResult', 'SpeedTestResultArchive'):
+            apps.get_model('speedtest', name).objects.filter(provider_id=provider.pk).update(provider_id=target_id)
+        move_rows(apps.get_model('speedtest', 'UserDailyStats'), provider.pk, target_id,
+                  ('user_id', 'date'), merge_stats)
+        move_rows(apps.get_model('speedtest', 'FileArchivedDailyStats'), provider.pk, target_id,
+                  ('user_id', 'date'), merge_stats)
+        move_rows(apps.get_model('speedtest', 'ProviderDailySketch'), provider.pk, target_id,
+                  ('date', 'shard'), merge_sketches)
+        move_rows(apps.get_model('speedtest', 'FileArchivedDailySketch'), provider.pk, target_id,
+                  ('date',), merge_sketches)
+        # Reyting qatorlari CASCADE bilan o'chadi - refresh_leaderboard qayta hisoblaydi
+        provider.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0016_providerdailysketch_shard'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_providers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-17 03:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0017_merge_duplicate_providers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='speedtestresultarchive',
+            name='connection_type',
+            field=models.CharField(choices=[('multi', 'Multi'), ('single', 'Single')], default='multi', max_length=50),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('speedtest', '0018_speedtestresultarchive_connection_type_choices'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='filearchiveddailysketch',
+            name='uniq_file_archived_sketch_provider_date',
+        ),
+        migrations.RemoveConstraint(
+            model_name='providerdailysketch',
+            name='uniq_sketch_provider_date_shard',
+        ),
+        migrations.RemoveConstraint(
+            model_name='providerleaderboard',
+            name='uniq_leaderboard_window_provider',
+        ),
+        migrations.AddField(
+            model_name='filearchiveddailysketch',
+            name='location',
+            field=models.CharField(blank=True, default='', max_length=200, verbose_name='Joylashuv'),
+        ),
+        migrations.AddField(
+            model_name='providerdailysketch',
+            name='location',
+            field=models.CharField(blank=True, default='', max_length=200, verbose_name='Joylashuv'),
+        ),
+        migrations.AddField(
+            model_name='speedtestresult',
+            name='location',
+            field=models.CharField(blank=True, default='', max_length=200, verbose_name='Joylashuv'),
+        ),
+        migrations.AddField(
+            model_name='speedtestresultarchive',
+            name='location',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddConstraint(
+            model_name='filearchiveddailysketch',
+            constraint=models.UniqueConstraint(fields=('provider', 'location', 'date'), name='uniq_file_archived_sketch_provider_location_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='providerdailysketch',
+            constraint=models.UniqueConstraint(fields=('provider', 'location', 'date', 'shard'), name='uniq_sketch_provider_location_date_shard'),
+        ),
+        migrations.AddConstraint(
+            model_name='providerleaderboard',
+            constraint=models.UniqueConstraint(fields=('window', 'location', 'provider'), name='uniq_leaderboard_window_location_provider'),
+        ),
+    ]
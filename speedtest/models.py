@@ -1,8 +1,12 @@
 # speedtest/models.py
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from .utils.distribution import rating_for
+from .utils.geo_utils import provider_key
+
 
 # Agar User ga qo'shimcha ma'lumot kerak bo'lsa
 class UserProfile(models.Model):
@@ -16,6 +20,8 @@ class UserProfile(models.Model):
 
 class InternetProvider(models.Model):
     name = models.CharField(max_length=200, verbose_name="Provayder nomi")
+    # name dan avtomatik: bo'shliqlar qisqartirilgan, kichik harfli
+    normalized_name = models.CharField(max_length=200, unique=True, null=True, editable=False)
     location = models.CharField(max_length=200, verbose_name="Joylashuv")
     ip_address = models.GenericIPAddressField(verbose_name="IP Manzil")
     is_active = models.BooleanField(default=True, verbose_name="Faol")
@@ -29,10 +35,31 @@ class InternetProvider(models.Model):
     def __str__(self):
         return f"{self.name} - {self.location}"
 
+    def clean(self):
+        key = provider_key(self.name)
+        if InternetProvider.objects.filter(normalized_name=key).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': 'Bunday nomli provayder allaqachon mavjud!'})
+
+    def save(self, *args, **kwargs):
+        self.normalized_name = provider_key(self.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_name'}
+        super().save(*args, **kwargs)
+
 
 # speedtest/models.py
 
+CONNECTION_TYPES = [
+    ('multi', 'Multi'),
+    ('single', 'Single')
+]
+
+
 class SpeedTestResult(models.Model):
+    # Shablonlar arxivdagi natijani (SpeedTestResultArchive) ajratishi uchun
+    is_archived = False
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)  # NULL bo'lishi mumkin
     session_id = models.CharField(max_length=255, null=True, blank=True)  # Anonim uchun
     provider = models.ForeignKey(InternetProvider, on_delete=models.SET_NULL, null=True)  # ... qolgan fieldlar
@@ -41,12 +68,20 @@ class SpeedTestResult(models.Model):
     ping = models.IntegerField(verbose_name="Ping (ms)")
     jitter = models.IntegerField(verbose_name="Jitter", null=True, blank=True)
     packet_loss = models.DecimalField(max_digits=5, decimal_places=2, default=0, verbose_name="Paket yo'qolishi (%)")
-    connection_type = models.CharField(max_length=50, choices=[
-        ('multi', 'Multi'),
-        ('single', 'Single')
-    ], default='multi')
+    connection_type = models.CharField(max_length=50, choices=CONNECTION_TYPES, default='multi')
+    streams = models.PositiveSmallIntegerField(default=1, verbose_name="Parallel oqimlar soni")
     test_date = models.DateTimeField(default=timezone.now, verbose_name="Test sanasi")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
+    # Test qilingan joy (IP geolokatsiyasi, 'Shahar, Viloyat'); bo'sh - eski natijalar,
+    # reytingda provayder joylashuvi olinadi
+    location = models.CharField(max_length=200, blank=True, default='', verbose_name="Joylashuv")
+    # Navbat orqali yozilayotgan natijani kuzatish uchun
+    ingest_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+    # Server tomonida o'lchangan qiymatlar
+    download_bytes = models.BigIntegerField(null=True, blank=True, verbose_name="Yuklab olingan baytlar")
+    upload_bytes = models.BigIntegerField(null=True, blank=True, verbose_name="Yuklangan baytlar")
+    download_duration = models.FloatField(null=True, blank=True, verbose_name="Download vaqti (s)")
+    upload_duration = models.FloatField(null=True, blank=True, verbose_name="Upload vaqti (s)")
 
     class Meta:
         verbose_name = "Speed Test Natijasi"
@@ -55,6 +90,8 @@ class SpeedTestResult(models.Model):
         indexes = [
             models.Index(fields=['user', '-test_date']),
             models.Index(fields=['session_id', '-test_date']),
+            # Admin ro'yxati: ORDER BY test_date LIMIT, MIN/MAX va sana oralig'i
+            models.Index(fields=['-test_date']),
         ]
 
     def __str__(self):
@@ -63,14 +100,8 @@ class SpeedTestResult(models.Model):
     @property
     def speed_rating(self):
         avg_speed = (float(self.download_speed) + float(self.upload_speed)) / 2
-        if avg_speed >= 100:
-            return "A'lo"
-        elif avg_speed >= 50:
-            return "Yaxshi"
-        elif avg_speed >= 25:
-            return "O'rtacha"
-        else:
-            return "Past"
+        # Chegaralar statistika gistogrammasi bilan umumiy (SPEEDTEST_SPEED_BUCKETS)
+        return rating_for(avg_speed)
 
 
 class UserFeedback(models.Model):
@@ -99,7 +130,11 @@ class NetworkIssue(models.Model):
         ('medium', 'O\'rtacha'),
         ('high', 'Yuqori')
     ], default='medium')
+    # service_name dan avtomatik: bir xil xizmat haqidagi xabarlar bitta hodisaga yig'iladi
+    normalized_service = models.CharField(max_length=200, default='', editable=False)
     reported_at = models.DateTimeField(default=timezone.now)
+    last_reported_at = models.DateTimeField(default=timezone.now, verbose_name="Oxirgi xabar")
+    report_count = models.PositiveIntegerField(default=1, verbose_name="Xabarlar soni")
     resolved_at = models.DateTimeField(null=True, blank=True)
     is_resolved = models.BooleanField(default=False)
 
@@ -107,6 +142,241 @@ class NetworkIssue(models.Model):
         verbose_name = "Tarmoq Muammosi"
         verbose_name_plural = "Tarmoq Muammolari"
         ordering = ['-reported_at']
+        constraints = [
+            # Har bir xizmat/muammo turi uchun bittadan faol hodisa (utils/issues.report)
+            models.UniqueConstraint(
+                fields=['normalized_service', 'issue_type'],
+                condition=models.Q(is_resolved=False),
+                name='networkissue_one_open_incident',
+            ),
+        ]
+        indexes = [
+            # Faol hodisalar ro'yxati (NetworkIssuesView)
+            models.Index(
+                fields=['-last_reported_at'],
+                condition=models.Q(is_resolved=False),
+                name='networkissue_open_recent_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.service_name} - {self.get_issue_type_display()}"
+
+    def save(self, *args, **kwargs):
+        self.normalized_service = provider_key(self.service_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'service_name' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'normalized_service'}
+        super().save(*args, **kwargs)
+
+class ResolvedIP(models.Model):
+    """Aniqlangan IP manzillar (geolokatsiya keshi)"""
+    ip_address = models.GenericIPAddressField(unique=True, verbose_name="IP Manzil")
+    data = models.JSONField(default=dict, verbose_name="Joylashuv ma'lumotlari")
+    resolved_at = models.DateTimeField(default=timezone.now, verbose_name="Aniqlangan vaqt")
+
+    class Meta:
+        verbose_name = "Aniqlangan IP"
+        verbose_name_plural = "Aniqlangan IP lar"
+
+    def __str__(self):
+        return f"{self.ip_address} - {self.data.get('isp', '')}"
+
+
+class DailyStatsColumns(models.Model):
+    """Kunlik yig'ma ustunlar (utils/rollups.py bilan bir xil nomlar)"""
+    test_count = models.PositiveIntegerField(default=0, verbose_name="Testlar soni")
+    sum_download = models.FloatField(default=0)
+    sum_upload = models.FloatField(default=0)
+    sum_ping = models.FloatField(default=0)
+    sum_sq_download = models.FloatField(default=0)
+    sum_sq_upload = models.FloatField(default=0)
+    sum_sq_ping = models.FloatField(default=0)
+    min_download = models.FloatField(null=True, blank=True)
+    max_download = models.FloatField(null=True, blank=True)
+    min_upload = models.FloatField(null=True, blank=True)
+    max_upload = models.FloatField(null=True, blank=True)
+    min_ping = models.IntegerField(null=True, blank=True)
+    max_ping = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+
+
+class UserDailyStats(DailyStatsColumns):
+    """Foydalanuvchi/provayder/kun bo'yicha yig'ma statistika (StatisticsView uchun)"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    provider = models.ForeignKey(InternetProvider, on_delete=models.SET_NULL, null=True, blank=True)
+    date = models.DateField(verbose_name="Sana")
+
+    class Meta:
+        verbose_name = "Kunlik Statistika"
+        verbose_name_plural = "Kunlik Statistikalar"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'provider', 'date'], name='uniq_user_provider_date'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date']),
+        ]
 
     def __str__(self):
-        return f"{self.service_name} - {self.get_issue_type_display()}"
\ No newline at end of file
+        return f"{self.user} - {self.provider} - {self.date}"
+
+
+class DailySketchColumns(models.Model):
+    """Kunlik eskiz ustunlari (utils/sketches.py)"""
+    test_count = models.PositiveIntegerField(default=0, verbose_name="Testlar soni")
+    download_sketch = models.BinaryField()
+    upload_sketch = models.BinaryField()
+    ping_sketch = models.BinaryField()
+
+    class Meta:
+        abstract = True
+
+
+class ProviderDailySketch(DailySketchColumns):
+    """
+    Provayder/joylashuv/kun bo'yicha kvantil eskizlari (utils/ddsketch.py).
+    Ixtiyoriy davr persentillari kunlik eskizlarni birlashtirib olinadi - O(kunlar).
+    Har bir worker jarayon kunga o'z qatoriga (shard) yozadi - bitta "issiq"
+    qator uchun qulf navbati bo'lmaydi; o'qishda bo'laklar birlashtiriladi
+    """
+    provider = models.ForeignKey(InternetProvider, on_delete=models.CASCADE, related_name='daily_sketches')
+    # SpeedTestResult.location (test qilingan joy)
+    location = models.CharField(max_length=200, blank=True, default='', verbose_name="Joylashuv")
+    date = models.DateField(verbose_name="Sana")
+    shard = models.PositiveSmallIntegerField(default=0, verbose_name="Bo'lak")
+
+    class Meta:
+        verbose_name = "Kunlik Kvantil Eskizi"
+        verbose_name_plural = "Kunlik Kvantil Eskizlari"
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'location', 'date', 'shard'],
+                                    name='uniq_sketch_provider_location_date_shard'),
+        ]
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_id} - {self.date} #{self.shard}"
+
+
+class FileArchivedDailyStats(DailyStatsColumns):
+    """
+    archive_results --to-file bilan faylga ko'chirilgan natijalar yig'indisi.
+    Xom qatorlar bazada qolmaydi - UserDailyStats qayta qurilganda shu qator qo'shiladi
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    provider = models.ForeignKey(InternetProvider, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='+')
+    date = models.DateField(verbose_name="Sana")
+
+    class Meta:
+        verbose_name = "Faylga Arxivlangan Statistika"
+        verbose_name_plural = "Faylga Arxivlangan Statistikalar"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'provider', 'date'], name='uniq_file_archived_user_provider_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.provider_id} - {self.date}"
+
+
+class FileArchivedDailySketch(DailySketchColumns):
+    """Faylga ko'chirilgan natijalar eskizi - ProviderDailySketch qayta qurilganda qo'shiladi"""
+    provider = models.ForeignKey(InternetProvider, on_delete=models.CASCADE, related_name='+')
+    location = models.CharField(max_length=200, blank=True, default='', verbose_name="Joylashuv")
+    date = models.DateField(verbose_name="Sana")
+
+    class Meta:
+        verbose_name = "Faylga Arxivlangan Eskiz"
+        verbose_name_plural = "Faylga Arxivlangan Eskizlar"
+        constraints = [
+            models.UniqueConstraint(fields=['provider', 'location', 'date'],
+                                    name='uniq_file_archived_sketch_provider_location_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.provider_id} - {self.date}"
+
+
+class ProviderLeaderboard(models.Model):
+    """
+    Provayderlar reytingi - oyna (24h/7d/30d), joylashuv va provayder bo'yicha
+    tayyor agregat. refresh_leaderboard buyrug'i (cron) qayta hisoblaydi,
+    sahifa faqat o'qiydi
+    """
+    window = models.CharField(max_length=8, verbose_name="Davr")
+    provider = models.ForeignKey(InternetProvider, on_delete=models.CASCADE, related_name='+')
+    # Testlar o'tkazilgan joy (SpeedTestResult.location, bo'sh bo'lsa provayder joylashuvi)
+    location = models.CharField(max_length=200, verbose_name="Joylashuv")
+    test_count = models.PositiveIntegerField(verbose_name="Testlar soni")
+    download_median = models.FloatField()
+    download_p90 = models.FloatField()
+    upload_median = models.FloatField()
+    upload_p90 = models.FloatField()
+    ping_median = models.FloatField()
+    ping_p90 = models.FloatField()
+    refreshed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Provayder Reytingi"
+        verbose_name_plural = "Provayderlar Reytingi"
+        constraints = [
+            models.UniqueConstraint(fields=['window', 'location', 'provider'],
+                                    name='uniq_leaderboard_window_location_provider'),
+        ]
+        indexes = [
+            models.Index(fields=['window', '-download_median']),
+        ]
+
+    def __str__(self):
+        return f"{self.window} - {self.location} - {self.provider_id}"
+
+
+class SpeedTestResultArchive(models.Model):
+    """
+    Eski natijalar arxivi (archive_results buyrug'i ko'chiradi).
+    PostgreSQL da test_date bo'yicha oylik RANGE bo'limlarga bo'lingan,
+    shuning uchun birlamchi kalit (id, test_date). Tarix va natija sahifalari
+    arxivni ham ko'rsatadi (faqat o'qish - fikr va o'chirish yo'q)
+    """
+    is_archived = True
+
+    pk = models.CompositePrimaryKey('id', 'test_date')
+    id = models.BigIntegerField(verbose_name="Asl ID")
+    test_date = models.DateTimeField(verbose_name="Test sanasi")
+    # Bo'limlangan jadvalga tashqi kalitlar cheklovsiz (db_constraint=False)
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, blank=True,
+                             db_constraint=False, db_index=False, related_name='+')
+    session_id = models.CharField(max_length=255, null=True, blank=True)
+    provider = models.ForeignKey(InternetProvider, on_delete=models.DO_NOTHING, null=True,
+                                 db_constraint=False, db_index=False, related_name='+')
+    download_speed = models.DecimalField(max_digits=10, decimal_places=2)
+    upload_speed = models.DecimalField(max_digits=10, decimal_places=2)
+    ping = models.IntegerField()
+    jitter = models.IntegerField(null=True, blank=True)
+    packet_loss = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    connection_type = models.CharField(max_length=50, choices=CONNECTION_TYPES, default='multi')
+    streams = models.PositiveSmallIntegerField(default=1)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    location = models.CharField(max_length=200, blank=True, default='')
+    download_bytes = models.BigIntegerField(null=True, blank=True)
+    upload_bytes = models.BigIntegerField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Arxivlangan Natija"
+        verbose_name_plural = "Arxivlangan Natijalar"
+        indexes = [
+            models.Index(fields=['user', '-test_date']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} - {self.test_date.strftime('%Y-%m-%d %H:%M')}"
+
+    @property
+    def speed_rating(self):
+        # SpeedTestResult.speed_rating bilan bir xil (tarix va natija sahifasi)
+        return rating_for((float(self.download_speed) + float(self.upload_speed)) / 2)
@@ -0,0 +1,71 @@
+# speedtest/signals.py
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import InternetProvider, NetworkIssue, SpeedTestResult
+from .utils import issue_feed, issues, rollups, sketches
+from .utils.providers import provider_catalogue, provider_resolver
+
+
+@receiver([post_save, post_delete], sender=InternetProvider)
+def invalidate_provider_index(sender, instance, **kwargs):
+    """Provayder o'zgarsa jarayon ichidagi xaritani va katalog versiyasini yangilash"""
+    # Nomi o'zgargan bo'lishi mumkin - eski kalit noma'lum, shuning uchun hammasi
+    provider_resolver.invalidate()
+    provider_catalogue.invalidate()
+
+
+@receiver(pre_save, sender=SpeedTestResult)
+def remember_result_group(sender, instance, **kwargs):
+    """Tahrirlashdan oldingi guruh va eskiz kunini eslab qolish (sana/provayder o'zgarishi mumkin)"""
+    instance._old_rollup_group = None
+    instance._old_sketch_day = None
+    if instance.pk is not None:
+        old = sender.objects.filter(pk=instance.pk).only('user_id', 'provider_id', 'location', 'test_date').first()
+        if old is not None:
+            instance._old_rollup_group = rollups.result_group(old)
+            instance._old_sketch_day = sketches.result_day(old)
+
+
+@receiver(post_save, sender=SpeedTestResult)
+def update_rollups_on_save(sender, instance, created, **kwargs):
+    if rollups.is_paused():
+        return
+    if created:
+        rollups.apply_results([instance])
+        sketches.apply_results([instance])
+        return
+    old_group = getattr(instance, '_old_rollup_group', None)
+    new_group = rollups.result_group(instance)
+    rollups.rebuild_group(old_group)
+    if new_group != old_group:
+        rollups.rebuild_group(new_group)
+
+    # Eskizdan qiymatni ayirib bo'lmaydi - kun qayta quriladi
+    old_day = getattr(instance, '_old_sketch_day', None)
+    new_day = sketches.result_day(instance)
+    sketches.rebuild_day(old_day)
+    if new_day != old_day:
+        sketches.rebuild_day(new_day)
+
+
+@receiver(post_delete, sender=SpeedTestResult)
+def update_rollups_on_delete(sender, instance, **kwargs):
+    if rollups.is_paused():
+        return
+    rollups.rebuild_group(rollups.result_group(instance))
+    sketches.rebuild_day(sketches.result_day(instance))
+
+
+@receiver(post_save, sender=NetworkIssue)
+def publish_issue_on_save(sender, instance, created, **kwargs):
+    """Yangi/yopilgan hodisa - "top" keshi va jonli oqim (SSE)"""
+    if created or instance.is_resolved:
+        issues.invalidate_top()
+    issue_feed.notify(instance)
+
+
+@receiver(post_delete, sender=NetworkIssue)
+def publish_issue_on_delete(sender, instance, **kwargs):
+    issues.invalidate_top()
+    issue_feed.notify(instance, deleted=True)
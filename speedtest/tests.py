@@ -1,3 +1,777 @@
-from django.test import TestCase
+import gzip
+import ipaddress
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser, User
+from django.core import signing
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from urllib3.exceptions import EmptyPoolError
+
+from .models import (
+    InternetProvider, NetworkIssue, ProviderDailySketch, ProviderLeaderboard, SpeedTestResult,
+    SpeedTestResultArchive,
+)
+from .utils.benchmark import stub_geo_apis
+from .utils.ddsketch import DDSketch
+from .utils.distribution import speed_distribution
+from .utils.geo_utils import CircuitBreaker, IPGeolocation
+from .utils import archive, issues, latency, leaderboard, pagination, sketches
+from .utils.http_client import build_session, http_stats
+from .utils.ingest import ResultIngestor
+from .utils.ip_ranges import IPRangeIndex, build_index
+from .utils.leaderboard import percentile_cont
+from .views import request_metrics
+
+IP = '203.0.113.10'
+
+
+def expire(breaker: CircuitBreaker):
+    """reset_timeout o'tgandek qilish - breaker half-open holatiga o'tadi"""
+    breaker.opened_at = time.monotonic() - breaker.reset_timeout - 1
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    """closed -> open -> half-open -> closed/open o'tishlari"""
+
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+
+    def test_opens_after_threshold_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_success_resets_failure_count(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'closed')
+
+    def test_half_open_allows_single_trial(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        expire(self.breaker)
+
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertTrue(self.breaker.allow())
+        # Sinov tugamaguncha boshqa so'rov o'tkazilmaydi
+        self.assertFalse(self.breaker.allow())
+
+    def test_half_open_success_closes(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        expire(self.breaker)
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, 'closed')
+        self.assertEqual(self.breaker.failures, 0)
+        self.assertTrue(self.breaker.allow())
+
+    def test_half_open_failure_reopens(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        expire(self.breaker)
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, 'open')
+        self.assertFalse(self.breaker.allow())
+
+    def test_release_frees_trial_slot(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+        expire(self.breaker)
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.release()
+        self.assertEqual(self.breaker.state, 'half-open')
+        self.assertTrue(self.breaker.allow())
+
+
+class GeoProviderTests(SimpleTestCase):
+    """IPGeolocation - stub server ustida (tarmoqqa chiqilmaydi)"""
+
+    def setUp(self):
+        self.breakers = {name: CircuitBreaker(failure_threshold=3, reset_timeout=30) for name in IPGeolocation.APIS}
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='geo-hedge-test')
+        self.patch(IPGeolocation, 'BREAKERS', self.breakers)
+        self.patch(IPGeolocation, '_executor', self.executor)
+        # Qaysi API lar haqiqatda chaqirilgani
+        self.calls = self.patch(IPGeolocation, '_call_provider', wraps=IPGeolocation._call_provider)
+        # Fonda tugayotgan yutqazgan so'rovlarni kutish
+        self.addCleanup(self.executor.shutdown, wait=True)
+
+    def patch(self, target, attribute, new=mock.DEFAULT, **kwargs):
+        patcher = mock.patch.object(target, attribute, new, **kwargs)
+        self.addCleanup(patcher.stop)
+        return patcher.start()
+
+    def called(self):
+        return [call.args[0] for call in self.calls.call_args_list]
+
+    def test_sequential_skips_open_breaker_until_trial(self):
+        failing = {'ipapi'}
+        with stub_geo_apis(failing=failing):
+            for _ in range(3):
+                self.assertIsNotNone(IPGeolocation.fetch_sequential(IP))
+            self.assertEqual(self.breakers['ipapi'].state, 'open')
+
+            self.calls.reset_mock()
+            self.assertIsNotNone(IPGeolocation.fetch_sequential(IP))
+            self.assertEqual(self.called(), ['ip-api'])
+
+            # Half-open: bitta sinov so'rovi, muvaffaqiyatli - breaker yopiladi
+            failing.clear()
+            expire(self.breakers['ipapi'])
+            self.calls.reset_mock()
+            self.assertIsNotNone(IPGeolocation.fetch_sequential(IP))
+            self.assertEqual(self.called(), ['ipapi'])
+            self.assertEqual(self.breakers['ipapi'].state, 'closed')
+
+    def test_hedged_fast_primary_does_not_hedge(self):
+        with stub_geo_apis():
+            self.assertIsNotNone(IPGeolocation.fetch_hedged(IP, delay=0.5))
+        self.assertEqual(self.called(), ['ipapi'])
+
+    def test_hedged_backup_wins_over_slow_primary(self):
+        with stub_geo_apis(delay={'ipapi': 1.0}):
+            started = time.monotonic()
+            result = IPGeolocation.fetch_hedged(IP, delay=0.05)
+            elapsed = time.monotonic() - started
+            self.executor.shutdown(wait=True)
+
+        self.assertIsNotNone(result)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self.called(), ['ipapi', 'ip-api'])
+        # Yutqazgan so'rov fonda tugadi va faqat breaker ni yangiladi
+        self.assertEqual(self.breakers['ipapi'].state, 'closed')
+
+    def test_hedged_cancels_queued_loser_and_releases_trial(self):
+        # ipwhois half-open: uning sinov slotini hedge egallaydi
+        for _ in range(3):
+            self.breakers['ipwhois'].record_failure()
+        expire(self.breakers['ipwhois'])
+
+        # Ikkala worker band: ipwhois navbatda qoladi va bekor qilinadi
+        with stub_geo_apis(delay={'ipapi': 1.0, 'ip-api': 0.3}):
+            result = IPGeolocation.fetch_hedged(IP, delay=0.05)
+            self.executor.shutdown(wait=True)
+
+        self.assertIsNotNone(result)
+        self.assertNotIn('ipwhois', self.called())
+        self.assertEqual(self.breakers['ipwhois'].state, 'half-open')
+        self.assertTrue(self.breakers['ipwhois'].allow())
+
+    def test_hedged_returns_none_when_all_fail(self):
+        with stub_geo_apis(failing={'ipapi', 'ip-api', 'ipwhois'}):
+            self.assertIsNone(IPGeolocation.fetch_hedged(IP, delay=0.05))
+        self.assertEqual(sorted(self.called()), ['ip-api', 'ipapi', 'ipwhois'])
+
+    def test_hedged_tail_latency_with_two_slow_providers(self):
+        # Ikki API sekin, uchinchisi tez: ketma-ket ~2 x 0.5 s, hedged ~2 x delay
+        slow = {'ipapi': 0.5, 'ip-api': 0.5}
+        # Har bir API uchun worker (setUp dagi 2 ta worker uchinchisini navbatda ushlaydi)
+        executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix='geo-hedge-tail')
+        self.addCleanup(executor.shutdown, wait=True)
+        self.patch(IPGeolocation, '_executor', executor)
+        with stub_geo_apis(delay=slow, failing={'ipapi', 'ip-api'}):
+            started = time.monotonic()
+            self.assertIsNotNone(IPGeolocation.fetch_sequential(IP))
+            sequential = time.monotonic() - started
+
+            started = time.monotonic()
+            self.assertIsNotNone(IPGeolocation.fetch_hedged(IP, delay=0.05))
+            hedged = time.monotonic() - started
+            executor.shutdown(wait=True)
+
+        self.assertGreaterEqual(sequential, 1.0)
+        self.assertLess(hedged, 0.4)
+
+    def test_hedged_skips_open_breaker_without_waiting(self):
+        for _ in range(3):
+            self.breakers['ipapi'].record_failure()
+        with stub_geo_apis(delay={'ip-api': 0.0}):
+            started = time.monotonic()
+            self.assertIsNotNone(IPGeolocation.fetch_hedged(IP, delay=1.0))
+            self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.called(), ['ip-api'])
+
+    def test_fetch_location_data_modes(self):
+        offline = {'isp': 'Offline ISP'}
+        with stub_geo_apis():
+            with mock.patch.object(IPGeolocation, 'get_info_from_offline_db', return_value=offline):
+                self.assertEqual(IPGeolocation.fetch_location_data(IP), offline)
+            self.assertEqual(self.called(), [])
+
+            with mock.patch.object(IPGeolocation, 'get_info_from_offline_db', return_value=None):
+                with override_settings(GEO_REMOTE_FALLBACK=False):
+                    self.assertIsNone(IPGeolocation.fetch_location_data(IP))
+                self.assertEqual(self.called(), [])
+
+                with override_settings(GEO_HEDGED_REQUESTS=False), \
+                        mock.patch.object(IPGeolocation, 'fetch_hedged') as hedged:
+                    self.assertIsNotNone(IPGeolocation.fetch_location_data(IP))
+                hedged.assert_not_called()
+                self.assertEqual(self.called(), ['ipapi'])
+
+
+def ip_range(network: str, isp: str):
+    net = ipaddress.ip_network(network)
+    return net.version, int(net.network_address), int(net.broadcast_address), {'isp': isp}
+
+
+class IPRangeIndexTests(SimpleTestCase):
+    """Offline indeks: ichma-ich, yonma-yon diapazonlar va topilmagan IP"""
+
+    def build(self, *ranges):
+        fd, path = tempfile.mkstemp(suffix='.idx')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        stats = build_index(ranges, path)
+        index = IPRangeIndex(path)
+        self.addCleanup(index.close)
+        return index, stats
+
+    def isp(self, index, ip):
+        meta = index.find(ip)
+        return meta and meta['isp']
+
+    def test_nested_range_with_same_start(self):
+        index, stats = self.build(ip_range('10.0.0.0/16', 'wide'), ip_range('10.0.0.0/24', 'narrow'))
+        self.assertEqual(self.isp(index, '10.0.0.5'), 'narrow')
+        # /24 tugagach /16 davom etadi
+        self.assertEqual(self.isp(index, '10.0.5.5'), 'wide')
+        self.assertEqual(self.isp(index, '10.0.255.255'), 'wide')
+        self.assertEqual(stats['overlaps'], 1)
+
+    def test_nested_range_inside(self):
+        index, _ = self.build(
+            ip_range('10.0.0.0/16', 'wide'),
+            ip_range('10.0.5.0/24', 'narrow'),
+            ip_range('10.0.5.128/25', 'narrowest'),
+        )
+        self.assertEqual(self.isp(index, '10.0.4.255'), 'wide')
+        self.assertEqual(self.isp(index, '10.0.5.1'), 'narrow')
+        self.assertEqual(self.isp(index, '10.0.5.200'), 'narrowest')
+        self.assertEqual(self.isp(index, '10.0.6.0'), 'wide')
+
+    def test_adjacent_ranges(self):
+        index, stats = self.build(ip_range('10.1.1.0/24', 'second'), ip_range('10.1.0.0/24', 'first'))
+        self.assertEqual(self.isp(index, '10.1.0.255'), 'first')
+        self.assertEqual(self.isp(index, '10.1.1.0'), 'second')
+        self.assertEqual(stats['overlaps'], 0)
+        self.assertEqual(stats['ipv4'], 2)
+
+    def test_miss(self):
+        index, _ = self.build(ip_range('10.0.0.0/24', 'a'), ip_range('10.0.2.0/24', 'b'))
+        self.assertIsNone(index.find('9.255.255.255'))
+        self.assertIsNone(index.find('10.0.1.1'))
+        self.assertIsNone(index.find('10.0.3.0'))
+        self.assertIsNone(index.find('2001:db8::1'))
+        self.assertIsNone(index.find('not-an-ip'))
+
+    def test_ipv6_nested(self):
+        index, _ = self.build(ip_range('2001:db8::/32', 'wide'), ip_range('2001:db8:0:5::/64', 'narrow'))
+        self.assertEqual(self.isp(index, '2001:db8:0:5::1'), 'narrow')
+        self.assertEqual(self.isp(index, '2001:db8:0:6::1'), 'wide')
+        self.assertIsNone(index.find('2001:db9::1'))
+
+
+class HTTPClientTests(SimpleTestCase):
+    """Pool chegarasi va ulanishlarni qayta ishlatish hisoblagichlari"""
+
+    def counters(self):
+        stats = http_stats.snapshot()
+        return stats.get('connections_opened', 0), stats.get('connections_reused', 0)
+
+    def test_keep_alive_connection_is_counted_as_reused(self):
+        session = build_session()
+        self.addCleanup(session.close)
+        with stub_geo_apis() as base:
+            opened, reused = self.counters()
+            for _ in range(3):
+                self.assertEqual(session.get(f'{base}/ipapi/{IP}', timeout=5).status_code, 200)
+        self.assertEqual(self.counters(), (opened + 1, reused + 2))
+
+    @override_settings(GEO_HTTP_POOL_MAXSIZE=1, GEO_HTTP_POOL_BLOCK=True, GEO_HTTP_POOL_TIMEOUT=0.05)
+    def test_pool_size_is_a_hard_limit(self):
+        session = build_session()
+        self.addCleanup(session.close)
+        with stub_geo_apis(delay=0.5) as base, ThreadPoolExecutor(max_workers=2) as executor:
+            slow = executor.submit(session.get, f'{base}/ipapi/{IP}', timeout=5)
+            time.sleep(0.1)
+            # Yagona ulanish band - ikkinchisi ochilmaydi
+            with self.assertRaises(EmptyPoolError):
+                session.get(f'{base}/ipapi/{IP}', timeout=5)
+            self.assertEqual(slow.result().status_code, 200)
+
+
+LOCMEM = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+@override_settings(CACHES=LOCMEM, LATENCY_PROBE_COUNT=5)
+class HTTPLatencyProbeTests(SimpleTestCase):
+    """WebSocket bo'lmaganda (WSGI) ishlatiladigan HTTP ping probe lari"""
+
+    def test_full_train_records_latency(self):
+        for seq in range(5):
+            self.assertIsNone(latency.record_http_probe('t1', seq))
+        summary = latency.record_http_probe('t1', 5)
+        self.assertEqual((summary['sent'], summary['received'], summary['packet_loss']), (5, 5, 0.0))
+        self.assertIsNotNone(summary['ping'])
+
+    def test_missing_probe_counts_as_loss(self):
+        for seq in (0, 1, 3, 4):
+            latency.record_http_probe('t2', seq)
+        summary = latency.record_http_probe('t2', 5)
+        # 1 va 2 ning RTT si o'lchanmaydi (keyingisi kelmadi / o'zi kelmadi)
+        self.assertEqual(summary['received'], 3)
+        self.assertEqual(summary['packet_loss'], 40.0)
+
+    def test_seq_zero_restarts_train(self):
+        latency.record_http_probe('t3', 0)
+        latency.record_http_probe('t3', 1)
+        for seq in range(5):
+            latency.record_http_probe('t3', seq)
+        self.assertEqual(latency.record_http_probe('t3', 5)['received'], 5)
+
+
+class IngestResolveTests(SimpleTestCase):
+    """Partiya uchun joylashuv aniqlash yozish qulfidan tashqarida"""
+
+    def test_lookup_runs_without_write_lock(self):
+        ingestor = ResultIngestor()
+        held = []
+
+        def lookup(ip):
+            held.append(ingestor._write_lock.locked())
+            return {'isp': 'ISP ' + ip, 'city': 'Xiva', 'region': 'Xorazm'}
+
+        items = [(mock.Mock(), '1.1.1.1'), (mock.Mock(), '1.1.1.1'), (mock.Mock(), '2.2.2.2')]
+        with mock.patch('speedtest.utils.ingest.geo_service.lookup', side_effect=lookup), \
+                mock.patch('speedtest.utils.ingest.provider_resolver.resolve',
+                           side_effect=lambda data: data['isp']):
+            results = ingestor._resolve(items)
+
+        # Har bir IP bir marta, qulf ushlanmagan holda
+        self.assertEqual(held, [False, False])
+        self.assertEqual([r.provider for r in results], ['ISP 1.1.1.1', 'ISP 1.1.1.1', 'ISP 2.2.2.2'])
+        self.assertEqual({r.location for r in results}, {'Xiva, Xorazm'})
+
+
+@override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=('10.0.0.5',))
+class MetricsAccessTests(SimpleTestCase):
+    """/metrics/* faqat staff, token yoki ro'yxatdagi IP uchun"""
+
+    def get(self, remote_addr='203.0.113.7', **extra):
+        request = RequestFactory().get('/metrics/requests/', REMOTE_ADDR=remote_addr, **extra)
+        request.user = AnonymousUser()
+        return request_metrics(request)
+
+    def test_anonymous_forbidden(self):
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        # Proksi sarlavhasi allow-list dan o'tkazmaydi
+        self.assertEqual(self.get(HTTP_X_FORWARDED_FOR='10.0.0.5').status_code, 403)
+
+    def test_token_and_allowed_ip(self):
+        self.assertEqual(self.get(HTTP_AUTHORIZATION='Bearer s3cret').status_code, 200)
+        self.assertEqual(self.get(remote_addr='10.0.0.5').status_code, 200)
+
+    def test_staff_user(self):
+        request = RequestFactory().get('/metrics/requests/', REMOTE_ADDR='203.0.113.7')
+        request.user = mock.Mock(is_authenticated=True, is_staff=True)
+        self.assertEqual(request_metrics(request).status_code, 200)
+
+
+class DDSketchTests(SimpleTestCase):
+    """Kvantil nisbiy xatosi va birlashtirish"""
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.values = [rng.lognormvariate(3, 1.2) for _ in range(20000)]
+
+    def assert_within_accuracy(self, sketch, values, accuracy):
+        ordered = sorted(values)
+        for q in (0.01, 0.25, 0.5, 0.9, 0.95, 0.99):
+            exact = ordered[int(q * (len(ordered) - 1))]
+            self.assertLessEqual(abs(sketch.quantile(q) - exact), accuracy * exact, q)
+
+    def test_relative_accuracy(self):
+        for accuracy in (0.01, 0.02, 0.05):
+            sketch = DDSketch(accuracy)
+            sketch.extend(self.values)
+            self.assert_within_accuracy(sketch, self.values, accuracy)
+
+    def test_merge_equals_single_sketch(self):
+        whole = DDSketch(0.01)
+        whole.extend(self.values)
+        parts = [DDSketch(0.01) for _ in range(3)]
+        for i, value in enumerate(self.values):
+            parts[i % 3].add(value)
+        merged = DDSketch(0.01)
+        for part in parts:
+            # Bazadagi kabi - ikkilik format orqali
+            merged.merge(DDSketch.from_bytes(part.to_bytes()))
+
+        self.assertEqual(merged.bins, whole.bins)
+        self.assertEqual((merged.count, merged.min, merged.max), (whole.count, whole.min, whole.max))
+        self.assert_within_accuracy(merged, self.values, 0.01)
+
+    def test_zero_and_empty(self):
+        sketch = DDSketch(0.01)
+        self.assertIsNone(sketch.quantile(0.5))
+        sketch.extend([0, 0, 10])
+        self.assertEqual(sketch.quantile(0.5), 0.0)
+        with self.assertRaises(ValueError):
+            sketch.merge(DDSketch(0.02))
+
+
+class ShardedSketchTests(TestCase):
+    """Har bir jarayon kunga o'z qatoriga yozadi, o'qishda birlashtiriladi"""
+
+    def setUp(self):
+        self.provider = InternetProvider.objects.create(name='Test ISP', location='Tashkent', ip_address='10.0.0.1')
+
+    def save_results(self, shard, speeds):
+        with mock.patch.object(sketches, 'worker_shard', return_value=shard):
+            for speed in speeds:
+                SpeedTestResult.objects.create(provider=self.provider, download_speed=speed, upload_speed=speed, ping=10)
+
+    def test_shards_merge_at_read_time(self):
+        self.save_results(1, [10, 20, 30])
+        self.save_results(2, [40, 50])
+        rows = ProviderDailySketch.objects.filter(provider=self.provider)
+        self.assertEqual(sorted(rows.values_list('shard', 'test_count')), [(1, 3), (2, 2)])
+
+        since, until = sketches.last_days(1)
+        merged = sketches.merged(since, until)[self.provider.pk]['download_speed']
+        self.assertEqual(len(merged), 5)
+        self.assertAlmostEqual(merged.quantile(0.5), 30, delta=0.3)
+
+    def test_rebuild_collapses_shards(self):
+        self.save_results(1, [10, 20])
+        self.save_results(3, [30])
+        sketches.rebuild_day((self.provider.pk, '', timezone.localdate()))
+        row = ProviderDailySketch.objects.get(provider=self.provider)
+        self.assertEqual((row.shard, row.test_count), (0, 3))
+
+    def test_merge_conflict_is_not_silent(self):
+        with mock.patch.object(ProviderDailySketch.objects, 'select_for_update', side_effect=IntegrityError):
+            with self.assertRaises(IntegrityError):
+                sketches._merge_into((self.provider.pk, '', timezone.localdate()), sketches._new_day(),
+                                     ProviderDailySketch, shard=0)
+
+
+@override_settings(LEADERBOARD_MIN_TESTS=1, LEADERBOARD_WINDOWS=(('24h', 24), ('7d', 168)))
+class LeaderboardLocationTests(TestCase):
+    """Reyting test qilingan joy bo'yicha: (oyna, joylashuv, provayder)"""
+
+    def setUp(self):
+        self.provider = InternetProvider.objects.create(name='Test ISP', location='Toshkent, Toshkent', ip_address='10.0.0.1')
+        for location, speeds in (('Samarqand, Samarqand', [10, 20]), ('Toshkent, Toshkent', [50]), ('', [70])):
+            for speed in speeds:
+                SpeedTestResult.objects.create(provider=self.provider, location=location,
+                                               download_speed=speed, upload_speed=speed, ping=10)
+
+    def test_rows_per_location(self):
+        self.assertEqual(leaderboard.refresh(), 4)
+        for window in ('24h', '7d'):
+            rows = ProviderLeaderboard.objects.filter(window=window, provider=self.provider)
+            # Joylashuvsiz natija provayder joylashuviga qo'shiladi
+            self.assertEqual(sorted(rows.values_list('location', 'test_count')),
+                             [('Samarqand, Samarqand', 2), ('Toshkent, Toshkent', 2)], window)
+
+    def test_exact_and_sketch_rows_agree(self):
+        exact = leaderboard.window_rows(timezone.now() - timedelta(hours=24))
+        approx = leaderboard.sketch_rows(24, {self.provider.pk: self.provider.location})
+        # Ikki yo'l bir xil guruhlaydi (kvantillar eskizda taxminiy)
+        self.assertEqual({key: row['test_count'] for key, row in exact.items()},
+                         {key: row['test_count'] for key, row in approx.items()})
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset sahifalash: sahifalar, bir xil test_date, buzilgan kursor"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('cursor', password='x')
+        now = timezone.now()
+        # 5 ta natija bir xil vaqtda - tartib id bo'yicha ajraladi
+        times = [now] * 5 + [now - timedelta(minutes=i) for i in range(1, 6)]
+        self.results = [
+            SpeedTestResult.objects.create(user=self.user, download_speed=i, upload_speed=1, ping=1, test_date=at)
+            for i, at in enumerate(times)
+        ]
+        self.expected = [r.pk for r in sorted(self.results, key=lambda r: (r.test_date, r.pk), reverse=True)]
+
+    def queryset(self):
+        return SpeedTestResult.objects.filter(user=self.user)
+
+    def test_pages_cover_all_rows_once(self):
+        seen, token = [], None
+        for _ in range(10):
+            page = pagination.paginate(self.queryset(), token, 3)
+            seen += [r.pk for r in page]
+            if not page.has_next():
+                break
+            token = page.next_cursor
+        self.assertEqual(seen, self.expected)
+
+    def test_second_page_and_back(self):
+        first = pagination.paginate(self.queryset(), None, 4)
+        second = pagination.paginate(self.queryset(), first.next_cursor, 4)
+        # Chegara bir xil test_date li qatorlar ichida
+        self.assertEqual([r.pk for r in second], self.expected[4:8])
+        self.assertTrue(second.has_previous())
+        back = pagination.paginate(self.queryset(), second.previous_cursor, 4)
+        self.assertEqual([r.pk for r in back], self.expected[:4])
+        self.assertFalse(back.has_previous())
+
+    def test_tampered_or_invalid_cursor_starts_over(self):
+        token = pagination.paginate(self.queryset(), None, 4).next_cursor
+        tampered = token[:-2] + ('AA' if not token.endswith('AA') else 'BB')
+        forged = signing.dumps(['sideways', timezone.now().isoformat(), 1], salt='other')
+        for bad in (tampered, 'garbage', forged):
+            self.assertIsNone(pagination.decode_cursor(bad))
+            self.assertEqual([r.pk for r in pagination.paginate(self.queryset(), bad, 4)], self.expected[:4])
+
+    def test_history_ignores_invalid_filters(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/history/', {'date_from': 'abc', 'provider': 'x'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['results']), 10)
+        response = self.client.get('/history/', {'date_to': timezone.localdate().isoformat()})
+        self.assertEqual(len(response.context['results']), 10)
+        self.assertEqual(self.client.get('/history/export/', {'date_from': 'abc'}).status_code, 400)
+
+
+@override_settings(NETWORK_ISSUE_MERGE_MINUTES=60)
+class IssueReportTests(TestCase):
+    """Xabarlarni hodisaga yig'ish (upsert) va birlashtirish oynasi"""
+
+    def setUp(self):
+        self.t0 = timezone.now()
+
+    def report(self, minutes, service='Telegram', severity='medium', issue_type='outage'):
+        return issues.report(service, issue_type, severity, now=self.t0 + timedelta(minutes=minutes))
+
+    def test_reports_within_window_merge(self):
+        first, created = self.report(0)
+        self.assertTrue(created)
+        # Nom farqi (bo'shliq/registr) - o'sha hodisa
+        incident, created = self.report(30, service='  telegram ', severity='high')
+        self.assertFalse(created)
+        self.assertEqual(incident.pk, first.pk)
+        incident, _ = self.report(80, severity='low')
+        self.assertEqual((incident.report_count, incident.severity), (3, 'high'))
+        self.assertEqual(incident.last_reported_at, self.t0 + timedelta(minutes=80))
+        self.assertEqual(NetworkIssue.objects.count(), 1)
+
+    def test_report_after_window_closes_stale_incident(self):
+        old, _ = self.report(0)
+        self.report(10)
+        new, created = self.report(71)
+        self.assertTrue(created)
+        old.refresh_from_db()
+        self.assertTrue(old.is_resolved)
+        self.assertEqual(old.resolved_at, self.t0 + timedelta(minutes=10))
+        self.assertEqual(list(issues.active_incidents()), [new])
+
+    def test_other_issue_type_is_separate(self):
+        self.report(0)
+        _, created = self.report(1, issue_type='slow')
+        self.assertTrue(created)
+        self.assertEqual(issues.active_incidents().count(), 2)
+
+    def test_incident_resolved_concurrently_opens_new_one(self):
+        first, _ = self.report(0)
+        # Boshqa so'rov/admin hodisani yopdi - xato emas, yangi hodisa ochiladi
+        NetworkIssue.objects.filter(pk=first.pk).update(is_resolved=True, resolved_at=self.t0)
+        incident, created = self.report(5)
+        self.assertTrue(created)
+        self.assertNotEqual(incident.pk, first.pk)
+
+
+class MergeDuplicateProvidersMigrationTests(TransactionTestCase):
+    """0017: 0007 dan qolgan NULL kalitli takror provayderlar birlashtiriladi"""
+    before = [('speedtest', '0016_providerdailysketch_shard')]
+    after = [('speedtest', '0017_merge_duplicate_providers')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        # Keyingi testlar uchun oxirgi holatga qaytarish
+        self.migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_duplicates_are_merged_into_oldest(self):
+        apps = self.migrate(self.before)
+        Provider = apps.get_model('speedtest', 'InternetProvider')
+        Result = apps.get_model('speedtest', 'SpeedTestResult')
+        Stats = apps.get_model('speedtest', 'UserDailyStats')
+        Sketch = apps.get_model('speedtest', 'ProviderDailySketch')
+        user = apps.get_model('auth', 'User').objects.create(username='dup')
+        today = timezone.localdate()
+
+        def sketch(*values):
+            built = DDSketch(0.01)
+            built.extend(values)
+            return built.to_bytes()
+
+        def add_day(provider, count, low, high):
+            Stats.objects.create(user=user, provider=provider, date=today, test_count=count,
+                                 sum_download=low + high, min_download=low, max_download=high)
+            Sketch.objects.create(provider=provider, date=today, test_count=2, download_sketch=sketch(low, high),
+                                  upload_sketch=sketch(1, 1), ping_sketch=sketch(5, 5))
+
+        keep = Provider.objects.create(name='Uztelecom', normalized_name='uztelecom', location='T', ip_address='1.1.1.1')
+        dup = Provider.objects.create(name=' UZTELECOM ', location='T', ip_address='1.1.1.2')
+        lone = Provider.objects.create(name='Beeline', location='T', ip_address='1.1.1.3')
+        Result.objects.create(provider=dup, download_speed=10, upload_speed=1, ping=5)
+        add_day(keep, 2, 20, 30)
+        add_day(dup, 2, 10, 40)
+
+        apps = self.migrate(self.after)
+        Provider = apps.get_model('speedtest', 'InternetProvider')
+        self.assertEqual(
+            sorted(Provider.objects.values_list('pk', 'normalized_name')),
+            [(keep.pk, 'uztelecom'), (lone.pk, 'beeline')],
+        )
+        self.assertEqual(apps.get_model('speedtest', 'SpeedTestResult').objects.get().provider_id, keep.pk)
+        stats = apps.get_model('speedtest', 'UserDailyStats').objects.get()
+        self.assertEqual((stats.provider_id, stats.test_count, stats.sum_download, stats.min_download,
+                          stats.max_download), (keep.pk, 4, 100, 10, 40))
+        row = apps.get_model('speedtest', 'ProviderDailySketch').objects.get()
+        self.assertEqual((row.provider_id, row.test_count), (keep.pk, 4))
+        self.assertEqual(len(DDSketch.from_bytes(row.download_sketch)), 4)
+
+
+@override_settings(SPEEDTEST_PERCENTILES=(10, 50, 90, 99))
+class SpeedDistributionTests(TestCase):
+    """Persentillar issiq jadval + arxiv ustida, percentile_cont ta'rifi bilan"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('dist', password='x')
+        rng = random.Random(3)
+        self.hot = [round(rng.uniform(1, 200), 2) for _ in range(37)]
+        self.archived = [round(rng.uniform(1, 200), 2) for _ in range(14)]
+        for speed in self.hot:
+            SpeedTestResult.objects.create(user=self.user, download_speed=speed, upload_speed=1, ping=1)
+        now = timezone.now()
+        SpeedTestResultArchive.objects.bulk_create(
+            SpeedTestResultArchive(id=10_000 + i, test_date=now - timedelta(days=400), user=self.user,
+                                   download_speed=speed, upload_speed=2, ping=1)
+            for i, speed in enumerate(self.archived)
+        )
+
+    def test_union_matches_percentile_cont(self):
+        distribution = speed_distribution(
+            SpeedTestResult.objects.filter(user=self.user),
+            SpeedTestResultArchive.objects.filter(user=self.user),
+        )
+        ordered = sorted(self.hot + self.archived)
+        self.assertEqual(distribution['total'], 51)
+        self.assertEqual(sum(distribution['download_speed']['counts']), 51)
+        for p, value in distribution['download_speed']['percentiles'].items():
+            self.assertAlmostEqual(value, percentile_cont(ordered, p / 100), places=6)
+        # Bir xil qiymatlar: 37 ta 1 va 14 ta 2
+        self.assertEqual(distribution['upload_speed']['percentiles'][50], 1.0)
+        self.assertEqual(distribution['upload_speed']['percentiles'][90], 2.0)
+
+    def test_empty(self):
+        distribution = speed_distribution(SpeedTestResult.objects.none(), SpeedTestResultArchive.objects.none())
+        self.assertEqual(distribution['total'], 0)
+        self.assertEqual(distribution['download_speed']['percentiles'], {10: None, 50: None, 90: None, 99: None})
+
+
+class ArchivedHistoryTests(TestCase):
+    """Arxivga ko'chirilgan natijalar tarix va natija sahifasida qoladi"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('archived', password='x')
+        self.client.force_login(self.user)
+        now = timezone.now()
+        self.results = [
+            SpeedTestResult.objects.create(user=self.user, download_speed=10 + i, upload_speed=1, ping=1,
+                                           test_date=now - timedelta(days=i * 100))
+            for i in range(6)
+        ]
+        # 300, 400 va 500 kunlik natijalar arxivga
+        self.assertEqual(archive.archive_batch(now - timedelta(days=250), 100), 3)
+
+    def test_history_lists_hot_and_archived_rows(self):
+        response = self.client.get('/history/')
+        page = response.context['page_obj']
+        self.assertEqual([r.id for r in page], [r.pk for r in self.results])
+        self.assertEqual([r.is_archived for r in page], [False] * 3 + [True] * 3)
+        self.assertEqual(page.paginator.count, 6)
+
+        # Kursor issiq jadvaldan arxivga o'tadi
+        hot = SpeedTestResult.objects.filter(user=self.user)
+        archived = [SpeedTestResultArchive.objects.filter(user=self.user)]
+        first = pagination.paginate(hot, None, 4, also=archived)
+        second = pagination.paginate(hot, first.next_cursor, 4, also=archived)
+        self.assertEqual([r.id for r in second], [r.pk for r in self.results[4:]])
+
+    def test_archived_result_page(self):
+        url = reverse('test_result', args=[self.results[-1].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['result'].is_archived)
+        self.assertFalse(response.context['can_delete'])
+        self.client.logout()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+class ArchiveToFileTests(TestCase):
+    """Faylga arxivlash: qatorlar faqat tranzaksiya tasdiqlangach faylga tushadi"""
+
+    def setUp(self):
+        old = timezone.now() - timedelta(days=500)
+        for i in range(3):
+            SpeedTestResult.objects.create(download_speed=10 + i, upload_speed=1, ping=1, test_date=old)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'archive.ndjson.gz')
+        self.cutoff = timezone.now() - timedelta(days=400)
+
+    def archived_ids(self):
+        with gzip.open(self.path, 'rt') as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def test_rollback_leaves_no_rows_in_file(self):
+        with mock.patch.object(archive.rollups, 'paused', side_effect=RuntimeError('crash')):
+            with self.captureOnCommitCallbacks(execute=True), self.assertRaises(RuntimeError):
+                archive.archive_batch(self.cutoff, 100, to_file=self.path)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(os.listdir(self.directory), [])
+        self.assertEqual(SpeedTestResult.objects.count(), 3)
+
+        # Qayta urinish - har bir qator faylda bir marta
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(archive.archive_batch(self.cutoff, 100, to_file=self.path), 3)
+        self.assertEqual(len(self.archived_ids()), 3)
+        self.assertEqual(os.listdir(self.directory), ['archive.ndjson.gz'])
+        self.assertEqual(SpeedTestResult.objects.count(), 0)
@@ -10,16 +10,27 @@ urlpatterns = [
 
     # Main
     path('', views.HomeView.as_view(), name='home'),
+    path('home/fragment/', views.HomeFragmentView.as_view(), name='home_fragment'),
     path('test/run/', views.RunTestView.as_view(), name='run_test'),
+    path('test/download/', views.DownloadTestView.as_view(), name='download_test'),
+    path('test/upload/', views.UploadTestView.as_view(), name='upload_test'),
+    path('test/ping/', views.LatencyPingView.as_view(), name='latency_ping'),
+    path('test/pending/<uuid:ingest_id>/', views.TestPendingView.as_view(), name='test_pending'),
     path('test/result/<int:pk>/', views.TestResultView.as_view(), name='test_result'),
     path('test/delete/<int:pk>/', views.DeleteTestView.as_view(), name='delete_test'),
     path('test/feedback/<int:pk>/', views.SubmitFeedbackView.as_view(), name='submit_feedback'),
 
     # History & Stats (Login kerak)
     path('history/', views.ResultsHistoryView.as_view(), name='results_history'),
+    path('history/export/', views.ExportResultsView.as_view(), name='export_results'),
     path('statistics/', views.StatisticsView.as_view(), name='statistics'),
+    path('leaderboard/', views.LeaderboardView.as_view(), name='leaderboard'),
 
     # Other
     path('network-issues/', views.NetworkIssuesView.as_view(), name='network_issues'),
     path('about/', views.AboutView.as_view(), name='about'),
+
+    # Metrics
+    path('metrics/geo/', views.geo_metrics, name='geo_metrics'),
+    path('metrics/requests/', views.request_metrics, name='request_metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,306 @@
+# speedtest/utils/anomalies.py
+"""
+Provayderlar degradatsiyasini avtomatik aniqlash (manage.py detect_anomalies)
+
+SpeedTestResult soatlik agregatlari (provayder x soat) bitta GROUP BY bilan
+olinib NumPy matritsalariga yoziladi; detektorlar barcha provayderlar
+ustida birdaniga, vektorlashtirilgan holda ishlaydi:
+
+- mad  - har bir soat o'tgan ANOMALY_BASELINE_DAYS kunning xuddi shu
+         soatlari bilan solishtiriladi (kunlik mavsumiylik hisobga olinadi):
+         median va MAD (median absolute deviation), robust z-ball.
+- ewma - eksponensial siljuvchi o'rtacha va dispersiya (vaqt bo'yicha
+         bitta sikl, har qadamda barcha provayderlar vektori).
+
+Signal turlari: download mediandan keskin past - 'slow'; kutilgan testlar
+soni bor, lekin soat davomida birorta test yo'q - 'outage'.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from typing import Dict, List
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from django.conf import settings
+from django.db.models import Avg, Count
+from django.db.models.functions import TruncHour
+
+from . import issues
+from .geo_utils import provider_key
+
+HOUR = 3600
+# Normal taqsimotda MAD -> standart og'ish
+MAD_SCALE = 1.4826
+# Bir bo'lakdagi oyna elementlari (float32) - ~64 MB
+BASELINE_CHUNK_CELLS = 16 * 1024 * 1024
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+@dataclass
+class Series:
+    """Provayder x soat matritsalari; start - 0-ustun soati (UTC)"""
+    provider_ids: np.ndarray
+    start: datetime
+    download: np.ndarray  # float32, test bo'lmagan soat - NaN
+    counts: np.ndarray    # int32
+
+    @property
+    def hours(self) -> int:
+        return self.download.shape[1]
+
+    def hour_at(self, index: int) -> datetime:
+        return self.start + timedelta(hours=int(index))
+
+
+def hourly_series(start: datetime, end: datetime) -> Series:
+    """[start, end) oralig'idagi (soatgacha yaxlitlangan) soatlik o'rtacha download va testlar soni"""
+    from ..models import SpeedTestResult
+
+    end = end.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    # Kunlik qayta shakllantirish (mad) uchun ustunlar soni 24 ga karrali -
+    # boshlanish orqaga suriladi (oxirgi ustun doim end dan oldingi soat)
+    days = -(-int((end - start).total_seconds()) // (24 * HOUR))
+    hours = days * 24
+    start = end - timedelta(hours=hours)
+
+    rows = (
+        SpeedTestResult.objects
+        .filter(test_date__gte=start, test_date__lt=end, provider__isnull=False)
+        .annotate(hour=TruncHour('test_date', tzinfo=dt_timezone.utc))
+        .values_list('provider_id', 'hour')
+        .annotate(download=Avg('download_speed'), tests=Count('id'))
+        .order_by()
+    )
+    provider_col, hour_col, download_col, count_col = [], [], [], []
+    for provider_id, hour, download, tests in rows.iterator(chunk_size=10_000):
+        provider_col.append(provider_id)
+        hour_col.append(hour.timestamp())
+        download_col.append(download)
+        count_col.append(tests)
+
+    provider_ids, row_index = np.unique(np.array(provider_col, dtype=np.int64), return_inverse=True)
+    col_index = ((np.array(hour_col) - start.timestamp()) // HOUR).astype(np.int64)
+
+    download = np.full((len(provider_ids), hours), np.nan, dtype=np.float32)
+    counts = np.zeros((len(provider_ids), hours), dtype=np.int32)
+    download[row_index, col_index] = np.array(download_col, dtype=np.float32)
+    counts[row_index, col_index] = np.array(count_col, dtype=np.int32)
+    return Series(provider_ids, start, download, counts)
+
+
+def _nan_median(values: np.ndarray, axis: int = -1):
+    """NaN larni hisobga olmagan median (np.nanmedian dan ancha tez): (median, n)"""
+    ordered = np.sort(values, axis=axis)  # NaN lar oxiriga
+    n = np.sum(~np.isnan(values), axis=axis)
+    low = np.expand_dims(np.maximum(n - 1, 0) // 2, axis)
+    high = np.expand_dims(n // 2, axis)
+    median = (np.take_along_axis(ordered, low, axis) + np.take_along_axis(ordered, high, axis)) / 2
+    median = np.squeeze(median, axis)
+    return np.where(n > 0, median, np.nan), n
+
+
+def seasonal_baseline(matrix: np.ndarray, days: int, mad: bool = True):
+    """
+    Har bir soat uchun oldingi `days` kunning shu soatidagi median, MAD va
+    kuzatuvlar soni. Dastlabki `days` kun uchun NaN
+    """
+    providers, hours = matrix.shape
+    by_day = matrix.reshape(providers, hours // 24, 24)
+    median = np.full(by_day.shape, np.nan, dtype=np.float32)
+    spread = np.full(by_day.shape, np.nan, dtype=np.float32)
+    observed = np.zeros(by_day.shape, dtype=np.int32)
+    if by_day.shape[1] <= days:
+        return median.reshape(providers, hours), spread.reshape(providers, hours), observed.reshape(providers, hours)
+
+    # windows[:, d, h, :] - d..d+days-1 kunlar; d+days kun uchun bazaviy.
+    # Xotira chegaralangan bo'lishi uchun kunlar bo'laklab
+    windows = sliding_window_view(by_day[:, :-1], days, axis=1)
+    chunk = max(1, BASELINE_CHUNK_CELLS // max(providers * 24 * days, 1))
+    for first in range(0, windows.shape[1], chunk):
+        part = windows[:, first:first + chunk]
+        target = slice(days + first, days + first + part.shape[1])
+        base_median, n = _nan_median(part)
+        median[:, target] = base_median
+        observed[:, target] = n
+        if mad:
+            deviation = np.abs(part - base_median[..., np.newaxis])
+            hourly = MAD_SCALE * _nan_median(deviation)[0]
+            # 14 ta kuzatuvdan MAD beqaror - kunning soatlari bo'yicha
+            # medianidan kichik bo'lmasin
+            pooled = _nan_median(hourly)[0][..., np.newaxis]
+            spread[:, target] = np.fmax(hourly, pooled)
+    return median.reshape(providers, hours), spread.reshape(providers, hours), observed.reshape(providers, hours)
+
+
+def ewma_baseline(matrix: np.ndarray, alpha: float):
+    """Har bir soat uchun shu soatgacha bo'lgan EWMA o'rtacha va standart og'ish"""
+    providers, hours = matrix.shape
+    mean = np.full((providers, hours), np.nan, dtype=np.float32)
+    std = np.full((providers, hours), np.nan, dtype=np.float32)
+    observed = np.zeros((providers, hours), dtype=np.int32)
+
+    current_mean = np.full(providers, np.nan, dtype=np.float64)
+    current_var = np.zeros(providers, dtype=np.float64)
+    seen = np.zeros(providers, dtype=np.int32)
+    for t in range(hours):
+        mean[:, t] = current_mean
+        std[:, t] = np.sqrt(current_var)
+        observed[:, t] = seen
+
+        x = matrix[:, t]
+        has = ~np.isnan(x)
+        first = has & (seen == 0)
+        current_mean[first] = x[first]
+        update = has & ~first
+        diff = x[update] - current_mean[update]
+        increment = alpha * diff
+        current_mean[update] += increment
+        current_var[update] = (1 - alpha) * (current_var[update] + diff * increment)
+        seen += has
+    return mean, std, observed
+
+
+@dataclass
+class Detection:
+    provider_id: int
+    issue_type: str
+    severity: str
+    started: datetime
+    last: datetime
+    score: float
+    ongoing: bool
+
+    @property
+    def hours(self) -> int:
+        return int((self.last - self.started).total_seconds()) // HOUR + 1
+
+
+def _slow_severity(score: np.ndarray) -> np.ndarray:
+    return np.select([score >= 6, score >= 4.5], [2, 1], default=0)
+
+
+def _outage_severity(expected: np.ndarray) -> np.ndarray:
+    return np.select([expected >= 20, expected >= 10], [2, 1], default=0)
+
+
+SEVERITIES = ('low', 'medium', 'high')
+
+
+def detect(series: Series, evaluate_from: int, method: str = 'mad') -> List[Detection]:
+    """
+    evaluate_from-ustundan boshlab signal bergan soatlar; ketma-ket soatlar
+    bitta hodisaga birlashtiriladi (eng yuqori jiddiylik bilan)
+    """
+    days = _setting('ANOMALY_BASELINE_DAYS', 14)
+    threshold = _setting('ANOMALY_THRESHOLD', 3.5)
+    min_samples = _setting('ANOMALY_MIN_SAMPLES', 3)
+    min_expected = _setting('ANOMALY_OUTAGE_MIN_EXPECTED', 5)
+    min_hours = _setting('ANOMALY_MIN_HOURS', 2)
+
+    download = np.where(series.counts >= min_samples, series.download, np.nan)
+    if method == 'ewma':
+        center, spread, observed = ewma_baseline(download, _setting('ANOMALY_EWMA_ALPHA', 0.1))
+        expected, _, _ = ewma_baseline(series.counts.astype(np.float32), _setting('ANOMALY_EWMA_ALPHA', 0.1))
+        enough = observed >= days
+    else:
+        center, spread, observed = seasonal_baseline(download, days)
+        expected, _, _ = seasonal_baseline(series.counts.astype(np.float32), days, mad=False)
+        enough = observed >= max(days // 2, 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # Juda barqaror qatorda MAD ~ 0 - medianning 5% dan kichik og'ish hisoblanmaydi
+        scale = np.fmax(spread, 0.05 * center)
+        score = (center - download) / scale
+        slow = enough & (score >= threshold)
+        outage = (series.counts == 0) & (expected >= min_expected)
+
+    slow[:, :evaluate_from] = False
+    outage[:, :evaluate_from] = False
+
+    levels = {
+        'slow': (slow, _slow_severity(np.nan_to_num(score)), np.nan_to_num(score)),
+        'outage': (outage, _outage_severity(np.nan_to_num(expected)), np.nan_to_num(expected)),
+    }
+    detections = []
+    for issue_type, (fired, severity, strength) in levels.items():
+        for row in np.flatnonzero(fired.any(axis=1)):
+            detections.extend(_runs(series, row, issue_type, fired[row], severity[row], strength[row]))
+    # Bitta soatlik tebranish hodisa emas; davom etayotgani esa kutilmaydi
+    return [
+        detection for detection in detections
+        if detection.ongoing or detection.hours >= min_hours
+    ]
+
+
+def _runs(series: Series, row: int, issue_type: str, fired, severity, strength) -> List[Detection]:
+    """Bitta provayder qatoridagi ketma-ket signal soatlari -> hodisalar"""
+    hours = np.flatnonzero(fired)
+    # Soatlar orasida uzilish bo'lgan joylar
+    breaks = np.flatnonzero(np.diff(hours) > 1) + 1
+    detections = []
+    for run in np.split(hours, breaks):
+        detections.append(Detection(
+            provider_id=int(series.provider_ids[row]),
+            issue_type=issue_type,
+            severity=SEVERITIES[int(severity[run].max())],
+            started=series.hour_at(run[0]),
+            last=series.hour_at(run[-1]),
+            score=float(strength[run].max()),
+            ongoing=run[-1] == series.hours - 1,
+        ))
+    return detections
+
+
+def service_name(provider) -> str:
+    return f"{provider.name} ({provider.location})"
+
+
+def record(detections: List[Detection], end: datetime) -> int:
+    """
+    Hodisalarni NetworkIssue ga yozish: davom etayotgani faol hodisaga
+    qo'shiladi (issues.report); tugagani shu faol hodisani yopadi, u bo'lmasa
+    yopiq holda bir marta yoziladi
+    """
+    from ..models import InternetProvider, NetworkIssue
+
+    providers: Dict[int, InternetProvider] = InternetProvider.objects.in_bulk(
+        {detection.provider_id for detection in detections}
+    )
+    created = 0
+    for detection in detections:
+        provider = providers.get(detection.provider_id)
+        if provider is None:
+            continue
+        name = service_name(provider)
+        if detection.ongoing:
+            _, is_new = issues.report(name, detection.issue_type, detection.severity, started=detection.started)
+            created += is_new
+            continue
+
+        resolved_at = min(detection.last + timedelta(hours=1), end)
+        same = NetworkIssue.objects.filter(normalized_service=provider_key(name), issue_type=detection.issue_type)
+        # Oldingi ishga tushirishda ochilgan (davom etayotgan) hodisa - endi tugadi
+        still_open = list(same.filter(is_resolved=False, reported_at__lte=detection.last).values_list('pk', flat=True))
+        if still_open:
+            NetworkIssue.objects.filter(pk__in=still_open, is_resolved=False).update(
+                is_resolved=True, resolved_at=resolved_at,
+            )
+            issues.resolved(NetworkIssue.objects.filter(pk__in=still_open))
+            continue
+        if same.filter(reported_at=detection.started).exists():
+            continue
+        NetworkIssue.objects.create(
+            service_name=name,
+            issue_type=detection.issue_type,
+            severity=detection.severity,
+            reported_at=detection.started,
+            last_reported_at=detection.last,
+            is_resolved=True,
+            resolved_at=resolved_at,
+        )
+        created += 1
+    return created
@@ -0,0 +1,166 @@
+# speedtest/utils/archive.py
+"""
+Eski natijalarni arxivlash (retention)
+
+SpeedTestResult ("issiq" jadval) faqat oxirgi RESULTS_RETENTION_DAYS kunni
+saqlaydi - tarix, statistika va admin so'rovlari shu kichik jadvalda
+ishlaydi. Eskiroq natijalar SpeedTestResultArchive ga (PostgreSQL da oylik
+bo'limlar) yoki siqilgan NDJSON faylga ko'chiriladi. Kerak bo'lganda
+(masalan eksportda) ikkala jadval UNION ALL bilan birlashtiriladi.
+
+Yig'ma jadval (UserDailyStats) arxivlangan natijalarni ham hisoblaydi,
+shuning uchun ko'chirishda u o'zgarmaydi. Faylga ko'chirilgan qatorlar
+bazada qolmaydi - ularning yig'indisi va eskizi FileArchivedDailyStats /
+FileArchivedDailySketch ga qo'shiladi, aks holda shu kunlardagi natija
+tahrirlanganda yoki rebuild_* ishlaganda fayldagi tarix yo'qolar edi.
+Faylga partiya avval vaqtinchalik faylga yoziladi va tranzaksiya
+tasdiqlangach asosiy faylga qo'shiladi.
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import export, rollups, sketches
+
+# Arxiv jadvaliga ko'chiriladigan maydonlar
+FIELDS = (
+    'id', 'test_date', 'user_id', 'session_id', 'provider_id',
+    'download_speed', 'upload_speed', 'ping', 'jitter', 'packet_loss',
+    'connection_type', 'streams', 'ip_address', 'location', 'download_bytes', 'upload_bytes',
+)
+
+
+def retention_days() -> int:
+    return getattr(settings, 'RESULTS_RETENTION_DAYS', 365)
+
+
+def retention_cutoff():
+    return timezone.now() - timedelta(days=retention_days())
+
+
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _next_month(value: datetime) -> datetime:
+    return (value + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(month: datetime) -> str:
+    from ..models import SpeedTestResultArchive
+    return f'{SpeedTestResultArchive._meta.db_table}_y{month.year}m{month.month:02d}'
+
+
+def ensure_partitions(start: datetime, end: datetime):
+    """[start, end] oralig'idagi har bir oy uchun bo'lim (faqat PostgreSQL)"""
+    from ..models import SpeedTestResultArchive
+
+    if connection.vendor != 'postgresql':
+        return
+    table = connection.ops.quote_name(SpeedTestResultArchive._meta.db_table)
+    month = _month_start(start)
+    with connection.cursor() as cursor:
+        while month <= end:
+            following = _next_month(month)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(partition_name(month))} '
+                f'PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)',
+                [month, following],
+            )
+            month = following
+
+
+def archivable(cutoff):
+    """Arxivlanadigan natijalar: cutoff dan eski va fikr-mulohazasi yo'q (CASCADE bilan yo'qolmasin)"""
+    from ..models import SpeedTestResult, UserFeedback
+
+    return SpeedTestResult.objects.filter(test_date__lt=cutoff).exclude(
+        Exists(UserFeedback.objects.filter(result=OuterRef('pk')))
+    )
+
+
+def _write_part(path: str, queryset) -> str:
+    """
+    Partiyani path yonidagi vaqtinchalik faylga gzip a'zosi sifatida yozish.
+    Asosiy faylga faqat tranzaksiya tasdiqlangandan keyin qo'shiladi
+    """
+    fields = export.FIELDS + export.STAFF_FIELDS
+    encoder = export.Encoder('ndjson', fields, compress=True)
+    rows = export.export_rows(queryset, fields)
+    directory, name = os.path.split(os.path.abspath(path))
+    fd, part = tempfile.mkstemp(prefix=f'.{name}.', suffix='.part', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(encoder.encode(rows.iterator()))
+        f.write(encoder.finish())
+        f.flush()
+        os.fsync(f.fileno())
+    return part
+
+
+def _append_part(path: str, part: str):
+    """Tasdiqlangan partiyani faylga qo'shish (gzip ko'p a'zoli faylni o'qiydi)"""
+    with open(part, 'rb') as src, open(path, 'ab') as dst:
+        shutil.copyfileobj(src, dst)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.remove(part)
+
+
+def archive_batch(cutoff, batch_size: int, to_file: str = None) -> int:
+    """
+    Eng eski batch_size ta natijani bitta tranzaksiyada ko'chirish.
+    Ko'chirilganlar sonini qaytaradi (0 - ish tugadi).
+    to_file: qatorlar tranzaksiya tasdiqlangandan keyingina faylga tushadi -
+    bekor qilingan partiya qayta urinishda faylda ikki marta paydo bo'lmaydi
+    """
+    from ..models import SpeedTestResult, SpeedTestResultArchive
+
+    pending = {}
+
+    def publish():
+        _append_part(to_file, pending.pop('part'))
+
+    try:
+        with transaction.atomic():
+            rows = list(
+                archivable(cutoff).order_by('test_date', 'pk').values(*FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0
+            ids = [row['id'] for row in rows]
+            archived = [SpeedTestResultArchive(**row) for row in rows]
+
+            if to_file:
+                pending['part'] = _write_part(to_file, SpeedTestResult.objects.filter(pk__in=ids))
+                transaction.on_commit(publish)
+                # Qayta qurishda xom qatorlar o'rnini bosadi
+                rollups.apply_file_archived(archived)
+                sketches.apply_file_archived(archived)
+            else:
+                ensure_partitions(rows[0]['test_date'], rows[-1]['test_date'])
+                SpeedTestResultArchive.objects.bulk_create(archived)
+
+            # Statistika arxivni ham hisoblaydi - yig'ma jadval qayta hisoblanmaydi
+            with rollups.paused():
+                SpeedTestResult.objects.filter(pk__in=ids).delete()
+    except BaseException:
+        # Bekor qilingan partiya faylga tushmaydi
+        if 'part' in pending:
+            os.remove(pending.pop('part'))
+        raise
+    return len(rows)
+
+
+def with_archive(hot_rows, archive_rows):
+    """
+    Bir xil values_list ustunli ikki so'rovni UNION ALL bilan birlashtirish
+    (yangi natijalar birinchi)
+    """
+    return hot_rows.order_by().union(archive_rows.order_by(), all=True).order_by('-test_date', '-id')
@@ -0,0 +1,165 @@
+# speedtest/utils/benchmark.py
+"""
+Benchmark yordamchilari (manage.py seed_benchmark / benchmark)
+
+Har bir ssenariy bir necha marta ishga tushiriladi; har bir urinish uchun
+vaqt va DB so'rovlar soni yoziladi, natija p50/p99 sifatida JSON ga
+chiqariladi. Geolokatsiya API lari mahalliy HTTP stub bilan almashtiriladi -
+tarmoqqa chiqilmaydi, natijalar takrorlanadi.
+"""
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Set, Union
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+PREFIX = 'bench'
+
+# Uchala API parseri ham qabul qiladigan javob (ipapi, ip-api, ipwhois)
+STUB_PAYLOAD = {
+    'status': 'success',
+    'success': True,
+    'city': 'Toshkent',
+    'region': 'Toshkent',
+    'regionName': 'Toshkent',
+    'country': "O'zbekiston",
+    'country_name': "O'zbekiston",
+    'country_code': 'UZ',
+    'countryCode': 'UZ',
+    'org': 'UZTELECOM',
+    'isp': 'UZTELECOM',
+    'latitude': 41.3,
+    'longitude': 69.24,
+    'lat': 41.3,
+    'lon': 69.24,
+    'timezone': 'Asia/Tashkent',
+}
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank persentil"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class Scenario:
+    """
+    Bitta o'lchanadigan amal.
+    setup() har bir urinishdan oldin (vaqtga kirmaydi), run() o'lchanadi
+    """
+
+    def __init__(self, name: str, run: Callable, setup: Callable = None, check: Callable = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.check = check
+
+    def measure(self, iterations: int, warmup: int) -> Dict:
+        for _ in range(warmup):
+            self._once()
+        durations, queries = [], []
+        for _ in range(iterations):
+            elapsed, count = self._once()
+            durations.append(elapsed * 1000)
+            queries.append(count)
+        return {
+            'iterations': iterations,
+            'p50_ms': round(percentile(durations, 50), 3),
+            'p99_ms': round(percentile(durations, 99), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'queries_p50': percentile(queries, 50),
+            'queries_max': max(queries),
+        }
+
+    def _once(self):
+        arg = self.setup() if self.setup else None
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            result = self.run(arg) if self.setup else self.run()
+            elapsed = time.perf_counter() - started
+        if self.check:
+            self.check(result)
+        return elapsed, len(captured)
+
+
+@contextmanager
+def stub_geo_apis(delay: Union[float, Dict[str, float]] = 0.0, failing: Set[str] = frozenset()):
+    """
+    IPGeolocation.APIS ni mahalliy stub serverga yo'naltirish.
+    delay - barcha API lar uchun yoki {api_nomi: soniya}; failing - 404
+    qaytaradigan API nomlari (to'plam, kontekst ichida o'zgartirish mumkin)
+    """
+    from .geo_utils import IPGeolocation
+
+    body = json.dumps(STUB_PAYLOAD).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            # Yo'l: /<api_nomi>/<ip>
+            name = self.path.split('/')[1]
+            wait = delay.get(name, 0.0) if isinstance(delay, dict) else delay
+            if wait:
+                time.sleep(wait)
+            if name in failing:
+                self.send_response(404)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    original = IPGeolocation.APIS
+    base = f'http://127.0.0.1:{server.server_port}'
+    IPGeolocation.APIS = {name: f'{base}/{name}/{{ip}}' for name in original}
+    try:
+        yield base
+    finally:
+        IPGeolocation.APIS = original
+        server.shutdown()
+        server.server_close()
+
+
+def compare(current: Dict, baseline: Dict, threshold: float, min_delta: float = 0.0) -> List[Dict]:
+    """
+    Ssenariylar bo'yicha nisbatlar. p50 threshold martadan (va kamida
+    min_delta ms ga) sekinlashsa yoki so'rovlar soni oshsa - regression=True
+    """
+    rows = []
+    for name, stats in current['scenarios'].items():
+        base = baseline.get('scenarios', {}).get(name)
+        if not base:
+            continue
+        row = {'scenario': name}
+        for key in ('p50_ms', 'p99_ms'):
+            row[key] = stats[key]
+            row[f'{key}_baseline'] = base[key]
+            row[f'{key}_ratio'] = round(stats[key] / base[key], 3) if base[key] else None
+        row['queries_p50'] = stats['queries_p50']
+        row['queries_p50_baseline'] = base['queries_p50']
+        row['regression'] = bool(
+            (row['p50_ms_ratio'] and row['p50_ms_ratio'] > threshold
+             and stats['p50_ms'] - base['p50_ms'] >= min_delta)
+            or stats['queries_p50'] > base['queries_p50']
+        )
+        rows.append(row)
+    return rows
@@ -0,0 +1,147 @@
+# speedtest/utils/ddsketch.py
+"""
+DDSketch - birlashtiriladigan (mergeable) taxminiy kvantil eskizi
+
+Qiymatlar logarifmik oraliqlarga (bin) bo'linadi: i-bin (gamma^(i-1), gamma^i]
+qiymatlarini sanaydi, gamma = (1 + a) / (1 - a). Har qanday kvantil nisbiy
+xatosi a dan oshmaydi (a=0.01 - 1%). Ikki eskizni birlashtirish - bin
+hisoblarini qo'shish, shuning uchun kunlik eskizlardan ixtiyoriy davr
+uchun eskiz yig'iladi. Manfiy bo'lmagan qiymatlar uchun (tezlik, ping).
+
+Ikkilik format: sarlavha (versiya, a, jami, nol, min, max) va
+(indeks farqi, hisob) juftliklari varint ko'rinishida - bir necha yuz bayt.
+"""
+import math
+import struct
+from typing import Dict, Iterable, Optional
+
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BdQQdd')
+# Bundan kichik qiymatlar "nol" hisoblanadi
+MIN_INDEXABLE = 1e-9
+
+
+def _write_varint(out: bytearray, value: int):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, offset: int):
+    result = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, offset
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value // 2 if not value & 1 else -(value + 1) // 2
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy 0 va 1 orasida bo'lishi kerak")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def __len__(self):
+        return self.count
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index: int) -> float:
+        # Bin o'rtasi - ikki chegaradan nisbiy xato bir xil
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1):
+        value = float(value)
+        if value < MIN_INDEXABLE:
+            self.zero_count += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def extend(self, values: Iterable[float]):
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'DDSketch'):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Turli aniqlikdagi eskizlarni birlashtirib bo'lmaydi")
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """q in [0, 1]; bo'sh eskizda None"""
+        if not self.count:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def to_bytes(self) -> bytes:
+        out = bytearray(HEADER.pack(
+            FORMAT_VERSION, self.relative_accuracy, self.count, self.zero_count,
+            self.min if self.count else 0.0, self.max if self.count else 0.0,
+        ))
+        _write_varint(out, len(self.bins))
+        previous = 0
+        for index in sorted(self.bins):
+            _write_varint(out, _zigzag(index - previous))
+            _write_varint(out, self.bins[index])
+            previous = index
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'DDSketch':
+        data = bytes(data)
+        version, accuracy, count, zero_count, minimum, maximum = HEADER.unpack_from(data)
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Noma'lum eskiz formati: {version}")
+        sketch = cls(accuracy)
+        sketch.count, sketch.zero_count = count, zero_count
+        if count:
+            sketch.min, sketch.max = minimum, maximum
+        size, offset = _read_varint(data, HEADER.size)
+        index = 0
+        for _ in range(size):
+            delta, offset = _read_varint(data, offset)
+            bin_count, offset = _read_varint(data, offset)
+            index += _unzigzag(delta)
+            sketch.bins[index] = bin_count
+        return sketch
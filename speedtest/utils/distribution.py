@@ -0,0 +1,186 @@
+# speedtest/utils/distribution.py
+"""
+Tezlik taqsimoti (gistogramma) va persentillar - ma'lumotlar bazasida
+
+Gistogramma bitta so'rovda hisoblanadi: har bir oraliq uchun
+COUNT(*) FILTER (WHERE ...) ustuni. Arxiv jadvali ham qo'shilsa, oraliqlar
+har jadvaldan alohida olinib yig'iladi.
+
+Persentillar hamma bazada bitta ta'rif bo'yicha - percentile_cont
+(chiziqli interpolyatsiya, leaderboard bilan bir xil) va barcha jadvallar
+UNION ALL ustidan: PostgreSQL da barcha maydon/persentillar bitta
+percentile_cont(...) WITHIN GROUP so'rovida, boshqa bazalarda maydon
+uchun bitta ROW_NUMBER() so'rovi faqat kerakli qatorlarni qaytaradi.
+Qatorlar hech qachon Python ga yuklanmaydi.
+"""
+from typing import Dict, List, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Aggregate, Case, Count, F, FloatField, Q, Value, When
+from django.db.models.lookups import GreaterThanOrEqual
+
+# SpeedTestResult.speed_rating bilan bir xil chegaralar (Mbps, kamayish tartibida)
+DEFAULT_BUCKETS = (
+    (100, "A'lo"),
+    (50, "Yaxshi"),
+    (25, "O'rtacha"),
+    (0, "Past"),
+)
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+class PercentileCont(Aggregate):
+    """PostgreSQL percentile_cont(f) WITHIN GROUP (ORDER BY expr)"""
+    function = 'percentile_cont'
+    template = '%(function)s(%(fraction)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expression, fraction: float, **extra):
+        super().__init__(expression, fraction=float(fraction), **extra)
+
+
+def get_buckets() -> Sequence[Tuple[float, str]]:
+    return getattr(settings, 'SPEEDTEST_SPEED_BUCKETS', DEFAULT_BUCKETS)
+
+
+def get_percentiles() -> Sequence[int]:
+    return getattr(settings, 'SPEEDTEST_PERCENTILES', DEFAULT_PERCENTILES)
+
+
+def rating_for(value: float) -> str:
+    """Qiymat qaysi oraliqqa tushadi (speed_rating uchun)"""
+    buckets = get_buckets()
+    for threshold, label in buckets:
+        if value >= threshold:
+            return label
+    return buckets[-1][1]
+
+
+def rating_case(expression) -> Case:
+    """rating_for ning SQL varianti - annotate(rating=rating_case(...)) uchun"""
+    buckets = list(get_buckets())
+    return Case(
+        *[When(GreaterThanOrEqual(expression, Value(threshold)), then=Value(label))
+          for threshold, label in buckets[:-1]],
+        default=Value(buckets[-1][1]),
+    )
+
+
+def bucket_labels() -> List[str]:
+    """'A'lo (100+)', 'Yaxshi (50-100)', ..., 'Past (<25)'"""
+    buckets = list(get_buckets())
+    labels = []
+    for i, (threshold, label) in enumerate(buckets):
+        if i == 0:
+            labels.append(f'{label} ({threshold:g}+)')
+        elif i == len(buckets) - 1:
+            labels.append(f'{label} (<{buckets[i - 1][0]:g})')
+        else:
+            labels.append(f'{label} ({threshold:g}-{buckets[i - 1][0]:g})')
+    return labels
+
+
+def _bucket_filters(field: str) -> List[Q]:
+    buckets = list(get_buckets())
+    filters = []
+    for i, (threshold, _) in enumerate(buckets):
+        # Eng pastki oraliq 0 dan past (noto'g'ri) qiymatlarni ham qamraydi
+        q = Q(**{f'{field}__gte': threshold}) if i < len(buckets) - 1 else Q()
+        if i > 0:
+            q &= Q(**{f'{field}__lt': buckets[i - 1][0]})
+        filters.append(q)
+    return filters
+
+
+def _union(querysets, fields: Sequence[str]):
+    """Barcha jadvallar UNION ALL: (sql, params), ustunlar v0, v1, ... (fields tartibida)"""
+    columns = [
+        queryset.order_by().values(**{f'v{i}': F(field) for i, field in enumerate(fields)})
+        for queryset in querysets
+    ]
+    union = columns[0].union(*columns[1:], all=True) if len(columns) > 1 else columns[0]
+    return union.query.sql_with_params()
+
+
+def _position(fraction: float, total: int) -> Tuple[float, int, int]:
+    """percentile_cont o'rni: (fraction * (n-1), pastki qator, yuqori qator) - 0 dan"""
+    position = fraction * (total - 1)
+    lower = int(position)
+    return position, lower, min(lower + 1, total - 1)
+
+
+def _percentiles_postgres(querysets, fields: Sequence[str], connection) -> Dict[str, Dict[int, float]]:
+    """Barcha maydon va persentillar - bitta so'rov, UNION ALL ustida percentile_cont"""
+    sql, params = _union(querysets, fields)
+    selects, keys = [], []
+    for i, field in enumerate(fields):
+        for p in get_percentiles():
+            selects.append(f'percentile_cont({float(p) / 100!r}) WITHIN GROUP (ORDER BY v{i})')
+            keys.append((field, p))
+    with connection.cursor() as cursor:
+        cursor.execute(f'SELECT {", ".join(selects)} FROM ({sql}) AS u', params)
+        row = cursor.fetchone()
+
+    result = {field: {} for field in fields}
+    for (field, p), value in zip(keys, row):
+        result[field][p] = float(value)
+    return result
+
+
+def _percentiles_ranked(querysets, fields: Sequence[str], total: int, connection) -> Dict[str, Dict[int, float]]:
+    """
+    Boshqa bazalar: maydon uchun bitta so'rov - ROW_NUMBER() bilan faqat
+    interpolyatsiyaga kerakli qatorlar olinadi (OFFSET siz)
+    """
+    sql, params = _union(querysets, fields)
+    positions = {p: _position(p / 100, total) for p in get_percentiles()}
+    ranks = sorted({rank for _, lower, upper in positions.values() for rank in (lower, upper)})
+    placeholders = ', '.join(['%s'] * len(ranks))
+
+    result = {}
+    for i, field in enumerate(fields):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rn, v FROM (SELECT v{i} AS v, ROW_NUMBER() OVER (ORDER BY v{i}) - 1 AS rn '
+                f'FROM ({sql}) AS u) AS ranked WHERE rn IN ({placeholders})',
+                [*params, *ranks],
+            )
+            at = {rank: float(value) for rank, value in cursor.fetchall()}
+        result[field] = {
+            p: at[lower] + (at[upper] - at[lower]) * (position - lower)
+            for p, (position, lower, upper) in positions.items()
+        }
+    return result
+
+
+def speed_distribution(*querysets, fields: Sequence[str] = ('download_speed', 'upload_speed')) -> Dict:
+    """
+    Har bir maydon uchun gistogramma va persentillar:
+    {'labels': [...], 'download_speed': {'counts': [...], 'percentiles': {50: x, ...}}, ...}
+
+    Bir nechta queryset (masalan SpeedTestResult va SpeedTestResultArchive)
+    bitta to'plam sifatida hisoblanadi: oraliqlar yig'iladi, persentillar
+    UNION ALL ustidan olinadi.
+    """
+    connection = connections[querysets[0].db]
+    aggregates = {'total': Count('id')}
+    for field in fields:
+        for i, q in enumerate(_bucket_filters(field)):
+            aggregates[f'{field}__b{i}'] = Count('id', filter=q)
+
+    rows = [queryset.order_by().aggregate(**aggregates) for queryset in querysets]
+    total = sum(row['total'] for row in rows)
+
+    if not total:
+        percentiles = {field: {p: None for p in get_percentiles()} for field in fields}
+    elif connection.vendor == 'postgresql':
+        percentiles = _percentiles_postgres(querysets, fields, connection)
+    else:
+        percentiles = _percentiles_ranked(querysets, fields, total, connection)
+
+    distribution = {'labels': bucket_labels(), 'total': total}
+    for field in fields:
+        counts = [sum(row[f'{field}__b{i}'] for row in rows) for i in range(len(get_buckets()))]
+        distribution[field] = {'counts': counts, 'percentiles': percentiles[field]}
+    return distribution
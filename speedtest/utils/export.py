@@ -0,0 +1,136 @@
+# speedtest/utils/export.py
+"""
+Test natijalarini CSV / NDJSON ko'rinishida oqim bilan eksport qilish
+
+values_list qatorlari server tomonidagi kursor (.iterator) orqali
+chunk_size bo'yicha o'qiladi va darhol kodlanadi - xotira qator soniga
+bog'liq emas, birinchi bayt so'rov tugashini kutmaydi.
+gzip rejimida har bir bo'lak zlib bilan "uchib" siqiladi.
+"""
+import csv
+import datetime
+import decimal
+import json
+import zlib
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# (values_list maydoni, eksportdagi ustun nomi)
+FIELDS = (
+    ('id', 'id'),
+    ('test_date', 'test_date'),
+    ('provider__name', 'provider'),
+    ('provider__location', 'location'),
+    ('location', 'test_location'),
+    ('download_speed', 'download_mbps'),
+    ('upload_speed', 'upload_mbps'),
+    ('ping', 'ping_ms'),
+    ('jitter', 'jitter_ms'),
+    ('packet_loss', 'packet_loss'),
+    ('connection_type', 'connection_type'),
+    ('streams', 'streams'),
+    ('download_bytes', 'download_bytes'),
+    ('upload_bytes', 'upload_bytes'),
+)
+# Analitika eksporti (barcha foydalanuvchilar) uchun qo'shimcha ustunlar
+STAFF_FIELDS = (
+    ('user_id', 'user_id'),
+    ('ip_address', 'ip_address'),
+)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def get_chunk_size() -> int:
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_rows(queryset, fields):
+    return queryset.order_by('-test_date', '-id').values_list(*[f for f, _ in fields])
+
+
+class _Echo:
+    """csv.writer uchun: yozilgan satrni qaytaradi"""
+
+    def write(self, value):
+        return value
+
+
+def _json_default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} JSON ga o\'tkazilmaydi')
+
+
+class Encoder:
+    """Qatorlarni tanlangan formatda baytlarga aylantirish (ixtiyoriy gzip)"""
+
+    def __init__(self, fmt: str, fields, compress: bool = False):
+        self.fmt = fmt
+        self.columns = [name for _, name in fields]
+        self.writer = csv.writer(_Echo())
+        # wbits=31 - gzip sarlavhasi bilan
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def header(self) -> bytes:
+        if self.fmt == 'csv':
+            return self._out(self.writer.writerow(self.columns).encode())
+        return b''
+
+    def encode(self, rows: Iterable) -> bytes:
+        if self.fmt == 'csv':
+            data = ''.join(self.writer.writerow(row) for row in rows)
+        else:
+            data = ''.join(
+                json.dumps(dict(zip(self.columns, row)), default=_json_default) + '\n'
+                for row in rows
+            )
+        return self._out(data.encode())
+
+    def finish(self) -> bytes:
+        return self.compressor.flush() if self.compressor else b''
+
+    def _out(self, data: bytes) -> bytes:
+        return self.compressor.compress(data) if self.compressor else data
+
+
+def stream(queryset, encoder: Encoder) -> Iterator[bytes]:
+    """WSGI: server tomonidagi kursor bilan sync oqim"""
+    chunk_size = get_chunk_size()
+    yield encoder.header()
+    batch = []
+    for row in queryset.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            chunk = encoder.encode(batch)
+            batch = []
+            if chunk:
+                yield chunk
+    if batch:
+        yield encoder.encode(batch)
+    yield encoder.finish()
+
+
+async def astream(queryset, encoder: Encoder) -> AsyncIterator[bytes]:
+    """
+    ASGI: Django sync iteratorni to'liq o'qib olgani uchun async variant.
+    values_list + aiterator() kursorni async kontekstda ochadi, shuning uchun
+    sync oqimning har bir bo'lagi sync_to_async orqali (bitta oqimda) olinadi.
+    """
+    chunks = stream(queryset, encoder)
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await next_chunk(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close, thread_sensitive=True)()
@@ -0,0 +1,186 @@
+# speedtest/utils/geo_service.py
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from .geo_utils import IPGeolocation
+
+
+class LRUTTLCache:
+    """Jarayon ichidagi LRU + TTL kesh (thread-safe)"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: Optional[float] = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class GeoLocationService:
+    """
+    Ko'p qatlamli geolokatsiya xizmati:
+    xotira (LRU+TTL) -> Django cache -> ResolvedIP jadvali -> tashqi API lar.
+    GEO_CACHE_ALIAS=None bo'lsa Django cache qatlami o'tkazib yuboriladi
+    (umumiy cache DatabaseCache bo'lsa u ResolvedIP oldida ortiqcha jadval)
+    """
+
+    CACHE_KEY_PREFIX = 'geo:ip:'
+    # Local xotirada manfiy natija belgisi (API lar ishlamagan)
+    _MISSING = object()
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'GEO_CACHE_TTL', 60 * 60 * 24)
+        self.negative_ttl = getattr(settings, 'GEO_NEGATIVE_TTL', 300)
+        self.memory = LRUTTLCache(
+            maxsize=getattr(settings, 'GEO_LRU_MAXSIZE', 4096),
+            ttl=self.ttl,
+        )
+        self.cache_alias = getattr(settings, 'GEO_CACHE_ALIAS', 'default')
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+    def _count(self, layer: str, result: str):
+        with self._stats_lock:
+            self.stats[(layer, result)] += 1
+
+    @property
+    def shared_cache(self):
+        return caches[self.cache_alias] if self.cache_alias else None
+
+    def _cache_key(self, ip: str) -> str:
+        return f'{self.CACHE_KEY_PREFIX}{ip}'
+
+    def lookup(self, ip: Optional[str]) -> Dict:
+        """IP manzil bo'yicha joylashuv ma'lumotini olish (keshlangan)"""
+        if IPGeolocation.is_local_ip(ip):
+            return IPGeolocation.get_default_data(ip)
+
+        # 1. Jarayon ichidagi kesh
+        data = self.memory.get(ip)
+        if data is self._MISSING:
+            self._count('memory', 'hit')
+            return IPGeolocation.get_default_data(ip)
+        if data is not None:
+            self._count('memory', 'hit')
+            return data
+        self._count('memory', 'miss')
+
+        # 2. Umumiy Django cache
+        shared = self.shared_cache
+        if shared is not None:
+            data = shared.get(self._cache_key(ip))
+            if data is not None:
+                self._count('django_cache', 'hit')
+                self.memory.set(ip, data)
+                return data
+            self._count('django_cache', 'miss')
+
+        # 3. Ma'lumotlar bazasi
+        data = self._load_from_db(ip)
+        if data is not None:
+            self._count('db', 'hit')
+            self._store_in_caches(ip, data)
+            return data
+        self._count('db', 'miss')
+
+        # 4. Tashqi API lar
+        data = IPGeolocation.fetch_location_data(ip)
+        if data is None:
+            self._count('network', 'error')
+            self.memory.set(ip, self._MISSING, ttl=self.negative_ttl)
+            return IPGeolocation.get_default_data(ip)
+        self._count('network', 'fetch')
+
+        self._save_to_db(ip, data)
+        self._store_in_caches(ip, data)
+        return data
+
+    def _store_in_caches(self, ip: str, data: Dict):
+        self.memory.set(ip, data)
+        shared = self.shared_cache
+        if shared is not None:
+            shared.set(self._cache_key(ip), data, self.ttl)
+
+    def _load_from_db(self, ip: str) -> Optional[Dict]:
+        from ..models import ResolvedIP
+
+        fresh_after = timezone.now() - timedelta(seconds=self.ttl)
+        row = ResolvedIP.objects.filter(
+            ip_address=ip, resolved_at__gte=fresh_after
+        ).values_list('data', flat=True).first()
+        return row
+
+    def _save_to_db(self, ip: str, data: Dict):
+        from ..models import ResolvedIP
+
+        ResolvedIP.objects.update_or_create(
+            ip_address=ip,
+            defaults={'data': data, 'resolved_at': timezone.now()},
+        )
+
+    def invalidate(self, ip: str):
+        """Bitta IP uchun barcha qatlamlarni tozalash"""
+        from ..models import ResolvedIP
+
+        self.memory.delete(ip)
+        if self.shared_cache is not None:
+            self.shared_cache.delete(self._cache_key(ip))
+        ResolvedIP.objects.filter(ip_address=ip).delete()
+
+    def metrics(self) -> str:
+        """Prometheus text formatidagi hit/miss hisoblagichlari"""
+        lines = [
+            '# HELP geo_lookup_total Geolokatsiya so\'rovlari (qatlam va natija bo\'yicha)',
+            '# TYPE geo_lookup_total counter',
+        ]
+        with self._stats_lock:
+            items = sorted(self.stats.items())
+        for (layer, result), value in items:
+            lines.append(f'geo_lookup_total{{layer="{layer}",result="{result}"}} {value}')
+        lines += [
+            '# HELP geo_memory_cache_size Jarayon ichidagi keshdagi IP lar soni',
+            '# TYPE geo_memory_cache_size gauge',
+            f'geo_memory_cache_size {len(self.memory)}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+# Yagona (process-wide) xizmat
+geo_service = GeoLocationService()
@@ -1,7 +1,74 @@
 # speedtest/utils/geo_utils.py
-import requests
+import contextvars
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from typing import Dict, Optional
 
+from .http_client import get_http_session, get_timeout
+
+
+def get_geo_setting(name: str, default):
+    """Django sozlamasini olish (Django sozlanmagan bo'lsa default)"""
+    try:
+        from django.conf import settings
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+class CircuitBreaker:
+    """
+    Ketma-ket xatolardan keyin provayderni vaqtincha o'chirish
+    closed -> (N ta xato) -> open -> (reset_timeout) -> half-open -> 1 ta sinov
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return 'open'
+        return 'half-open'
+
+    def allow(self) -> bool:
+        """So'rov yuborish mumkinmi"""
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def release(self):
+        """Sinov so'rovi yuborilmadi (bekor qilindi) - slotni bo'shatish"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
 
 class IPGeolocation:
     """IP manzil orqali joylashuv va ISP ma'lumotlarini olish"""
@@ -13,13 +80,13 @@ class IPGeolocation:
         'ipwhois': 'https://ipwhois.app/json/{ip}',
     }
 
-    @staticmethod
-    def get_info_from_ipapi(ip: str) -> Optional[Dict]:
+    @classmethod
+    def get_info_from_ipapi(cls, ip: str) -> Optional[Dict]:
         """ipapi.co dan ma'lumot olish (eng aniq)"""
         try:
-            response = requests.get(
-                f'https://ipapi.co/{ip}/json/',
-                timeout=5
+            response = get_http_session().get(
+                cls.APIS['ipapi'].format(ip=ip),
+                timeout=get_timeout()
             )
             if response.status_code == 200:
                 data = response.json()
@@ -40,13 +107,13 @@ class IPGeolocation:
             print(f"ipapi.co error: {e}")
             return None
 
-    @staticmethod
-    def get_info_from_ip_api(ip: str) -> Optional[Dict]:
+    @classmethod
+    def get_info_from_ip_api(cls, ip: str) -> Optional[Dict]:
         """ip-api.com dan ma'lumot olish (backup)"""
         try:
-            response = requests.get(
-                f'http://ip-api.com/json/{ip}',
-                timeout=5
+            response = get_http_session().get(
+                cls.APIS['ip-api'].format(ip=ip),
+                timeout=get_timeout()
             )
             if response.status_code == 200:
                 data = response.json()
@@ -68,13 +135,13 @@ class IPGeolocation:
             print(f"ip-api.com error: {e}")
             return None
 
-    @staticmethod
-    def get_info_from_ipwhois(ip: str) -> Optional[Dict]:
+    @classmethod
+    def get_info_from_ipwhois(cls, ip: str) -> Optional[Dict]:
         """ipwhois.app dan ma'lumot olish (yana bir backup)"""
         try:
-            response = requests.get(
-                f'https://ipwhois.app/json/{ip}',
-                timeout=5
+            response = get_http_session().get(
+                cls.APIS['ipwhois'].format(ip=ip),
+                timeout=get_timeout()
             )
             if response.status_code == 200:
                 data = response.json()
@@ -96,6 +163,159 @@ class IPGeolocation:
             print(f"ipwhois.app error: {e}")
             return None
 
+    # Har bir API uchun circuit breaker
+    BREAKERS = {
+        name: CircuitBreaker(
+            failure_threshold=get_geo_setting('GEO_BREAKER_THRESHOLD', 3),
+            reset_timeout=get_geo_setting('GEO_BREAKER_RESET', 30),
+        )
+        for name in APIS
+    }
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    @classmethod
+    def get_providers(cls):
+        """API lar ustuvorlik tartibida: (nom, metod)"""
+        return [
+            ('ipapi', cls.get_info_from_ipapi),
+            ('ip-api', cls.get_info_from_ip_api),
+            ('ipwhois', cls.get_info_from_ipwhois)
+        ]
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """Hedged so'rovlar uchun umumiy thread pool"""
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=get_geo_setting('GEO_HEDGE_WORKERS', 16),
+                        thread_name_prefix='geo-hedge',
+                    )
+        return cls._executor
+
+    @classmethod
+    def _call_provider(cls, name: str, method, ip: str) -> Optional[Dict]:
+        """API ni chaqirish va natijani circuit breaker ga yozish"""
+        result = method(ip)
+        if result:
+            cls.BREAKERS[name].record_success()
+        else:
+            cls.BREAKERS[name].record_failure()
+        return result
+
+    @classmethod
+    def fetch_sequential(cls, ip: str) -> Optional[Dict]:
+        """API larni birma-bir sinash (ochiq breaker lar o'tkazib yuboriladi)"""
+        for api_name, api_method in cls.get_providers():
+            if not cls.BREAKERS[api_name].allow():
+                continue
+            result = cls._call_provider(api_name, api_method, ip)
+            if result:
+                print(f"✅ Ma'lumot {api_name} dan olindi")
+                return result
+        return None
+
+    @classmethod
+    def fetch_hedged(cls, ip: str, delay: Optional[float] = None) -> Optional[Dict]:
+        """
+        Hedged (poyga) rejimi: birinchi API ga so'rov yuboriladi, javob
+        `delay` soniyada kelmasa yoki xato bo'lsa keyingisi ham ishga tushadi.
+        Birinchi to'g'ri javob qaytariladi, qolganlari bekor qilinadi.
+        """
+        if delay is None:
+            delay = get_geo_setting('GEO_HEDGE_DELAY', 0.3)
+
+        executor = cls.get_executor()
+        waiting = iter(cls.get_providers())
+        pending = {}
+        settled = threading.Event()
+
+        def attempt(api_name: str, api_method) -> Optional[Dict]:
+            # G'olib bo'shatgan worker navbatdagi so'rovni cancel() dan oldin
+            # olib ulguradi - shuning uchun belgi future tugashidan oldin
+            # qo'yiladi va navbatdagi so'rov yuborilmaydi
+            if settled.is_set():
+                cls.BREAKERS[api_name].release()
+                return None
+            result = cls._call_provider(api_name, api_method, ip)
+            if result:
+                settled.set()
+            return result
+
+        def launch_next() -> bool:
+            for api_name, api_method in waiting:
+                if cls.BREAKERS[api_name].allow():
+                    # copy_context - HTTP vaqti joriy so'rov o'lchovlariga yozilsin
+                    future = executor.submit(
+                        contextvars.copy_context().run, attempt, api_name, api_method
+                    )
+                    pending[future] = api_name
+                    return True
+            return False
+
+        has_more = launch_next()
+        while pending:
+            done, _ = wait(
+                pending,
+                timeout=delay if has_more else None,
+                return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                api_name = pending.pop(future)
+                result = future.result()
+                if result:
+                    # Hali boshlanmaganlarini bekor qilish; ishlayotganlari
+                    # fonda tugaydi va faqat breaker holatini yangilaydi
+                    for other, other_name in pending.items():
+                        if other.cancel():
+                            cls.BREAKERS[other_name].release()
+                    print(f"✅ Ma'lumot {api_name} dan olindi (hedged)")
+                    return result
+
+            # Vaqt tugadi yoki javob yaroqsiz - keyingi API ni qo'shish
+            if has_more:
+                has_more = launch_next()
+
+        return None
+
+    @staticmethod
+    def get_info_from_offline_db(ip: str) -> Optional[Dict]:
+        """Local IP diapazon bazasidan ma'lumot olish (tarmoqsiz)"""
+        from .ip_ranges import get_offline_index
+
+        index = get_offline_index()
+        if index is None:
+            return None
+        return index.lookup(ip)
+
+    @staticmethod
+    def is_local_ip(ip: Optional[str]) -> bool:
+        """Local (yoki bo'sh) IP manzilmi"""
+        return not ip or ip in ['127.0.0.1', 'localhost', '::1']
+
+    @classmethod
+    def fetch_location_data(cls, ip: str) -> Optional[Dict]:
+        """
+        Offline baza, keyin API lar (hedged yoki ketma-ket)
+        Hech biri ishlamasa None qaytaradi (default qiymat bermaydi)
+        """
+        from .ip_ranges import remote_fallback_enabled
+
+        # Avval offline baza
+        result = cls.get_info_from_offline_db(ip)
+        if result:
+            return result
+
+        if not remote_fallback_enabled():
+            return None
+
+        if get_geo_setting('GEO_HEDGED_REQUESTS', True):
+            return cls.fetch_hedged(ip)
+        return cls.fetch_sequential(ip)
+
     @classmethod
     def get_location_data(cls, ip: str) -> Dict:
         """
@@ -103,19 +323,12 @@ class IPGeolocation:
         Birinchi muvaffaqiyatli natijani qaytarish
         """
         # Agar local IP bo'lsa, default qiymatlar
-        if ip in ['127.0.0.1', 'localhost', '::1']:
+        if cls.is_local_ip(ip):
             return cls.get_default_data(ip)
 
-        # Har bir API ni sinab ko'rish
-        for api_name, api_method in [
-            ('ipapi', cls.get_info_from_ipapi),
-            ('ip-api', cls.get_info_from_ip_api),
-            ('ipwhois', cls.get_info_from_ipwhois)
-        ]:
-            result = api_method(ip)
-            if result:
-                print(f"✅ Ma'lumot {api_name} dan olindi")
-                return result
+        result = cls.fetch_location_data(ip)
+        if result:
+            return result
 
         # Agar hech narsa ishlamasa, default
         print("⚠️ Hech bir API ishlamadi, default qiymatlar")
@@ -189,6 +402,21 @@ class UzbekistanISPDetector:
         return IPGeolocation.parse_isp_name(isp_string)
 
 
+def canonical_provider_name(isp_string: str) -> str:
+    """ISP stringidan provayderning kanonik nomi"""
+    return UzbekistanISPDetector.identify_provider(isp_string or '') or 'Noma\'lum ISP'
+
+
+def location_name(location_data: Dict) -> str:
+    """'Shahar, Viloyat' - provayder va test natijasi joylashuvi uchun bir xil ko'rinish"""
+    return f"{location_data['city']}, {location_data['region']}"
+
+
+def provider_key(name: str) -> str:
+    """Provayder nomining normallashtirilgan kaliti (unikal indeks uchun)"""
+    return ' '.join((name or '').split()).casefold()
+
+
 # Test uchun
 if __name__ == "__main__":
     test_ips = [
@@ -0,0 +1,158 @@
+# speedtest/utils/http_client.py
+"""
+Tashqi HTTP so'rovlar uchun umumiy (connection pool li) klient
+
+Barcha geolokatsiya so'rovlari shu sessiya orqali o'tadi: keep-alive,
+host bo'yicha cheklangan pool, backoff bilan qayta urinish va ulanishlarni
+qayta ishlatish hisoblagichlari.
+
+GEO_HTTP_POOL_BLOCK=True (standart) da GEO_HTTP_POOL_MAXSIZE qat'iy
+chegara: bo'sh ulanish GEO_HTTP_POOL_TIMEOUT soniya kutiladi, keyin
+EmptyPoolError. False bo'lsa chegara yumshoq - pool to'lganda vaqtinchalik
+ulanish ochiladi va so'rovdan keyin yopiladi.
+"""
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from .instrumentation import record_http
+
+
+class HTTPStats:
+    """So'rovlar, yangi ulanishlar va vaqt hisoblagichlari (thread-safe)"""
+
+    def __init__(self):
+        self.counters = Counter()
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.counters)
+
+
+http_stats = HTTPStats()
+
+
+class _CountingPoolMixin:
+    """
+    Har bir olingan ulanish (qayta urinishlar ham) hisoblanadi: ochiq soketli
+    ulanish - qayta ishlatilgan, soketsizi (yangi yoki uzilgani) - yangi ochiladi
+    """
+
+    def _get_conn(self, timeout=None):
+        if timeout is None:
+            from .geo_utils import get_geo_setting
+            timeout = get_geo_setting('GEO_HTTP_POOL_TIMEOUT', 2)
+        conn = super()._get_conn(timeout=timeout)
+        http_stats.incr('connections_reused' if conn.is_connected else 'connections_opened')
+        return conn
+
+
+class CountingHTTPConnectionPool(_CountingPoolMixin, HTTPConnectionPool):
+    pass
+
+
+class CountingHTTPSConnectionPool(_CountingPoolMixin, HTTPSConnectionPool):
+    pass
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """Yangi ulanishlar va so'rovlarni hisoblaydigan adapter"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().send(request, **kwargs)
+        except Exception:
+            http_stats.incr('errors')
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            http_stats.incr('requests')
+            http_stats.incr('seconds', elapsed)
+            record_http(elapsed)
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_session() -> requests.Session:
+    """Sozlamalar bo'yicha yangi sessiya yaratish"""
+    from .geo_utils import get_geo_setting
+
+    retry = Retry(
+        total=get_geo_setting('GEO_HTTP_RETRIES', 2),
+        read=0,
+        backoff_factor=get_geo_setting('GEO_HTTP_BACKOFF', 0.2),
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        raise_on_status=False,
+    )
+    adapter = PooledHTTPAdapter(
+        # Nechta host uchun pool saqlanadi
+        pool_connections=get_geo_setting('GEO_HTTP_POOL_CONNECTIONS', 10),
+        # Har bir host uchun saqlanadigan ulanishlar soni
+        pool_maxsize=get_geo_setting('GEO_HTTP_POOL_MAXSIZE', 10),
+        pool_block=get_geo_setting('GEO_HTTP_POOL_BLOCK', True),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'netspeed.world/1.0'
+    return session
+
+
+def get_http_session() -> requests.Session:
+    """Jarayon bo'yicha yagona sessiya"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def get_timeout() -> float:
+    from .geo_utils import get_geo_setting
+    return get_geo_setting('GEO_HTTP_TIMEOUT', 5)
+
+
+def metrics() -> str:
+    """Prometheus text formatidagi HTTP klient hisoblagichlari"""
+    stats = http_stats.snapshot()
+    requests_total = stats.get('requests', 0)
+    return '\n'.join([
+        '# HELP geo_http_requests_total Tashqi HTTP so\'rovlar soni',
+        '# TYPE geo_http_requests_total counter',
+        f'geo_http_requests_total {requests_total}',
+        '# HELP geo_http_errors_total Xato bilan tugagan so\'rovlar',
+        '# TYPE geo_http_errors_total counter',
+        f'geo_http_errors_total {stats.get("errors", 0)}',
+        '# HELP geo_http_connections_opened_total Yangi ochilgan TCP/TLS ulanishlar',
+        '# TYPE geo_http_connections_opened_total counter',
+        f'geo_http_connections_opened_total {stats.get("connections_opened", 0)}',
+        '# HELP geo_http_connections_reused_total Qayta ishlatilgan (keep-alive) ulanishlar',
+        '# TYPE geo_http_connections_reused_total counter',
+        f'geo_http_connections_reused_total {stats.get("connections_reused", 0)}',
+        '# HELP geo_http_seconds_total Tashqi so\'rovlarga ketgan umumiy vaqt',
+        '# TYPE geo_http_seconds_total counter',
+        f'geo_http_seconds_total {stats.get("seconds", 0):.6f}',
+    ]) + '\n'
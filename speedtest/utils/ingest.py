@@ -0,0 +1,159 @@
+# speedtest/utils/ingest.py
+"""
+Test natijalarini asinxron yozish
+
+RunTestView natijani chegaralangan navbatga qo'yadi va darhol javob
+qaytaradi. Fon oqimi navbatdan natijalarni partiyalab oladi, joylashuv va
+provayderni partiya ichida bir marta aniqlaydi va bulk_create bilan yozadi.
+Navbat to'lgan bo'lsa natija so'rov ichida sinxron yoziladi (yo'qolmaydi).
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Iterable, List
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import rollups, sketches
+from .geo_service import geo_service
+from .geo_utils import location_name
+from .providers import provider_resolver
+
+logger = logging.getLogger(__name__)
+
+
+class ResultIngestor:
+    """SpeedTestResult lar uchun navbat + fon yozuvchi"""
+
+    def __init__(self):
+        self.queue = queue.Queue(maxsize=getattr(settings, 'INGEST_QUEUE_SIZE', 10000))
+        self.batch_size = getattr(settings, 'INGEST_BATCH_SIZE', 500)
+        self.flush_interval = getattr(settings, 'INGEST_FLUSH_INTERVAL', 0.2)
+        self.stats = Counter()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'INGEST_ASYNC', True)
+
+    def submit(self, result, client_ip: str):
+        """Natijani yozishga topshirish (provayder fon oqimida aniqlanadi)"""
+        if not self.enabled:
+            self.write_batch([(result, client_ip)])
+            return
+
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait((result, client_ip))
+            self.stats['queued'] += 1
+        except queue.Full:
+            self.stats['overflow'] += 1
+            self.write_batch([(result, client_ip)])
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='result-ingest', daemon=True
+                )
+                self._thread.start()
+
+    def _next_batch(self) -> List:
+        """Birinchi element kelguncha kutish, keyin flush_interval ichida partiya yig'ish"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self.write_batch(batch)
+            except Exception:
+                logger.exception("Natijalar partiyasini yozib bo'lmadi")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def _resolve(self, items: List) -> List:
+        """
+        Joylashuv va provayderni aniqlash - partiya ichida har bir IP/ISP bir
+        marta. Tarmoq so'rovlari bo'lishi mumkin, shuning uchun qulfdan tashqarida
+        """
+        locations, providers = {}, {}
+        results = []
+        for result, client_ip in items:
+            if client_ip not in locations:
+                locations[client_ip] = geo_service.lookup(client_ip)
+            location_data = locations[client_ip]
+
+            isp = location_data['isp']
+            if isp not in providers:
+                providers[isp] = provider_resolver.resolve(location_data)
+            result.provider = providers[isp]
+            # Reyting joylashuv bo'yicha - provayder emas, test qilingan joy
+            result.location = location_name(location_data)
+            results.append(result)
+        return results
+
+    def write_batch(self, items: Iterable):
+        """Partiyani bitta tranzaksiyada yozish"""
+        from ..models import SpeedTestResult
+
+        close_old_connections()
+        results = self._resolve(list(items))
+
+        # Qulf faqat yozish uchun: navbat to'lganda so'rov oqimi fon partiyasining
+        # geolokatsiya so'rovlarini kutib qolmaydi
+        with self._write_lock:
+            try:
+                with transaction.atomic():
+                    SpeedTestResult.objects.bulk_create(results, batch_size=self.batch_size)
+                    # bulk_create post_save yubormaydi - yig'ma jadval va eskizlar shu yerda
+                    rollups.apply_results(results)
+                    sketches.apply_results(results)
+            except Exception:
+                # Bitta buzuq qator butun partiyani yo'qotmasligi uchun
+                # (save() dagi post_save signali yig'ma jadval va eskizlarni yangilaydi)
+                logger.exception("bulk_create xatosi, natijalar birma-bir yoziladi")
+                for result in results:
+                    try:
+                        result.pk = None
+                        result.save()
+                        self.stats['written'] += 1
+                    except Exception:
+                        self.stats['failed'] += 1
+                        logger.exception("Natijani yozib bo'lmadi: %s", result.ingest_id)
+                self.stats['batches'] += 1
+                return
+
+            self.stats['written'] += len(results)
+            self.stats['batches'] += 1
+
+    def flush(self, timeout: float = 5.0):
+        """Navbatdagi barcha natijalar yozilishini kutish"""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+ingestor = ResultIngestor()
+atexit.register(ingestor.flush)
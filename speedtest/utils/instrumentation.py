@@ -0,0 +1,187 @@
+# speedtest/utils/instrumentation.py
+"""
+So'rov bo'yicha o'lchovlar: umumiy vaqt, DB so'rovlar soni va vaqti,
+tashqi HTTP (geolokatsiya) vaqti, shablon render vaqti
+
+Joriy so'rov o'lchovlari ContextVar da saqlanadi - sync_to_async va
+(copy_context bilan) thread pool ichida ham shu so'rovga yoziladi.
+Yig'ilgan qiymatlar view bo'yicha gistogrammalarga qo'shiladi va
+Prometheus text formatida beriladi (RequestMetricsMiddleware, /metrics/requests/).
+"""
+import bisect
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from typing import Optional
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+
+DEFAULT_DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class RequestMetrics:
+    """Bitta so'rov davomida yig'iladigan qiymatlar"""
+    __slots__ = ('db_queries', 'db_seconds', 'http_requests', 'http_seconds', 'template_seconds')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.http_requests = 0
+        self.http_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+_current: contextvars.ContextVar[Optional[RequestMetrics]] = contextvars.ContextVar(
+    'request_metrics', default=None
+)
+
+
+def start() -> contextvars.Token:
+    return _current.set(RequestMetrics())
+
+
+def finish(token: contextvars.Token) -> RequestMetrics:
+    metrics = _current.get()
+    _current.reset(token)
+    return metrics
+
+
+def current() -> Optional[RequestMetrics]:
+    return _current.get()
+
+
+# ============================================
+# MANBALAR (DB, HTTP, shablon)
+# ============================================
+def db_execute_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrappers ga qo'shiladi (apps.py, connection_created)"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_seconds += time.perf_counter() - started
+
+
+def install_db_wrapper(sender, connection, **kwargs):
+    """connection_created signali: har bir yangi ulanishga wrapper"""
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+def record_http(seconds: float):
+    """utils/http_client.py dagi adapter chaqiradi"""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.http_requests += 1
+        metrics.http_seconds += seconds
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.template_seconds += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates + render vaqtini o'lchash (settings.TEMPLATES BACKEND)"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+# ============================================
+# GISTOGRAMMALAR
+# ============================================
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound:g}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class MetricsRegistry:
+    """(view, method) bo'yicha gistogrammalar (jarayon ichida, thread-safe)"""
+
+    SERIES = (
+        ('request_duration_seconds', 'So\'rovning umumiy vaqti', 'duration'),
+        ('request_db_queries', 'So\'rov davomidagi DB so\'rovlar soni', 'queries'),
+        ('request_db_seconds', 'DB so\'rovlariga ketgan vaqt', 'duration'),
+        ('request_http_seconds', 'Tashqi HTTP (geolokatsiya) vaqti', 'duration'),
+        ('request_template_seconds', 'Shablon render vaqti', 'duration'),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = defaultdict(dict)
+
+    def _buckets(self, kind: str):
+        if kind == 'queries':
+            return getattr(settings, 'REQUEST_METRICS_QUERY_BUCKETS', DEFAULT_QUERY_BUCKETS)
+        return getattr(settings, 'REQUEST_METRICS_DURATION_BUCKETS', DEFAULT_DURATION_BUCKETS)
+
+    def observe(self, view: str, method: str, status: int, duration: float, metrics: RequestMetrics):
+        values = {
+            'request_duration_seconds': duration,
+            'request_db_queries': metrics.db_queries,
+            'request_db_seconds': metrics.db_seconds,
+            'request_http_seconds': metrics.http_seconds,
+            'request_template_seconds': metrics.template_seconds,
+        }
+        key = (view, method, f'{status // 100}xx')
+        with self._lock:
+            for name, _, kind in self.SERIES:
+                series = self._series[name]
+                if key not in series:
+                    series[key] = Histogram(self._buckets(kind))
+                series[key].observe(values[name])
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, help_text, _ in self.SERIES:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (view, method, status), histogram in sorted(self._series[name].items()):
+                    labels = f'view="{view}",method="{method}",status="{status}"'
+                    lines.extend(histogram.lines(name, labels))
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+registry = MetricsRegistry()
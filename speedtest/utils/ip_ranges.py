@@ -0,0 +1,304 @@
+# speedtest/utils/ip_ranges.py
+"""
+Offline IP diapazon bazasi (IP -> ISP / shahar)
+
+CSV fayldan tartiblangan massivlarga asoslangan binar indeks quriladi va
+mmap orqali o'qiladi. Ichma-ich diapazonlar (masalan /16 ichidagi /24)
+qurishda kesishmaydigan bo'laklarga ajratiladi - eng aniq diapazon g'olib. Qidiruv - butun songa aylantirilgan IPv4/IPv6
+diapazonlari ustida binar qidiruv, tarmoq so'rovisiz.
+"""
+import csv
+import heapq
+import ipaddress
+import json
+import mmap
+import socket
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Optional, Tuple
+
+MAGIC = b'NSIPIDX1'
+# magic, bayt tartibi, IPv4 soni, IPv6 soni, meta JSON uzunligi
+HEADER = struct.Struct('<8s8sQQQ')
+MASK64 = (1 << 64) - 1
+
+META_FIELDS = [
+    'isp', 'city', 'region', 'country', 'country_code',
+    'latitude', 'longitude', 'timezone',
+]
+
+
+def _pad(n: int) -> int:
+    return (8 - n % 8) % 8
+
+
+def _parse_range(row: Dict) -> Tuple[int, int, int]:
+    """CSV qatoridan (versiya, boshlanish, tugash) ni olish"""
+    network = (row.get('network') or '').strip()
+    if network:
+        net = ipaddress.ip_network(network, strict=False)
+        return net.version, int(net.network_address), int(net.broadcast_address)
+
+    start = ipaddress.ip_address(row['start_ip'].strip())
+    end = ipaddress.ip_address(row['end_ip'].strip())
+    if start.version != end.version or int(end) < int(start):
+        raise ValueError(f"Noto'g'ri diapazon: {start} - {end}")
+    return start.version, int(start), int(end)
+
+
+def _parse_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def read_csv_ranges(path) -> Iterable[Tuple[int, int, int, Dict]]:
+    """
+    CSV ni o'qish. Ustunlar: network (CIDR) yoki start_ip,end_ip
+    va isp, city, region, country, country_code, latitude, longitude, timezone
+    """
+    from .geo_utils import UzbekistanISPDetector
+
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            version, start, end = _parse_range(row)
+            isp = (row.get('isp') or '').strip()
+            meta = {
+                'isp': UzbekistanISPDetector.identify_provider(isp) if isp else 'Noma\'lum ISP',
+                'city': (row.get('city') or '').strip() or 'Noma\'lum',
+                'region': (row.get('region') or '').strip() or 'Noma\'lum',
+                'country': (row.get('country') or '').strip() or 'Noma\'lum',
+                'country_code': (row.get('country_code') or '').strip().upper(),
+                'latitude': _parse_float(row.get('latitude')),
+                'longitude': _parse_float(row.get('longitude')),
+                'timezone': (row.get('timezone') or '').strip() or 'Asia/Tashkent',
+            }
+            yield version, start, end, meta
+
+
+def build_index(ranges: Iterable[Tuple[int, int, int, Dict]], output) -> Dict:
+    """Diapazonlardan binar indeks faylini yozish. Statistikani qaytaradi"""
+    meta_list: List[Dict] = []
+    meta_ids: Dict[Tuple, int] = {}
+    v4, v6 = [], []
+    for version, start, end, meta in ranges:
+        key = tuple(meta.get(field) for field in META_FIELDS)
+        meta_id = meta_ids.get(key)
+        if meta_id is None:
+            meta_id = meta_ids[key] = len(meta_list)
+            meta_list.append(dict(zip(META_FIELDS, key)))
+        (v4 if version == 4 else v6).append((start, end, meta_id))
+
+    stats = {'ipv4': 0, 'ipv6': 0, 'overlaps': 0, 'meta': len(meta_list)}
+
+    def flatten(rows):
+        """
+        Ustma-ust tushgan diapazonlarni kesishmaydigan bo'laklarga ajratish:
+        har bir bo'lakda uni qamragan eng tor (aniqroq) diapazon g'olib,
+        teng bo'lsa - CSV da keyinroq kelgani
+        """
+        rows = sorted(
+            (start, end, seq, meta_id) for seq, (start, end, meta_id) in enumerate(rows)
+        )
+        last_end = -1
+        for start, end, _, _ in rows:
+            if start <= last_end:
+                stats['overlaps'] += 1
+            last_end = max(last_end, end)
+
+        points = sorted({start for start, *_ in rows} | {end + 1 for _, end, *_ in rows})
+        result, active, i = [], [], 0
+        for seg_start, next_start in zip(points, points[1:]):
+            while i < len(rows) and rows[i][0] == seg_start:
+                start, end, seq, meta_id = rows[i]
+                heapq.heappush(active, (end - start, -seq, end, meta_id))
+                i += 1
+            # Tugagan diapazonlar (end ham chegara nuqtasi - bo'lakni to'liq qamraydi)
+            while active and active[0][2] < seg_start:
+                heapq.heappop(active)
+            if not active:
+                continue
+            meta_id = active[0][3]
+            if result and result[-1][1] == seg_start - 1 and result[-1][2] == meta_id:
+                result[-1] = (result[-1][0], next_start - 1, meta_id)
+            else:
+                result.append((seg_start, next_start - 1, meta_id))
+        return result
+
+    v4 = flatten(v4)
+    v6 = flatten(v6)
+    stats['ipv4'], stats['ipv6'] = len(v4), len(v6)
+
+    meta_blob = json.dumps(meta_list, ensure_ascii=False).encode('utf-8')
+    with open(output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, sys.byteorder.encode().ljust(8), len(v4), len(v6), len(meta_blob)))
+        sections = [
+            array('I', (r[0] for r in v4)),
+            array('I', (r[1] for r in v4)),
+            array('I', (r[2] for r in v4)),
+            array('Q', (r[0] >> 64 for r in v6)),
+            array('Q', (r[0] & MASK64 for r in v6)),
+            array('Q', (r[1] >> 64 for r in v6)),
+            array('Q', (r[1] & MASK64 for r in v6)),
+            array('I', (r[2] for r in v6)),
+        ]
+        for section in sections:
+            data = section.tobytes()
+            f.write(data)
+            f.write(b'\0' * _pad(len(data)))
+        f.write(meta_blob)
+    return stats
+
+
+class IPRangeIndex:
+    """mmap qilingan IP diapazon indeksi ustida binar qidiruv"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, byteorder, n4, n6, meta_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: IP indeks fayli emas")
+        if byteorder.strip() != sys.byteorder.encode():
+            raise ValueError(f"{self.path}: bayt tartibi mos emas, indeksni qayta quring")
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+
+        def take(fmt, count):
+            nonlocal offset
+            size = count * struct.calcsize(fmt)
+            section = view[offset:offset + size].cast(fmt)
+            offset += size + _pad(size)
+            return section
+
+        self.v4_start = take('I', n4)
+        self.v4_end = take('I', n4)
+        self.v4_meta = take('I', n4)
+        self.v6_start_hi = take('Q', n6)
+        self.v6_start_lo = take('Q', n6)
+        self.v6_end_hi = take('Q', n6)
+        self.v6_end_lo = take('Q', n6)
+        self.v6_meta = take('I', n6)
+        self.meta = json.loads(bytes(view[offset:offset + meta_len]).decode('utf-8'))
+
+    def __len__(self):
+        return len(self.v4_start) + len(self.v6_start_hi)
+
+    def _find_v6(self, n: int) -> Optional[int]:
+        hi_part, lo_part = n >> 64, n & MASK64
+        start_hi, start_lo = self.v6_start_hi, self.v6_start_lo
+        lo, hi = 0, len(start_hi)
+        # bisect_right (hi, lo) juftliklari ustida
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_hi = start_hi[mid]
+            if hi_part < mid_hi or (hi_part == mid_hi and lo_part < start_lo[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        i = lo - 1
+        if i < 0:
+            return None
+        end = (self.v6_end_hi[i] << 64) | self.v6_end_lo[i]
+        return self.v6_meta[i] if n <= end else None
+
+    def find(self, ip: str) -> Optional[Dict]:
+        """IP ni o'z ichiga olgan diapazon meta ma'lumotini topish"""
+        try:
+            # IPv4 uchun tez yo'l (ipaddress obyektini yaratmasdan)
+            n = int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+            version = 4
+        except (OSError, TypeError):
+            try:
+                addr = ipaddress.ip_address(ip)
+            except ValueError:
+                return None
+            n, version = int(addr), addr.version
+
+        if version == 4:
+            i = bisect_right(self.v4_start, n) - 1
+            if i < 0 or n > self.v4_end[i]:
+                return None
+            meta_id = self.v4_meta[i]
+        else:
+            meta_id = self._find_v6(n)
+            if meta_id is None:
+                return None
+        return self.meta[meta_id]
+
+    def lookup(self, ip: str) -> Optional[Dict]:
+        """IPGeolocation formatidagi natija"""
+        meta = self.find(ip)
+        if meta is None:
+            return None
+        return {
+            'ip': ip,
+            'city': meta['city'],
+            'region': meta['region'],
+            'country': meta['country'],
+            'country_code': meta['country_code'] or 'UZ',
+            'isp': meta['isp'],
+            'latitude': meta['latitude'],
+            'longitude': meta['longitude'],
+            'timezone': meta['timezone'],
+            'postal': '',
+            'connection_type': 'Unknown'
+        }
+
+    def close(self):
+        for name in ('v4_start', 'v4_end', 'v4_meta', 'v6_start_hi',
+                     'v6_start_lo', 'v6_end_hi', 'v6_end_lo', 'v6_meta'):
+            getattr(self, name).release()
+        self._mm.close()
+
+
+_index = None
+_index_loaded = False
+_index_lock = threading.Lock()
+
+
+def get_offline_index() -> Optional[IPRangeIndex]:
+    """settings.GEO_OFFLINE_DB dagi indeksni (bir marta) yuklash"""
+    global _index, _index_loaded
+    if _index_loaded:
+        return _index
+
+    with _index_lock:
+        if not _index_loaded:
+            try:
+                from django.conf import settings
+                path = getattr(settings, 'GEO_OFFLINE_DB', None)
+            except Exception:
+                # Django sozlanmagan (masalan, skript sifatida ishga tushirilgan)
+                path = None
+            try:
+                _index = IPRangeIndex(path) if path else None
+            except (OSError, ValueError) as e:
+                print(f"Offline IP bazasini yuklab bo'lmadi: {e}")
+                _index = None
+            _index_loaded = True
+    return _index
+
+
+def reset_offline_index():
+    """Indeks qayta qurilgandan keyin uni qayta yuklashga majburlash"""
+    global _index, _index_loaded
+    with _index_lock:
+        _index = None
+        _index_loaded = False
+
+
+def remote_fallback_enabled() -> bool:
+    """Offline bazada topilmasa tashqi API larga murojaat qilinsinmi"""
+    try:
+        from django.conf import settings
+        return getattr(settings, 'GEO_REMOTE_FALLBACK', True)
+    except Exception:
+        return True
@@ -0,0 +1,262 @@
+# speedtest/utils/issue_feed.py
+"""
+Tarmoq muammolari jonli oqimi - Server-Sent Events (ASGI)
+
+NetworkIssue o'zgarishi (yangi hodisa, report_count o'sishi, yopilish)
+tranzaksiya tasdiqlangach PostgreSQL NOTIFY bilan e'lon qilinadi. Har bir
+worker da bitta LISTEN ulanishi (event loop ichida, thread siz) xabarni
+oladi, SSE baytlariga bir marta kodlaydi va barcha obunachilar navbatiga
+tarqatadi - bitta DB xabari minglab brauzerga yetadi. Yangi ulanishga
+faol hodisalar xotiradagi nusxadan (snapshot) beriladi, DB so'rovisiz.
+
+Boshqa bazalarda (sqlite, dev) LISTEN yo'q - xabar faqat shu jarayon
+ichida signal orqali tarqatiladi.
+
+Ulanish Django stekidan tashqarida ishlaydi (latency WebSocket kabi):
+bo'sh obunachi - bitta navbat va bitta kutayotgan task, thread emas.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, Optional, Set
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+PATH = '/network-issues/live/'
+CHANNEL = 'speedtest_network_issues'
+# Navbatga qo'yiladigan "ulanishni yopish" belgisi
+CLOSE = None
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def serialize(issue) -> Dict:
+    return {
+        'id': issue.pk,
+        'service_name': issue.service_name,
+        'issue_type': issue.issue_type,
+        'issue_type_display': issue.get_issue_type_display(),
+        'severity': issue.severity,
+        'report_count': issue.report_count,
+        'reported_at': issue.reported_at.isoformat(),
+        'last_reported_at': issue.last_reported_at.isoformat(),
+        'is_resolved': issue.is_resolved,
+    }
+
+
+def _uses_listen(alias: str = 'default') -> bool:
+    return connections[alias].vendor == 'postgresql'
+
+
+def notify(issue, deleted: bool = False):
+    """Hodisa o'zgarganini e'lon qilish (tranzaksiya tasdiqlangandan keyin)"""
+    payload = serialize(issue)
+    if deleted:
+        payload['deleted'] = True
+    message = json.dumps(payload, ensure_ascii=False)
+
+    def send():
+        if _uses_listen():
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, message])
+        else:
+            broker.publish_threadsafe(message)
+
+    transaction.on_commit(send)
+
+
+def _encode(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
+class Broker:
+    """Worker ichidagi pub/sub: bitta manba -> ko'p obunachi navbatlari"""
+
+    def __init__(self):
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.incidents: Dict[int, Dict] = {}
+        self._snapshot: Optional[bytes] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    # --- ishga tushirish -------------------------------------------------
+    async def start(self):
+        """Birinchi obunachida: LISTEN, faol hodisalar nusxasi va heartbeat"""
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self._ready = asyncio.Event()
+            self._tasks = [
+                self._loop.create_task(self._run()),
+                self._loop.create_task(self._heartbeat()),
+            ]
+        await self._ready.wait()
+
+    async def _run(self):
+        delay = 1
+        while True:
+            listener = None
+            try:
+                if _uses_listen():
+                    listener = await self._listen()
+                # LISTEN dan keyin o'qiladi - oradagi o'zgarish yo'qolmaydi
+                await self._load_snapshot()
+                self._ready.set()
+                delay = 1
+                if listener is None:
+                    return
+                await listener
+            except Exception:
+                logger.exception("Tarmoq muammolari oqimi: LISTEN ulanishi uzildi")
+            # Qayta ulanguncha o'tkazib yuborilgan o'zgarishlar - snapshot qayta yuklanadi
+            self._ready.set()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 60)
+
+    async def _listen(self) -> asyncio.Future:
+        """Alohida psycopg2 ulanishi; loop.add_reader - NOTIFY kelganda o'qiladi"""
+        wrapper = connections['default']
+        raw = await sync_to_async(wrapper.get_new_connection, thread_sensitive=False)(
+            wrapper.get_connection_params()
+        )
+        raw.autocommit = True
+        with raw.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+
+        closed = self._loop.create_future()
+
+        def on_readable():
+            try:
+                raw.poll()
+            except Exception as exc:
+                self._loop.remove_reader(raw.fileno())
+                raw.close()
+                if not closed.done():
+                    closed.set_exception(exc)
+                return
+            while raw.notifies:
+                self.publish(raw.notifies.pop(0).payload)
+
+        self._loop.add_reader(raw.fileno(), on_readable)
+        return closed
+
+    async def _load_snapshot(self):
+        from . import issues
+
+        limit = _setting('NETWORK_ISSUES_LIVE_SNAPSHOT', 50)
+        rows = await sync_to_async(lambda: [serialize(issue) for issue in issues.active_incidents()[:limit]])()
+        self.incidents = {row['id']: row for row in rows}
+        self._snapshot = None
+        # Qayta ulanishdan keyin mavjud obunachilar ham holatni yangilaydi
+        if self.subscribers:
+            self._fan_out(self.snapshot())
+
+    async def _heartbeat(self):
+        """Bitta taymer barcha ulanishlar uchun: proksilar ulanishni yopmasin"""
+        interval = _setting('NETWORK_ISSUES_LIVE_HEARTBEAT', 20)
+        while True:
+            await asyncio.sleep(interval)
+            self._fan_out(b': ping\n\n')
+
+    # --- tarqatish --------------------------------------------------------
+    def publish_threadsafe(self, message: str):
+        """Sync koddan (signal, thread) - faqat shu jarayonda obunachilar bo'lsa"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.publish, message)
+
+    def publish(self, message: str):
+        try:
+            payload = json.loads(message)
+        except ValueError:
+            return
+        if payload.get('is_resolved') or payload.get('deleted'):
+            self.incidents.pop(payload['id'], None)
+        else:
+            self.incidents[payload['id']] = payload
+        self._snapshot = None
+        self._fan_out(_encode('incident', payload))
+
+    def _fan_out(self, data: bytes):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                # Sekin klient - yopiladi, EventSource qayta ulanib snapshot oladi
+                self.close(queue)
+
+    def close(self, queue: asyncio.Queue):
+        """Obunani bekor qilib, ulanishga yopish belgisini berish"""
+        self.subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(CLOSE)
+
+    def snapshot(self) -> bytes:
+        if self._snapshot is None:
+            latest = sorted(self.incidents.values(), key=lambda row: row['last_reported_at'], reverse=True)
+            self._snapshot = _encode('snapshot', latest[:_setting('NETWORK_ISSUES_LIVE_SNAPSHOT', 50)])
+        return self._snapshot
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=_setting('NETWORK_ISSUES_LIVE_QUEUE', 64))
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self.subscribers.discard(queue)
+
+
+broker = Broker()
+
+
+async def live_feed_app(scope, receive, send):
+    """ASGI HTTP ilovasi: GET /network-issues/live/ - text/event-stream"""
+    if scope['method'] != 'GET':
+        await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await broker.start()
+    queue = broker.subscribe()
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+        broker.close(queue)
+
+    watcher = asyncio.get_running_loop().create_task(wait_disconnect())
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream; charset=utf-8'),
+                (b'cache-control', b'no-cache'),
+                # nginx buferlamasin
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        retry = _setting('NETWORK_ISSUES_LIVE_RETRY_MS', 5000)
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {retry}\n\n'.encode() + broker.snapshot(),
+            'more_body': True,
+        })
+        while True:
+            data = await queue.get()
+            if data is CLOSE:
+                break
+            await send({'type': 'http.response.body', 'body': data, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b''})
+    except OSError:
+        # Klient ketgan
+        pass
+    finally:
+        broker.unsubscribe(queue)
+        watcher.cancel()
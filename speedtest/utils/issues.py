@@ -0,0 +1,123 @@
+# speedtest/utils/issues.py
+"""
+Tarmoq muammolari: xabarlarni hodisalarga yig'ish
+
+Bir xil xizmat (normalized_service) va muammo turi bo'yicha
+NETWORK_ISSUE_MERGE_MINUTES ichida kelgan xabarlar bitta faol hodisaga
+qo'shiladi - yangi qator o'rniga report_count oshiriladi. Faol hodisa
+yagonaligini unikal shart (is_resolved=False) kafolatlaydi, shuning uchun
+parallel xabarlarda ham ikkinchi qator paydo bo'lmaydi.
+"""
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from . import issue_feed
+from .geo_utils import provider_key
+
+SEVERITY_ORDER = ('low', 'medium', 'high')
+TOP_CACHE_KEY = 'speedtest:issues:top'
+
+
+def merge_window() -> timedelta:
+    return timedelta(minutes=getattr(settings, 'NETWORK_ISSUE_MERGE_MINUTES', 120))
+
+
+def active_incidents():
+    """Faol hodisalar, oxirgi xabar bo'yicha (qisman indeks ustida)"""
+    from ..models import NetworkIssue
+
+    return NetworkIssue.objects.filter(is_resolved=False).order_by('-last_reported_at', '-pk')
+
+
+def _escalate(severity: str):
+    """Jiddiylik faqat oshadi: past darajani yangi xabardagi bilan almashtirish"""
+    lower = SEVERITY_ORDER[:SEVERITY_ORDER.index(severity)] if severity in SEVERITY_ORDER else ()
+    return Case(When(severity__in=lower, then=Value(severity)), default=F('severity'))
+
+
+def report(service_name: str, issue_type: str, severity: str,
+           started=None, now=None) -> Tuple[object, bool]:
+    """
+    Xabarni faol hodisaga qo'shish yoki yangi hodisa ochish: (hodisa, yaratildimi).
+    started - yangi hodisaning boshlanish vaqti (standart: now)
+    """
+    from ..models import NetworkIssue
+
+    now = now or timezone.now()
+    key = provider_key(service_name)
+    open_incident = NetworkIssue.objects.filter(
+        normalized_service=key, issue_type=issue_type, is_resolved=False,
+    )
+
+    for _ in range(3):
+        with transaction.atomic():
+            # Faol hodisa qulflanadi - parallel so'rov uni yopsa ham aynan shu qator
+            # yangilanadi va qaytariladi (UPDATE dan keyingi alohida get() o'rniga)
+            incident = open_incident.filter(
+                last_reported_at__gte=now - merge_window(),
+            ).select_for_update().first()
+            if incident is not None:
+                NetworkIssue.objects.filter(pk=incident.pk).update(
+                    report_count=F('report_count') + 1,
+                    last_reported_at=now,
+                    severity=_escalate(severity),
+                )
+                incident.refresh_from_db()
+        if incident is not None:
+            # update() signal yubormaydi - jonli oqimga o'zimiz xabar beramiz
+            issue_feed.notify(incident)
+            return incident, False
+
+        # Oynadan tashqarida qolgan faol hodisa - oxirgi xabar vaqtida yopiladi.
+        # Faqat eskisi: parallel so'rov hozirgina ochgan hodisa yopilmasligi kerak
+        stale = list(
+            open_incident.filter(last_reported_at__lt=now - merge_window()).values_list('pk', flat=True)
+        )
+        if stale:
+            NetworkIssue.objects.filter(pk__in=stale, is_resolved=False).update(
+                is_resolved=True, resolved_at=F('last_reported_at'),
+            )
+            resolved(NetworkIssue.objects.filter(pk__in=stale))
+        try:
+            with transaction.atomic():
+                incident = NetworkIssue.objects.create(
+                    service_name=service_name, issue_type=issue_type, severity=severity,
+                    reported_at=started or now, last_reported_at=now,
+                )
+        except IntegrityError:
+            # Boshqa so'rov hozirgina ochdi - unga qo'shamiz
+            continue
+        return incident, True
+    raise IntegrityError(f"Hodisani yangilab bo'lmadi: {service_name} / {issue_type}")
+
+
+def top_incidents() -> List[Dict]:
+    """Eng ko'p xabar berilgan faol hodisalar (qisqa muddat keshlangan)"""
+    limit = getattr(settings, 'NETWORK_ISSUES_TOP_LIMIT', 5)
+    incidents = cache.get(TOP_CACHE_KEY)
+    if incidents is None:
+        incidents = list(
+            active_incidents().order_by('-report_count', '-last_reported_at').values(
+                'pk', 'service_name', 'issue_type', 'severity', 'report_count', 'last_reported_at',
+            )[:limit]
+        )
+        cache.set(TOP_CACHE_KEY, incidents, getattr(settings, 'NETWORK_ISSUES_TOP_CACHE_SECONDS', 30))
+    return incidents
+
+
+def resolved(queryset):
+    """queryset.update(is_resolved=True) dan keyin: kesh va jonli oqim"""
+    invalidate_top()
+    for incident in queryset:
+        issue_feed.notify(incident)
+
+
+def invalidate_top():
+    """Hodisa ochilganda/yopilganda; hisoblagich o'sishi TTL bilan yangilanadi"""
+    cache.delete(TOP_CACHE_KEY)
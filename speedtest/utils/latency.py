@@ -0,0 +1,152 @@
+# speedtest/utils/latency.py
+"""
+WebSocket orqali ping / jitter / paket yo'qolishini o'lchash (ASGI)
+
+Server vaqt belgili probe lar ketma-ketligini yuboradi, klient ularni
+darhol qaytaradi. RTT server soatida o'lchanadi; jitter RFC 3550
+(6.4.1) formulasi bo'yicha, yo'qolish - qaytmagan seq raqamlaridan.
+
+WebSocket bo'lmasa (WSGI/gunicorn, proksi Upgrade ni o'tkazmasa) klient
+HTTP probe larga o'tadi (record_http_probe): klient GET /test/ping/?seq=N
+ni birin-ketin yuboradi, RTT - N-javob yuborilgandan (N+1)-so'rov
+kelguncha, yana server soatida. Bu yo'lda RTT ga so'rovni qayta ishlash
+(Django stek, cache yozuvi) ham kiradi - WebSocket dan biroz yuqori chiqadi.
+"""
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import measurement
+
+PATH = '/ws/latency/'
+
+
+def summarize(rtts: Dict[int, float], sent: int) -> Dict:
+    """
+    RTT lar (seq -> ms) dan natija: median ping, RFC 3550 jitter, yo'qolish %
+    """
+    received: List[float] = [rtts[seq] for seq in sorted(rtts)]
+    if not received:
+        return {'ping': None, 'jitter': None, 'packet_loss': 100.0, 'sent': sent, 'received': 0}
+
+    # J(i) = J(i-1) + (|D(i-1,i)| - J(i-1)) / 16
+    jitter = 0.0
+    for previous, current in zip(received, received[1:]):
+        jitter += (abs(current - previous) - jitter) / 16
+
+    return {
+        'ping': statistics.median(received),
+        'jitter': jitter,
+        'packet_loss': (sent - len(received)) * 100.0 / sent if sent else 0.0,
+        'sent': sent,
+        'received': len(received),
+    }
+
+
+async def record_latency(token: str, summary: Dict):
+    await cache.aset(
+        measurement.latency_key(token),
+        summary,
+        measurement.get_setting('SPEEDTEST_MEASUREMENT_TTL', 600),
+    )
+
+
+def probe_count() -> int:
+    return getattr(settings, 'LATENCY_PROBE_COUNT', 20)
+
+
+def record_http_probe(token: str, seq: int) -> Optional[Dict]:
+    """
+    HTTP zaxira probe si. seq 0..probe_count() ketma-ket keladi; oxirgisida
+    natija hisoblanib latency_key ga yoziladi va qaytariladi, aks holda None
+    """
+    count = probe_count()
+    state_key = f'{measurement.latency_key(token)}:http'
+    now = time.time()
+    # Worker lar turlicha bo'lishi mumkin - holat umumiy cache da, vaqt - time.time()
+    state = cache.get(state_key) if seq else None
+    state = state or {'rtts': {}, 'last_seq': None, 'last_at': None}
+    if state['last_seq'] is not None and seq == state['last_seq'] + 1:
+        state['rtts'][state['last_seq']] = (now - state['last_at']) * 1000
+
+    ttl = measurement.get_setting('SPEEDTEST_MEASUREMENT_TTL', 600)
+    if seq >= count:
+        summary = summarize(state['rtts'], count)
+        cache.set(measurement.latency_key(token), summary, ttl)
+        cache.delete(state_key)
+        return summary
+
+    state['last_seq'], state['last_at'] = seq, time.time()
+    cache.set(state_key, state, ttl)
+    return None
+
+
+async def latency_probe_app(scope, receive, send):
+    """ASGI WebSocket ilovasi: /ws/latency/?token=..."""
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = query.get('token', [None])[0]
+    if not await measurement.token_belongs_to_session(scope, token):
+        await send({'type': 'websocket.close', 'code': 4403})
+        return
+    await send({'type': 'websocket.accept'})
+
+    count = probe_count()
+    interval = getattr(settings, 'LATENCY_PROBE_INTERVAL', 0.05)
+    timeout = getattr(settings, 'LATENCY_PROBE_TIMEOUT', 2.0)
+
+    sent_at: Dict[int, float] = {}
+    rtts: Dict[int, float] = {}
+
+    async def send_probes():
+        for seq in range(count):
+            sent_at[seq] = time.perf_counter()
+            await send({'type': 'websocket.send', 'text': json.dumps({'seq': seq, 'ts': time.time()})})
+            await asyncio.sleep(interval)
+
+    sender = asyncio.create_task(send_probes())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + count * interval + timeout
+    disconnected = False
+    try:
+        while len(rtts) < count:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(receive(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if event['type'] == 'websocket.disconnect':
+                disconnected = True
+                break
+            if event['type'] != 'websocket.receive':
+                continue
+
+            now = time.perf_counter()
+            try:
+                seq = int(json.loads(event.get('text') or '{}')['seq'])
+            except (ValueError, KeyError, TypeError):
+                continue
+            # Faqat yuborilgan va hali qaytmagan probe lar hisoblanadi
+            if seq in sent_at and seq not in rtts:
+                rtts[seq] = (now - sent_at[seq]) * 1000
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+
+    summary = summarize(rtts, len(sent_at))
+    await record_latency(token, summary)
+
+    if not disconnected:
+        await send({'type': 'websocket.send', 'text': json.dumps({'type': 'result', **summary})})
+        await send({'type': 'websocket.close', 'code': 1000})
@@ -0,0 +1,163 @@
+# speedtest/utils/leaderboard.py
+"""
+Provayderlar reytingi (ProviderLeaderboard)
+
+Har bir oyna (24h/7d/30d), joylashuv va provayder uchun median va p90
+qiymatlar bir marta hisoblanib jadvalga yoziladi - sahifa so'rovi faqat tayyor qatorlarni
+o'qiydi. LEADERBOARD_USE_SKETCHES bo'lsa uzun oynalar (LEADERBOARD_EXACT_MAX_HOURS
+dan katta) kunlik kvantil eskizlarini birlashtirib olinadi (O(kunlar)):
+oyna - bugun bilan birga oxirgi N kalendar kun. Qisqa oynalar (24h) doim
+aniq, siljuvchi - kun boshida ham bo'sh qolmaydi. Aniq qiymatlar: PostgreSQL da bitta guruhlangan so'rovda
+(percentile_cont), boshqa bazalarda provayder bo'yicha tartiblangan
+oqimdan Python da.
+
+Joylashuv - test qilingan joy (SpeedTestResult.location, IP geolokatsiyasi):
+bitta provayder har bir shahar uchun alohida qator oladi. Joylashuvi yozilmagan
+eski natijalar provayderning joylashuviga qo'shiladi.
+"""
+import math
+from datetime import timedelta
+from itertools import groupby
+from typing import Dict, List, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Coalesce, NullIf
+from django.utils import timezone
+
+from . import sketches
+from .distribution import PercentileCont
+
+DEFAULT_WINDOWS = (
+    ('24h', 24),
+    ('7d', 24 * 7),
+    ('30d', 24 * 30),
+)
+METRICS = ('download_speed', 'upload_speed', 'ping')
+FRACTIONS = (('median', 0.5), ('p90', 0.9))
+
+
+def get_windows() -> Sequence[Tuple[str, int]]:
+    """(nom, soatlar) juftliklari"""
+    return getattr(settings, 'LEADERBOARD_WINDOWS', DEFAULT_WINDOWS)
+
+
+def uses_sketches(hours: int) -> bool:
+    return (getattr(settings, 'LEADERBOARD_USE_SKETCHES', True)
+            and hours > getattr(settings, 'LEADERBOARD_EXACT_MAX_HOURS', 48))
+
+
+def describe(hours: int) -> str:
+    """Oyna aslida nimani qamrashi - sahifada ko'rsatish uchun"""
+    if uses_sketches(hours):
+        return f"Bugun bilan birga oxirgi {math.ceil(hours / 24)} kalendar kun"
+    return f"Oxirgi {hours} soat"
+
+
+def _column(metric: str, suffix: str) -> str:
+    # download_speed -> download_median
+    return f"{metric.replace('_speed', '')}_{suffix}"
+
+
+def percentile_cont(ordered: List[float], fraction: float) -> float:
+    """PostgreSQL percentile_cont bilan bir xil (chiziqli interpolyatsiya)"""
+    position = fraction * (len(ordered) - 1)
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+Key = Tuple[int, str]
+
+
+def _area():
+    """Natija joylashuvi; bo'sh bo'lsa (eski natija) provayder joylashuvi"""
+    return Coalesce(NullIf(F('location'), Value('')), F('provider__location'))
+
+
+def _window_rows_postgres(queryset) -> Dict[Key, Dict]:
+    aggregates = {'test_count': Count('pk')}
+    for metric in METRICS:
+        for suffix, fraction in FRACTIONS:
+            aggregates[_column(metric, suffix)] = PercentileCont(metric, fraction)
+    rows = queryset.annotate(area=_area()).values('provider_id', 'area').annotate(**aggregates).order_by()
+    return {(row.pop('provider_id'), row.pop('area')): row for row in rows}
+
+
+def _window_rows_python(queryset) -> Dict[Key, Dict]:
+    rows = {}
+    values = queryset.annotate(area=_area()).order_by('provider_id', 'area').values_list(
+        'provider_id', 'area', *METRICS,
+    )
+    for key, group in groupby(values.iterator(chunk_size=5000), key=lambda row: row[:2]):
+        columns = list(zip(*group))
+        row = {'test_count': len(columns[0])}
+        for i, metric in enumerate(METRICS, start=2):
+            ordered = sorted(float(value) for value in columns[i])
+            for suffix, fraction in FRACTIONS:
+                row[_column(metric, suffix)] = percentile_cont(ordered, fraction)
+        rows[key] = row
+    return rows
+
+
+def sketch_rows(hours: int, provider_locations: Dict[int, str]) -> Dict[Key, Dict]:
+    """Oyna bugun bilan birga oxirgi ceil(soat/24) kalendar kun deb olinadi"""
+    since, until = sketches.last_days(math.ceil(hours / 24))
+    areas = {}
+    for (provider_id, location), merged in sketches.merged(since, until, by_location=True).items():
+        # Joylashuvsiz eski natijalar - provayder joylashuvi (aniq yo'l bilan bir xil)
+        key = (provider_id, location or provider_locations.get(provider_id, ''))
+        if key in areas:
+            for metric in METRICS:
+                areas[key][metric].merge(merged[metric])
+        else:
+            areas[key] = merged
+
+    rows = {}
+    for key, merged in areas.items():
+        row = {'test_count': len(merged[METRICS[0]])}
+        for metric in METRICS:
+            for suffix, fraction in FRACTIONS:
+                row[_column(metric, suffix)] = merged[metric].quantile(fraction)
+        rows[key] = row
+    return rows
+
+
+def window_rows(since) -> Dict[Key, Dict]:
+    """(provider_id, joylashuv) -> {'test_count', 'download_median', ..., 'ping_p90'}"""
+    from ..models import SpeedTestResult
+
+    queryset = SpeedTestResult.objects.filter(test_date__gte=since, provider__isnull=False)
+    if connections[queryset.db].vendor == 'postgresql':
+        return _window_rows_postgres(queryset)
+    return _window_rows_python(queryset)
+
+
+def refresh(now=None) -> int:
+    """Barcha oynalarni qayta hisoblash; yozilgan qatorlar soni"""
+    from ..models import InternetProvider, ProviderLeaderboard
+
+    now = now or timezone.now()
+    min_tests = getattr(settings, 'LEADERBOARD_MIN_TESTS', 5)
+    locations = dict(InternetProvider.objects.values_list('pk', 'location'))
+
+    entries = []
+    for window, hours in get_windows():
+        if uses_sketches(hours):
+            rows = sketch_rows(hours, locations)
+        else:
+            rows = window_rows(now - timedelta(hours=hours))
+        for (provider_id, location), row in rows.items():
+            if row['test_count'] < min_tests or provider_id not in locations:
+                continue
+            entries.append(ProviderLeaderboard(
+                window=window, provider_id=provider_id, location=location,
+                refreshed_at=now, **row,
+            ))
+
+    # O'quvchilar eski yoki yangi to'plamni to'liq ko'radi
+    with transaction.atomic():
+        ProviderLeaderboard.objects.all().delete()
+        ProviderLeaderboard.objects.bulk_create(entries, batch_size=1000)
+    return len(entries)
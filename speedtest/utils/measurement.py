@@ -0,0 +1,298 @@
+# speedtest/utils/measurement.py
+"""
+Server tomonidagi tezlik o'lchovlari
+
+Download uchun oldindan yaratilgan siqilmaydigan (tasodifiy) bufer bir xil
+bytes obyekti sifatida qayta-qayta uzatiladi - so'rov boshiga xotira
+ajratilmaydi. Upload oqimi bo'laklab o'qiladi va tashlab yuboriladi: ASGI
+da to'g'ridan-to'g'ri receive() dan (upload_app), chunki Django ASGI
+handler tanani view dan oldin to'liq vaqtinchalik faylga o'qib oladi.
+Har bir oqim natijasi (baytlar, boshlanish/tugash vaqti) cache ga alohida
+yoziladi; multi rejimda server ularni bitta tezlikka jamlaydi.
+"""
+import json
+import os
+import secrets
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.cache import cache
+
+CHUNK_SIZE = 1024 * 1024  # 1 MiB
+# Siqilmaydigan payload (jarayon boshida bir marta yaratiladi)
+PAYLOAD = os.urandom(CHUNK_SIZE)
+
+DIRECTIONS = ('download', 'upload')
+CACHE_KEY_PREFIX = 'speedtest:measure:'
+SESSION_KEY = 'measurement_token'
+UPLOAD_PATH = '/test/upload/'
+
+
+def get_setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def max_transfer_bytes() -> int:
+    return get_setting('SPEEDTEST_MAX_TRANSFER', 256 * 1024 * 1024)
+
+
+def max_streams() -> int:
+    return get_setting('SPEEDTEST_MAX_STREAMS', 8)
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def get_or_create_token(session) -> str:
+    """Sessiyaga bog'langan o'lchov tokeni"""
+    token = session.get(SESSION_KEY)
+    if not token:
+        token = session[SESSION_KEY] = new_token()
+    return token
+
+
+def _key(token: str, direction: str, stream: int) -> str:
+    return f'{CACHE_KEY_PREFIX}{token}:{direction}:{stream}'
+
+
+def latency_key(token: str) -> str:
+    return f'{CACHE_KEY_PREFIX}{token}:latency'
+
+
+def warmup_seconds() -> float:
+    return get_setting('SPEEDTEST_WARMUP_SECONDS', 0.5)
+
+
+class StreamCounter:
+    """
+    Bitta oqimning bayt hisoblagichi.
+    Warm-up (TCP slow start) davri tugagan paytdagi holat ham eslab qolinadi,
+    shunda tezlik faqat barqaror qismdan hisoblanadi.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.finished = self.started
+        self.bytes = 0
+        self.warm_at = None
+        self.warm_bytes = 0
+        self._warm_deadline = self.started + warmup_seconds()
+
+    def add(self, nbytes: int):
+        now = time.time()
+        if self.warm_at is None and now >= self._warm_deadline:
+            self.warm_at = now
+            self.warm_bytes = self.bytes
+        self.bytes += nbytes
+        self.finished = now
+
+    def as_dict(self) -> Dict:
+        # Oqim warm-up dan oldin tugagan bo'lsa - butun oqim hisobga olinadi
+        warm_at = self.warm_at if self.warm_at is not None else self.started
+        return {
+            'bytes': self.bytes,
+            'started': self.started,
+            'finished': self.finished,
+            'warm_at': warm_at,
+            'warm_bytes': self.warm_bytes if self.warm_at is not None else 0,
+        }
+
+
+def record_stream(token: str, direction: str, stream: int, counter: StreamCounter):
+    """Bitta oqim natijasini saqlash"""
+    if counter.bytes <= 0:
+        return
+    cache.set(
+        _key(token, direction, stream),
+        counter.as_dict(),
+        get_setting('SPEEDTEST_MEASUREMENT_TTL', 600),
+    )
+
+
+async def arecord_stream(token: str, direction: str, stream: int, counter: StreamCounter):
+    if counter.bytes <= 0:
+        return
+    await cache.aset(
+        _key(token, direction, stream),
+        counter.as_dict(),
+        get_setting('SPEEDTEST_MEASUREMENT_TTL', 600),
+    )
+
+
+def stream_payload(size: int, on_finish):
+    """
+    `size` bayt payload ni bo'laklab uzatish.
+    Tugaganda (yoki klient uzilganda) on_finish(counter)
+    """
+    counter = StreamCounter()
+    try:
+        full_chunks, rest = divmod(size, CHUNK_SIZE)
+        for _ in range(full_chunks):
+            yield PAYLOAD
+            counter.add(CHUNK_SIZE)
+        if rest:
+            yield PAYLOAD[:rest]
+            counter.add(rest)
+    finally:
+        on_finish(counter)
+
+
+async def astream_payload(size: int, on_finish):
+    """
+    stream_payload ning ASGI varianti (Django sync iteratorni to'liq o'qib oladi).
+    on_finish - coroutine funksiya (cache DB/Redis da bo'lishi mumkin)
+    """
+    counter = StreamCounter()
+    try:
+        full_chunks, rest = divmod(size, CHUNK_SIZE)
+        for _ in range(full_chunks):
+            yield PAYLOAD
+            counter.add(CHUNK_SIZE)
+        if rest:
+            yield PAYLOAD[:rest]
+            counter.add(rest)
+    finally:
+        await on_finish(counter)
+
+
+def consume_upload(request, limit: int) -> StreamCounter:
+    """So'rov tanasini xotirada saqlamasdan o'qish (WSGI - tana soketdan o'qiladi)"""
+    counter = None
+    received = 0
+    while received < limit:
+        chunk = request.read(min(CHUNK_SIZE, limit - received))
+        if not chunk:
+            break
+        if counter is None:
+            # Vaqt birinchi bo'lak kelganidan boshlab hisoblanadi
+            counter = StreamCounter()
+        counter.add(len(chunk))
+        received += len(chunk)
+    return counter or StreamCounter()
+
+
+async def token_belongs_to_session(scope, token: Optional[str]) -> bool:
+    """Token shu foydalanuvchi sessiyasiga tegishlimi (cookie orqali, Django stekisiz)"""
+    if not token:
+        return False
+
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return False
+
+    engine = import_module(settings.SESSION_ENGINE)
+    session = engine.SessionStore(morsel.value)
+    return await session.aget(SESSION_KEY) == token
+
+
+async def _respond(send, status: int, body: bytes, content_type: bytes = b'text/plain; charset=utf-8'):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', content_type),
+            (b'content-length', str(len(body)).encode()),
+            (b'cache-control', b'no-store'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def upload_app(scope, receive, send):
+    """
+    ASGI HTTP ilovasi: POST /test/upload/?token=...&stream=N.
+    Baytlar receive() dan kelishi bilan sanaladi: vaqt birinchi http.request
+    bo'lagidan more_body=False gacha - tarmoq orqali haqiqiy uzatish
+    """
+    if scope['method'] != 'POST':
+        return await _respond(send, 405, b'')
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    token = query.get('token', [None])[0]
+    try:
+        stream = int(query.get('stream', ['0'])[0])
+    except ValueError:
+        stream = -1
+    if not 0 <= stream < max_streams() or not await token_belongs_to_session(scope, token):
+        return await _respond(send, 400, "Noto'g'ri token".encode())
+
+    limit = max_transfer_bytes()
+    counter = None
+    received = 0
+    while True:
+        event = await receive()
+        if event['type'] == 'http.disconnect':
+            # Klient uzildi - shu paytgacha kelgani saqlanadi
+            break
+        body = event.get('body', b'')
+        if body:
+            if counter is None:
+                counter = StreamCounter()
+            counter.add(len(body))
+            received += len(body)
+        if not event.get('more_body', False) or received >= limit:
+            break
+
+    counter = counter or StreamCounter()
+    await arecord_stream(token, 'upload', stream, counter)
+    await _respond(
+        send, 200,
+        json.dumps({'bytes': counter.bytes, 'seconds': counter.finished - counter.started}).encode(),
+        b'application/json',
+    )
+
+
+def collect(token: Optional[str]) -> Optional[Dict]:
+    """
+    Token bo'yicha barcha oqimlarni yig'ish.
+    Natija: {'download': {'bytes', 'seconds', 'mbps', 'streams'}, 'upload': {...},
+             'latency': {'ping', 'jitter', 'packet_loss', ...}}
+    Biror o'lchov yetishmasa None
+    """
+    if not token:
+        return None
+
+    keys = [_key(token, d, i) for d in DIRECTIONS for i in range(max_streams())]
+    samples = cache.get_many(keys)
+
+    result = {}
+    for direction in DIRECTIONS:
+        streams = [
+            samples[k] for k in keys
+            if k in samples and k.startswith(f'{CACHE_KEY_PREFIX}{token}:{direction}:')
+        ]
+        if not streams:
+            return None
+        total_bytes = sum(s['bytes'] for s in streams)
+        seconds = max(s['finished'] for s in streams) - min(s['started'] for s in streams)
+        # Tezlik warm-up dan keyingi oynadan: barcha oqimlar baytlari yig'indisi
+        measured_bytes = sum(s['bytes'] - s['warm_bytes'] for s in streams)
+        window = max(s['finished'] for s in streams) - min(s['warm_at'] for s in streams)
+        result[direction] = {
+            'bytes': total_bytes,
+            'seconds': max(seconds, 1e-6),
+            'mbps': measured_bytes * 8 / max(window, 1e-6) / 1e6,
+            'streams': len(streams),
+        }
+
+    # Latency: WebSocket probe yoki HTTP zaxira probe lari (utils/latency.py)
+    latency = cache.get(latency_key(token))
+    if latency is None or latency.get('ping') is None:
+        return None
+    result['latency'] = latency
+    return result
+
+
+def clear(token: Optional[str]):
+    if token:
+        keys = [_key(token, d, i) for d in DIRECTIONS for i in range(max_streams())]
+        cache.delete_many(keys + [latency_key(token)])
@@ -0,0 +1,156 @@
+# speedtest/utils/pagination.py
+"""
+Keyset (cursor) sahifalash
+
+OFFSET o'rniga oxirgi ko'rilgan qatorning (test_date, id) kaliti bo'yicha
+WHERE test_date < ... qo'shiladi - (user, -test_date) indeksidan
+foydalaniladi va chuqur sahifalar ham birinchi sahifa kabi tez.
+Tokenlar imzolangan (signing), klient ularni o'zgartira olmaydi.
+COUNT(*) bajarilmaydi; kerak bo'lsa taxminiy jami yig'ma jadvaldan olinadi.
+Bir nechta jadval (issiq + arxiv) bo'lsa har biridan per_page + 1 qator
+olinib, kalit bo'yicha birlashtiriladi - kursor ikkala jadvalda ishlaydi.
+
+EstimatedCountPaginator (admin uchun) - PostgreSQL da jami qatorlar soni
+rejalashtiruvchi statistikasidan (EXPLAIN) olinadi, aniq COUNT(*) faqat
+kichik natijalarda bajariladi.
+"""
+import json
+from typing import List, Optional, Sequence
+
+from django.conf import settings
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+SALT = 'speedtest.cursor'
+
+
+def encode_cursor(obj, direction: str) -> str:
+    # pk emas, id: arxiv jadvalining birlamchi kaliti (id, test_date)
+    return signing.dumps([direction, obj.test_date.isoformat(), obj.id], salt=SALT, compress=True)
+
+
+def decode_cursor(token: Optional[str]):
+    """(direction, test_date, pk) yoki None (bo'sh/buzilgan token)"""
+    if not token:
+        return None
+    try:
+        direction, test_date, pk = signing.loads(token, salt=SALT)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+    test_date = parse_datetime(test_date)
+    if direction not in ('next', 'prev') or test_date is None:
+        return None
+    return direction, test_date, pk
+
+
+class CursorPaginator:
+    """Paginator ning kerakli qismi: count taxminiy (yoki None)"""
+
+    def __init__(self, per_page: int, count: Optional[int] = None):
+        self.per_page = per_page
+        self.count = count
+
+
+class CursorPage:
+    """django.core.paginator.Page ga o'xshash, lekin raqamsiz"""
+    cursor_mode = True
+
+    def __init__(self, object_list: List, paginator: CursorPaginator,
+                 next_cursor: Optional[str], previous_cursor: Optional[str]):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+
+def _keyset_rows(queryset, cursor, limit: int) -> List:
+    """Kursordan keyingi (yoki oldingi) limit ta qator, kursor yo'nalishi tartibida"""
+    if cursor:
+        direction, test_date, pk = cursor
+        if direction == 'next':
+            keyset = Q(test_date__lt=test_date) | Q(test_date=test_date, id__lt=pk)
+            queryset = queryset.filter(keyset).order_by('-test_date', '-id')
+        else:
+            keyset = Q(test_date__gt=test_date) | Q(test_date=test_date, id__gt=pk)
+            queryset = queryset.filter(keyset).order_by('test_date', 'id')
+    else:
+        queryset = queryset.order_by('-test_date', '-id')
+    return list(queryset[:limit])
+
+
+def paginate(queryset, token: Optional[str], per_page: int, count: Optional[int] = None,
+             also: Sequence = ()) -> CursorPage:
+    """
+    queryset (-test_date, -id) tartibida sahifalanadi.
+    per_page + 1 qator o'qiladi - keyingi sahifa bor-yo'qligini bilish uchun.
+    also - xuddi shu tartibda qo'shiladigan boshqa jadvallar (masalan arxiv)
+    """
+    cursor = decode_cursor(token)
+    direction = cursor[0] if cursor else 'next'
+
+    rows = _keyset_rows(queryset, cursor, per_page + 1)
+    if also:
+        for other in also:
+            rows += _keyset_rows(other, cursor, per_page + 1)
+        rows.sort(key=lambda row: (row.test_date, row.id), reverse=direction == 'next')
+        rows = rows[:per_page + 1]
+
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if direction == 'prev':
+        rows.reverse()
+        has_next, has_previous = True, has_more
+    else:
+        has_next, has_previous = has_more, cursor is not None
+
+    next_cursor = encode_cursor(rows[-1], 'next') if rows and has_next else None
+    previous_cursor = encode_cursor(rows[0], 'prev') if rows and has_previous else None
+    return CursorPage(rows, CursorPaginator(per_page, count), next_cursor, previous_cursor)
+
+
+def estimate_count(queryset) -> Optional[int]:
+    """PostgreSQL rejalashtiruvchisining qatorlar bahosi (boshqa bazalarda None)"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Baho ADMIN_ESTIMATED_COUNT_THRESHOLD dan katta bo'lsa - taxminiy count,
+    aks holda aniq COUNT(*) (kichik filtrlangan natijalarda baho noaniq)
+    """
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100_000):
+            return super().count
+        return estimate
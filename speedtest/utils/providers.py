@@ -0,0 +1,148 @@
+# speedtest/utils/providers.py
+"""
+Provayderni ISP nomi bo'yicha aniqlash
+
+InternetProvider.normalized_name unikal ustuni ustida atomik get_or_create
+va jarayon ichidagi kalit -> provayder xaritasi. Xarita InternetProvider
+saqlanganda/o'chirilganda signal orqali tozalanadi (speedtest/signals.py),
+boshqa jarayonlardagi o'zgarishlar uchun esa TTL bilan eskiradi.
+
+Provayderlar katalogi (ProviderCatalogue) - view, forma tanlovlari va admin
+filtrlari uchun umumiy ro'yxat. Django cache da versiya bilan saqlanadi;
+signal versiyani oshiradi. Jarayon ichidagi nusxa umumiy versiyani
+PROVIDER_CATALOGUE_VERSION_CHECK soniyada bir marta tekshiradi: shu
+oraliqda all() hech qanday cache/DB so'rovisiz, tekshiruvda esa bitta cache
+o'qishi (DatabaseCache da - bitta SELECT). Cache barcha worker lar uchun
+umumiy bo'lsa (settings.CACHES) boshqa jarayonlar o'zgarishni ko'pi bilan
+shuncha kechikib ko'radi; shu jarayondagi o'zgarish darhol ko'rinadi.
+Umumiy bo'lmagan cache (LocMemCache) da esa boshqa jarayonlar eski
+ro'yxatni PROVIDER_CATALOGUE_TTL gacha ko'radi.
+"""
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo_utils import canonical_provider_name, location_name, provider_key
+
+
+class ProviderResolver:
+    """normalized_name -> InternetProvider (O(1), jarayon ichida keshlangan)"""
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'PROVIDER_INDEX_TTL', 300)
+        self._index = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str):
+        item = self._index.get(key)
+        if item is None:
+            return None
+        expires_at, provider = item
+        if expires_at < time.monotonic():
+            return None
+        return provider
+
+    def _set(self, key: str, provider):
+        with self._lock:
+            self._index[key] = (time.monotonic() + self.ttl, provider)
+
+    def resolve(self, location_data: Dict):
+        """Joylashuv ma'lumotidagi ISP uchun provayderni topish yoki yaratish"""
+        from ..models import InternetProvider
+
+        name = canonical_provider_name(location_data.get('isp'))
+        key = provider_key(name)
+
+        provider = self._get(key)
+        if provider is not None:
+            return provider
+
+        # Unikal indeks tufayli parallel so'rovlarda ham bitta qator yaratiladi
+        provider, _ = InternetProvider.objects.get_or_create(
+            normalized_name=key,
+            defaults={
+                'name': name,
+                'location': location_name(location_data),
+                'ip_address': location_data['ip'],
+                'is_active': True,
+            }
+        )
+        self._set(key, provider)
+        return provider
+
+    def invalidate(self, key: str = None):
+        with self._lock:
+            if key is None:
+                self._index.clear()
+            else:
+                self._index.pop(key, None)
+
+
+provider_resolver = ProviderResolver()
+
+
+class ProviderCatalogue:
+    """
+    Barcha provayderlar ro'yxati (nom bo'yicha tartiblangan).
+    Jarayon ichidagi nusxa cache dagi versiya bilan vaqti-vaqti bilan
+    solishtiriladi, versiya o'zgarsa ro'yxat cache dan (yoki DB dan) olinadi
+    """
+    VERSION_KEY = 'speedtest:providers:version'
+
+    def __init__(self):
+        self.ttl = getattr(settings, 'PROVIDER_CATALOGUE_TTL', 3600)
+        self.version_check = getattr(settings, 'PROVIDER_CATALOGUE_VERSION_CHECK', 5)
+        # (versiya, eskirish vaqti, ro'yxat); versiya oxirgi tekshirilgan vaqt
+        self._local = (None, 0.0, None)
+        self._checked_at = 0.0
+
+    def _version(self) -> int:
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            # add - boshqa jarayon allaqachon qo'ygan bo'lsa, o'shani olamiz
+            cache.add(self.VERSION_KEY, 1, None)
+            version = cache.get(self.VERSION_KEY, 1)
+        return version
+
+    def all(self) -> List:
+        from ..models import InternetProvider
+
+        now = time.monotonic()
+        local_version, expires_at, providers = self._local
+        if expires_at > now and now - self._checked_at < self.version_check:
+            return providers
+
+        version = self._version()
+        self._checked_at = now
+        if local_version == version and expires_at > now:
+            return providers
+
+        key = f'speedtest:providers:{version}'
+        providers = cache.get(key)
+        if providers is None:
+            providers = list(InternetProvider.objects.order_by('name'))
+            cache.set(key, providers, self.ttl)
+        self._local = (version, time.monotonic() + self.ttl, providers)
+        return providers
+
+    def active(self) -> List:
+        return [provider for provider in self.all() if provider.is_active]
+
+    def choices(self) -> List[Tuple[int, str]]:
+        """Faol provayderlar - forma tanlovlari uchun"""
+        return [(provider.pk, provider.name) for provider in self.active()]
+
+    def invalidate(self):
+        # Shu jarayon darhol yangisini oladi; boshqalari - keyingi tekshiruvda
+        self._local = (None, 0.0, None)
+        try:
+            cache.incr(self.VERSION_KEY)
+        except ValueError:
+            # Kalit yo'q (cache tozalangan) - keyingi all() yangisini yaratadi
+            pass
+
+
+provider_catalogue = ProviderCatalogue()
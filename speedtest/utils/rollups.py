@@ -0,0 +1,243 @@
+# speedtest/utils/rollups.py
+"""
+UserDailyStats yig'ma jadvalini yangilash
+
+Natijalar yozilganda (utils/ingest.py) har bir (user, provider, kun)
+guruhiga atomik F() qo'shish bilan yangilanadi. Natija tahrirlansa yoki
+o'chirilsa, guruh xom ma'lumotdan qayta hisoblanadi (signals.py) - bir
+kunlik testlar soni kichik bo'lgani uchun bu arzon. Arxivga ko'chirilgan
+natijalar (SpeedTestResultArchive) ham hisobga olinadi; faylga ko'chirilganlar
+xom holda qolmaydi - ularning yig'indisi FileArchivedDailyStats da saqlanadi
+va qayta qurishda qo'shiladi.
+"""
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, Max, Min, Sum, Value
+from django.db.models.functions import Cast, Greatest, Least, TruncDate
+from django.utils import timezone
+
+Group = Tuple[int, Optional[int], object]
+
+_state = threading.local()
+
+
+@contextmanager
+def paused():
+    """Signal orqali yangilashni vaqtincha o'chirish (masalan arxivga ko'chirishda)"""
+    previous = getattr(_state, 'paused', False)
+    _state.paused = True
+    try:
+        yield
+    finally:
+        _state.paused = previous
+
+
+def is_paused() -> bool:
+    return getattr(_state, 'paused', False)
+
+
+def result_group(result) -> Optional[Group]:
+    """Natija qaysi (user_id, provider_id, sana) guruhiga tegishli"""
+    if result.user_id is None:
+        return None
+    return result.user_id, result.provider_id, timezone.localdate(result.test_date)
+
+
+def day_bounds(date):
+    """Mahalliy kun uchun [boshlanish, tugash) vaqtlari (indeksdan foydalanish uchun)"""
+    start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+    return start, start + timedelta(days=1)
+
+
+def _empty_delta():
+    return {
+        'test_count': 0,
+        'sum_download': 0.0, 'sum_upload': 0.0, 'sum_ping': 0.0,
+        'sum_sq_download': 0.0, 'sum_sq_upload': 0.0, 'sum_sq_ping': 0.0,
+        'min_download': None, 'max_download': None,
+        'min_upload': None, 'max_upload': None,
+        'min_ping': None, 'max_ping': None,
+    }
+
+
+def _merge_min(current, value):
+    return value if current is None else min(current, value)
+
+
+def _merge_max(current, value):
+    return value if current is None else max(current, value)
+
+
+def apply_results(results: Iterable):
+    """Yangi yozilgan natijalarni yig'ma jadvalga qo'shish"""
+    from ..models import UserDailyStats
+    _apply(results, UserDailyStats)
+
+
+def apply_file_archived(results: Iterable):
+    """Faylga ko'chirilayotgan natijalar yig'indisini saqlash (UserDailyStats o'zgarmaydi)"""
+    from ..models import FileArchivedDailyStats
+    _apply(results, FileArchivedDailyStats)
+
+
+def _apply(results: Iterable, model):
+    deltas = defaultdict(_empty_delta)
+    for result in results:
+        group = result_group(result)
+        if group is None:
+            continue
+        delta = deltas[group]
+        download, upload, ping = float(result.download_speed), float(result.upload_speed), result.ping
+        delta['test_count'] += 1
+        delta['sum_download'] += download
+        delta['sum_upload'] += upload
+        delta['sum_ping'] += ping
+        delta['sum_sq_download'] += download * download
+        delta['sum_sq_upload'] += upload * upload
+        delta['sum_sq_ping'] += ping * ping
+        for field, value in (('download', download), ('upload', upload), ('ping', ping)):
+            delta[f'min_{field}'] = _merge_min(delta[f'min_{field}'], value)
+            delta[f'max_{field}'] = _merge_max(delta[f'max_{field}'], value)
+
+    for group, delta in deltas.items():
+        _upsert(group, delta, model)
+
+
+def _upsert(group: Group, delta: dict, model=None):
+    from ..models import UserDailyStats
+
+    model = model or UserDailyStats
+    user_id, provider_id, date = group
+    rows = model.objects.filter(user_id=user_id, provider_id=provider_id, date=date)
+
+    updates = {}
+    for field, value in delta.items():
+        if field.startswith('min_'):
+            updates[field] = Least(F(field), Value(value))
+        elif field.startswith('max_'):
+            updates[field] = Greatest(F(field), Value(value))
+        else:
+            updates[field] = F(field) + value
+
+    if rows.update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(user_id=user_id, provider_id=provider_id, date=date, **delta)
+    except IntegrityError:
+        # Boshqa jarayon shu guruhni hozirgina yaratdi
+        rows.update(**updates)
+
+
+def _aggregates():
+    return {
+        'test_count': Count('id'),
+        'sum_download': Cast(Sum('download_speed'), FloatField()),
+        'sum_upload': Cast(Sum('upload_speed'), FloatField()),
+        'sum_ping': Cast(Sum('ping'), FloatField()),
+        'sum_sq_download': Cast(Sum(F('download_speed') * F('download_speed')), FloatField()),
+        'sum_sq_upload': Cast(Sum(F('upload_speed') * F('upload_speed')), FloatField()),
+        'sum_sq_ping': Cast(Sum(F('ping') * F('ping')), FloatField()),
+        'min_download': Cast(Min('download_speed'), FloatField()),
+        'max_download': Cast(Max('download_speed'), FloatField()),
+        'min_upload': Cast(Min('upload_speed'), FloatField()),
+        'max_upload': Cast(Max('upload_speed'), FloatField()),
+        'min_ping': Min('ping'),
+        'max_ping': Max('ping'),
+    }
+
+
+def _merge(totals: dict, other: dict) -> dict:
+    """Ikki _aggregates() natijasini birlashtirish"""
+    if not other['test_count']:
+        return totals
+    if not totals['test_count']:
+        return other
+    merged = {}
+    for field, value in totals.items():
+        if field.startswith('min_'):
+            merged[field] = min(value, other[field])
+        elif field.startswith('max_'):
+            merged[field] = max(value, other[field])
+        else:
+            merged[field] = value + other[field]
+    return merged
+
+
+def _file_archived(rows) -> dict:
+    """FileArchivedDailyStats qatori _aggregates() ko'rinishida (yo'q bo'lsa - bo'sh)"""
+    return rows.values(*_empty_delta()).first() or _empty_delta()
+
+
+def rebuild_group(group: Optional[Group]):
+    """Bitta guruhni xom natijalardan (issiq jadval + arxiv + fayl arxivi yig'indisi) qayta hisoblash"""
+    from ..models import FileArchivedDailyStats, SpeedTestResult, SpeedTestResultArchive, UserDailyStats
+
+    if group is None:
+        return
+    user_id, provider_id, date = group
+    start, end = day_bounds(date)
+    lookup = {
+        'user_id': user_id, 'provider_id': provider_id,
+        'test_date__gte': start, 'test_date__lt': end,
+    }
+    with transaction.atomic():
+        UserDailyStats.objects.filter(user_id=user_id, provider_id=provider_id, date=date).delete()
+        totals = _merge(
+            SpeedTestResult.objects.filter(**lookup).aggregate(**_aggregates()),
+            SpeedTestResultArchive.objects.filter(**lookup).aggregate(**_aggregates()),
+        )
+        totals = _merge(totals, _file_archived(
+            FileArchivedDailyStats.objects.filter(user_id=user_id, provider_id=provider_id, date=date)
+        ))
+        if totals['test_count']:
+            UserDailyStats.objects.create(user_id=user_id, provider_id=provider_id, date=date, **totals)
+
+
+def _grouped(model):
+    return (
+        model.objects.filter(user__isnull=False)
+        .annotate(day=TruncDate('test_date'))
+        .values('user_id', 'provider_id', 'day')
+        .annotate(**_aggregates())
+        .order_by()
+    )
+
+
+def rebuild_all(batch_size: int = 1000) -> int:
+    """
+    Butun jadvalni GROUP BY bilan qayta qurish: issiq jadval bulk_create
+    bilan, arxiv va fayl arxivi guruhlari esa ustiga qo'shiladi.
+    Qayta ishlangan guruhlar sonini qaytaradi
+    """
+    from ..models import FileArchivedDailyStats, SpeedTestResult, SpeedTestResultArchive, UserDailyStats
+
+    total = 0
+    with transaction.atomic():
+        UserDailyStats.objects.all().delete()
+        objs = []
+        for row in _grouped(SpeedTestResult).iterator(chunk_size=batch_size):
+            objs.append(UserDailyStats(date=row.pop('day'), **row))
+            if len(objs) >= batch_size:
+                UserDailyStats.objects.bulk_create(objs)
+                total += len(objs)
+                objs = []
+        UserDailyStats.objects.bulk_create(objs)
+        total += len(objs)
+
+        for row in _grouped(SpeedTestResultArchive).iterator(chunk_size=batch_size):
+            group = (row.pop('user_id'), row.pop('provider_id'), row.pop('day'))
+            _upsert(group, row)
+            total += 1
+
+        archived = FileArchivedDailyStats.objects.values('user_id', 'provider_id', 'date', *_empty_delta())
+        for row in archived.iterator(chunk_size=batch_size):
+            group = (row.pop('user_id'), row.pop('provider_id'), row.pop('date'))
+            _upsert(group, row)
+            total += 1
+    return total
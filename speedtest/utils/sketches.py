@@ -0,0 +1,209 @@
+# speedtest/utils/sketches.py
+"""
+ProviderDailySketch jadvalini yangilash va davr bo'yicha birlashtirish
+
+Yangi natijalar (provayder, joylashuv, kun) eskiziga qo'shiladi (rollups bilan bir
+joyda - ingest, import, signal). Tahrirlash/o'chirishda kun eskizi xom
+natijalardan (issiq jadval + arxiv) qayta quriladi. Arxivga ko'chirish
+eskizlarga tegmaydi - natijalar tarixda qoladi. Faylga ko'chirilgan
+natijalar eskizi FileArchivedDailySketch da saqlanadi va qayta qurishda
+boshlang'ich qiymat bo'ladi.
+
+Har bir jarayon kunga o'z bo'lagiga (shard = pid % SPEEDTEST_SKETCH_SHARDS)
+yozadi, shuning uchun workerlar bitta qator qulfi uchun navbatda turmaydi.
+merged() bo'laklarni o'qishda birlashtiradi; qayta qurish kunni bitta
+bo'lakka yig'adi. Joylashuv - natija qayerdan test qilingani
+(SpeedTestResult.location), reyting joylashuv bo'yicha guruhlanadi.
+"""
+import logging
+import os
+from collections import defaultdict
+from datetime import date as date_type, timedelta
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .ddsketch import DDSketch
+from .rollups import day_bounds
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('download_speed', 'upload_speed', 'ping')
+Day = Tuple[int, str, date_type]
+# Parallel yaratishdagi IntegrityError dan keyin qayta urinishlar soni
+MERGE_ATTEMPTS = 3
+
+
+def _field(metric: str) -> str:
+    # download_speed -> download_sketch
+    return f"{metric.replace('_speed', '')}_sketch"
+
+
+def new_sketch() -> DDSketch:
+    return DDSketch(getattr(settings, 'SPEEDTEST_SKETCH_ACCURACY', 0.01))
+
+
+def worker_shard() -> int:
+    """Joriy jarayonning kunlik eskiz bo'lagi"""
+    return os.getpid() % max(1, getattr(settings, 'SPEEDTEST_SKETCH_SHARDS', 16))
+
+
+def result_day(result) -> Optional[Day]:
+    """Natija qaysi (provider_id, joylashuv, sana) eskiziga tegishli"""
+    if result.provider_id is None:
+        return None
+    return result.provider_id, result.location, timezone.localdate(result.test_date)
+
+
+def _new_day() -> Dict[str, DDSketch]:
+    return {metric: new_sketch() for metric in METRICS}
+
+
+def _columns(sketches: Dict[str, DDSketch]) -> Dict:
+    return {
+        'test_count': len(sketches[METRICS[0]]),
+        **{_field(metric): sketches[metric].to_bytes() for metric in METRICS},
+    }
+
+
+def _from_row(row) -> Dict[str, DDSketch]:
+    return {metric: DDSketch.from_bytes(getattr(row, _field(metric))) for metric in METRICS}
+
+
+def apply_results(results: Iterable):
+    """Yangi natijalarni kunlik eskizlarga (joriy jarayon bo'lagiga) qo'shish"""
+    from ..models import ProviderDailySketch
+    _apply(results, ProviderDailySketch, shard=worker_shard())
+
+
+def apply_file_archived(results: Iterable):
+    """Faylga ko'chirilayotgan natijalar eskizini saqlash (ProviderDailySketch o'zgarmaydi)"""
+    from ..models import FileArchivedDailySketch
+    _apply(results, FileArchivedDailySketch)
+
+
+def _apply(results: Iterable, model, shard: Optional[int] = None):
+    days = defaultdict(_new_day)
+    for result in results:
+        day = result_day(result)
+        if day is not None:
+            for metric in METRICS:
+                days[day][metric].add(getattr(result, metric))
+
+    for day, sketches in days.items():
+        _merge_into(day, sketches, model, shard)
+
+
+def _merge_into(day: Day, sketches: Dict[str, DDSketch], model, shard: Optional[int] = None):
+    provider_id, location, date = day
+    key = {'provider_id': provider_id, 'location': location, 'date': date}
+    if shard is not None:
+        key['shard'] = shard
+    for attempt in range(MERGE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                # Qatorni qulflab o'qish-birlashtirish-yozish (bir bo'lakka tushgan jarayonlar)
+                row = model.objects.select_for_update().filter(**key).first()
+                if row is None:
+                    model.objects.create(**key, **_columns(sketches))
+                    return
+                merged = {
+                    metric: sketch.merge(sketches[metric]) for metric, sketch in _from_row(row).items()
+                }
+                columns = _columns(merged)
+                for field, value in columns.items():
+                    setattr(row, field, value)
+                row.save(update_fields=list(columns))
+                return
+        except IntegrityError:
+            # Boshqa jarayon shu qatorni hozirgina yaratdi - qulflab qayta urinamiz.
+            # Urinishlar tugasa xato chaqiruvchiga chiqadi (eskiz jimgina yo'qolmaydi):
+            # ingest partiyani birma-bir yozishga o'tadi
+            if attempt == MERGE_ATTEMPTS - 1:
+                logger.error("Eskizni birlashtirib bo'lmadi: %s %s", model.__name__, key)
+                raise
+
+
+def rebuild_day(day: Optional[Day]):
+    """
+    Bitta (provayder, joylashuv, kun) eskizini xom natijalar va fayl arxivi
+    eskizidan qayta qurish - barcha bo'laklar o'rniga bitta qator
+    """
+    from ..models import FileArchivedDailySketch, ProviderDailySketch, SpeedTestResult, SpeedTestResultArchive
+
+    if day is None:
+        return
+    provider_id, location, date = day
+    key = {'provider_id': provider_id, 'location': location}
+    start, end = day_bounds(date)
+    archived = FileArchivedDailySketch.objects.filter(date=date, **key).first()
+    sketches = _from_row(archived) if archived is not None else _new_day()
+    for model in (SpeedTestResult, SpeedTestResultArchive):
+        rows = model.objects.filter(
+            test_date__gte=start, test_date__lt=end, **key,
+        ).values_list(*METRICS)
+        for values in rows.iterator():
+            for metric, value in zip(METRICS, values):
+                sketches[metric].add(value)
+
+    with transaction.atomic():
+        ProviderDailySketch.objects.filter(date=date, **key).delete()
+        if len(sketches[METRICS[0]]):
+            ProviderDailySketch.objects.create(date=date, **key, **_columns(sketches))
+
+
+def rebuild_all(batch_size: int = 1000) -> int:
+    """Butun jadvalni qayta qurish; yozilgan (provayder, joylashuv, kun) soni"""
+    from ..models import FileArchivedDailySketch, ProviderDailySketch, SpeedTestResult, SpeedTestResultArchive
+
+    days = defaultdict(_new_day)
+    for row in FileArchivedDailySketch.objects.iterator(chunk_size=batch_size):
+        days[row.provider_id, row.location, row.date] = _from_row(row)
+    for model in (SpeedTestResult, SpeedTestResultArchive):
+        rows = model.objects.filter(provider__isnull=False).values_list(
+            'provider_id', 'location', 'test_date', *METRICS,
+        )
+        for provider_id, location, test_date, *values in rows.iterator(chunk_size=batch_size):
+            sketches = days[provider_id, location, timezone.localdate(test_date)]
+            for metric, value in zip(METRICS, values):
+                sketches[metric].add(value)
+
+    with transaction.atomic():
+        ProviderDailySketch.objects.all().delete()
+        ProviderDailySketch.objects.bulk_create(
+            (ProviderDailySketch(provider_id=provider_id, location=location, date=date, **_columns(sketches))
+             for (provider_id, location, date), sketches in days.items()),
+            batch_size=batch_size,
+        )
+    return len(days)
+
+
+def merged(since: date_type, until: Optional[date_type] = None,
+           provider_ids: Optional[Sequence[int]] = None, by_location: bool = False) -> Dict:
+    """
+    provider_id -> {metric: davr bo'yicha birlashtirilgan eskiz} ([since, until] kunlar);
+    by_location - kalit (provider_id, joylashuv)
+    """
+    from ..models import ProviderDailySketch
+
+    rows = ProviderDailySketch.objects.filter(date__gte=since)
+    if until is not None:
+        rows = rows.filter(date__lte=until)
+    if provider_ids is not None:
+        rows = rows.filter(provider_id__in=provider_ids)
+
+    result = defaultdict(_new_day)
+    values = rows.values_list('provider_id', 'location', *map(_field, METRICS))
+    for provider_id, location, *blobs in values.iterator():
+        key = (provider_id, location) if by_location else provider_id
+        for metric, blob in zip(METRICS, blobs):
+            result[key][metric].merge(DDSketch.from_bytes(blob))
+    return dict(result)
+
+
+def last_days(days: int) -> Tuple[date_type, date_type]:
+    """Bugun bilan birga oxirgi N kun: (since, until)"""
+    today = timezone.localdate()
+    return today - timedelta(days=days - 1), today
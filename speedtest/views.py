@@ -2,7 +2,11 @@
 from django.shortcuts import  get_object_or_404
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db.models import Avg, Max, Min, Count, Q
+from django.db.models import Avg, Max, Min, Count, Q, Sum, F, FloatField
+from django.db.models.functions import Cast
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.core.handlers.asgi import ASGIRequest
 from django.utils import timezone
 from django.views.generic import (
     ListView, DetailView, CreateView,
@@ -10,13 +14,27 @@ from django.views.generic import (
 )
 from django.urls import reverse_lazy
 from datetime import timedelta
-from .models import SpeedTestResult, InternetProvider, UserFeedback, NetworkIssue
+from .models import (
+    SpeedTestResult, SpeedTestResultArchive, InternetProvider, UserFeedback, NetworkIssue, UserDailyStats,
+    FileArchivedDailyStats, ProviderLeaderboard,
+)
 from .forms import (
     SpeedTestForm, FeedbackForm, NetworkIssueReportForm,
     ProviderFilterForm, UserRegistrationForm, UserLoginForm
 )
-import random
-import requests
+from .utils import (
+    archive, export, http_client, instrumentation, issue_feed, issues, latency, leaderboard, measurement,
+    pagination, sketches,
+)
+from .utils.distribution import speed_distribution
+from .utils.geo_service import geo_service
+from .utils.ingest import ingestor
+from .utils.providers import provider_catalogue, provider_resolver
+from .utils.rollups import day_bounds
+import uuid
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+)
 from django.shortcuts import render
 from django.contrib.auth import logout
 from django.shortcuts import redirect
@@ -24,6 +42,12 @@ from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import never_cache
+from django.core.cache import cache, caches
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import cached_property
+from functools import wraps
 
 
 def get_client_ip(request):
@@ -37,53 +61,13 @@ def get_client_ip(request):
 
 
 def get_location_and_isp(ip_address):
-    """IP manzildan joylashuv va ISP ma'lumotlarini olish"""
-    try:
-        response = requests.get(f'https://ipapi.co/{ip_address}/json/', timeout=5)
-        data = response.json()
-
-        return {
-            'ip': ip_address,
-            'city': data.get('city', 'Noma\'lum'),
-            'region': data.get('region', 'Noma\'lum'),
-            'country': data.get('country_name', 'Noma\'lum'),
-            'isp': data.get('org', 'Noma\'lum'),
-            'latitude': data.get('latitude'),
-            'longitude': data.get('longitude'),
-        }
-    except Exception as e:
-        print(f"IP ma'lumotlarini olishda xatolik: {e}")
-        return {
-            'ip': ip_address,
-            'city': 'Toshkent',
-            'region': 'Toshkent',
-            'country': 'O\'zbekiston',
-            'isp': 'UZTELECOM',
-            'latitude': None,
-            'longitude': None,
-        }
+    """IP manzildan joylashuv va ISP ma'lumotlarini olish (keshlangan)"""
+    return geo_service.lookup(ip_address)
 
 
 def get_or_create_provider(location_data):
-    """Provayderni topish yoki yangi yaratish"""
-    isp_name = location_data['isp']
-
-    if ' ' in isp_name:
-        isp_name = isp_name.split(' ')[-1]
-
-    provider = InternetProvider.objects.filter(
-        name__icontains=isp_name
-    ).first()
-
-    if not provider:
-        provider = InternetProvider.objects.create(
-            name=isp_name,
-            location=f"{location_data['city']}, {location_data['region']}",
-            ip_address=location_data['ip'],
-            is_active=True
-        )
-
-    return provider
+    """Provayderni topish yoki yangi yaratish (normallashtirilgan nom bo'yicha)"""
+    return provider_resolver.resolve(location_data)
 
 
 # ============================================
@@ -155,8 +139,57 @@ def logout_view(request):
 # BOSH SAHIFA
 # ============================================
 class HomeView(TemplateView):
-    """Bosh sahifa - Hamma ko'ra oladi"""
+    """
+    Bosh sahifa - Hamma ko'ra oladi.
+    HOME_SHELL_CACHE_SECONDS > 0 bo'lsa anonim foydalanuvchilarga keshlangan
+    umumiy "qobiq" beriladi; joylashuv, provayder, CSRF va o'lchov tokeni
+    JavaScript orqali HomeFragmentView dan (JSON) to'ldiriladi
+    """
     template_name = 'speedtest/home.html'
+    SHELL_CACHE_KEY = 'speedtest:home_shell:v1'
+
+    def get(self, request, *args, **kwargs):
+        seconds = getattr(settings, 'HOME_SHELL_CACHE_SECONDS', 0)
+        if not seconds or not self.serve_shell():
+            return super().get(request, *args, **kwargs)
+
+        # Jarayon ichidagi kesh: qobiq umumiy bo'lishi shart emas
+        shell_cache = caches[getattr(settings, 'HOME_SHELL_CACHE_ALIAS', 'default')]
+        content = shell_cache.get(self.SHELL_CACHE_KEY)
+        if content is None:
+            response = self.render_to_response(self.get_shell_context_data())
+            content = response.render().content
+            shell_cache.set(self.SHELL_CACHE_KEY, content, seconds)
+
+        response = HttpResponse(content)
+        patch_cache_control(response, public=True, max_age=seconds)
+        return response
+
+    def serve_shell(self):
+        """Qobiq faqat anonim va flash xabari yo'q so'rovlar uchun umumiy"""
+        if self.request.user.is_authenticated:
+            return False
+        # len() xabarlarni "o'qilgan" qilmaydi - keyingi sahifada ko'rinadi
+        return not len(messages.get_messages(self.request))
+
+    def get_shell_context_data(self):
+        context = super().get_context_data()
+        context.update(self.get_static_context())
+        context['shell'] = True
+        return context
+
+    def get_static_context(self):
+        """Barcha tashrif buyuruvchilar uchun bir xil qism"""
+        return {
+            'form': SpeedTestForm(),
+            'max_streams': measurement.max_streams(),
+            'latency_probes': latency.probe_count(),
+            'default_streams': getattr(settings, 'SPEEDTEST_DEFAULT_STREAMS', 4),
+            'download_size': getattr(settings, 'SPEEDTEST_DOWNLOAD_SIZE', 25 * 1024 * 1024),
+            'upload_size': getattr(settings, 'SPEEDTEST_UPLOAD_SIZE', 10 * 1024 * 1024),
+            'providers': provider_catalogue.active(),
+            'page_title': 'Internet Tezligi Testi'
+        }
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -173,17 +206,52 @@ class HomeView(TemplateView):
         else:
             recent_tests = []
 
+        context.update(self.get_static_context())
         context.update({
-            'form': SpeedTestForm(),
+            'measurement_token': measurement.get_or_create_token(self.request.session),
             'recent_tests': recent_tests,
-            'providers': InternetProvider.objects.filter(is_active=True),
             'location_data': location_data,
             'current_provider': provider,
-            'page_title': 'Internet Tezligi Testi'
         })
         return context
 
 
+@method_decorator(never_cache, name='dispatch')
+class HomeFragmentView(View):
+    """Bosh sahifa qobig'ining shaxsiy qismi (JSON) - keshlanmaydi"""
+
+    def get(self, request):
+        location_data = get_location_and_isp(get_client_ip(request))
+        provider = get_or_create_provider(location_data)
+
+        recent_tests = []
+        if request.user.is_authenticated:
+            recent_tests = [
+                {
+                    'test_date': timezone.localtime(test.test_date).strftime('%d.%m.%Y %H:%M'),
+                    'download_speed': str(test.download_speed),
+                    'upload_speed': str(test.upload_speed),
+                    'ping': test.ping,
+                    'speed_rating': test.speed_rating,
+                }
+                for test in SpeedTestResult.objects.filter(
+                    user=request.user
+                ).order_by('-test_date')[:5]
+            ]
+
+        return JsonResponse({
+            'csrf_token': get_token(request),
+            'measurement_token': measurement.get_or_create_token(request.session),
+            'provider': provider.name if provider else None,
+            'location': {
+                'ip': location_data.get('ip'),
+                'city': location_data.get('city'),
+                'country': location_data.get('country'),
+            },
+            'recent_tests': recent_tests,
+        })
+
+
 # ============================================
 # TEST YARATISH
 # ============================================
@@ -194,13 +262,18 @@ class RunTestView(FormView):
     success_url = None
 
     def form_valid(self, form):
+        # Server tomonida o'lchangan download/upload natijalari
+        token = self.request.session.get(measurement.SESSION_KEY)
+        measured = measurement.collect(token)
+        if measured is None:
+            messages.error(self.request, 'Tezlik o\'lchanmadi, testni qaytadan boshlang.')
+            return redirect('home')
+
         client_ip = get_client_ip(self.request)
-        location_data = get_location_and_isp(client_ip)
-        provider = get_or_create_provider(location_data)
 
         test_result = form.save(commit=False)
-        test_result.provider = provider
         test_result.ip_address = client_ip
+        test_result.ingest_id = uuid.uuid4()
 
         # Login qilgan - user ga biriktiramiz
         if self.request.user.is_authenticated:
@@ -212,16 +285,170 @@ class RunTestView(FormView):
             test_result.session_id = self.request.session.session_key
 
         # Test natijalari
-        test_result.download_speed = round(random.uniform(50, 150), 2)
-        test_result.upload_speed = round(random.uniform(40, 120), 2)
-        test_result.ping = random.randint(3, 100)
-        test_result.jitter = random.randint(1, 20)
-        test_result.packet_loss = round(random.uniform(0, 5), 2)
-
-        test_result.save()
+        download, upload = measured['download'], measured['upload']
+        test_result.download_speed = round(download['mbps'], 2)
+        test_result.upload_speed = round(upload['mbps'], 2)
+        test_result.download_bytes = download['bytes']
+        test_result.upload_bytes = upload['bytes']
+        test_result.download_duration = download['seconds']
+        test_result.upload_duration = upload['seconds']
+        latency = measured['latency']
+        test_result.ping = round(latency['ping'])
+        test_result.jitter = round(latency['jitter'])
+        test_result.packet_loss = round(latency['packet_loss'], 2)
+
+        # Joylashuv, provayder va DB ga yozish - fon oqimida partiyalab
+        ingestor.submit(test_result, client_ip)
+
+        # Token bir marta ishlatiladi
+        measurement.clear(token)
+        self.request.session[measurement.SESSION_KEY] = measurement.new_token()
 
         messages.success(self.request, 'Test muvaffaqiyatli yakunlandi!')
-        return redirect('test_result', pk=test_result.pk)
+        return redirect('test_pending', ingest_id=test_result.ingest_id)
+
+
+@method_decorator(never_cache, name='dispatch')
+class TestPendingView(TemplateView):
+    """
+    Natija yozilguncha kutish sahifasi. Sahifa ?attempt=N bilan o'zini qayta
+    yuklaydi, oraliq ortib boradi; INGEST_PENDING_MAX_WAIT dan keyin so'rov
+    to'xtaydi va xato ko'rsatiladi (natija yo'qolgan bo'lsa DB cheksiz so'ralmaydi)
+    """
+    template_name = 'speedtest/pending.html'
+    FIRST_DELAY = 0.5  # soniya
+    BACKOFF = 1.5
+    MAX_DELAY = 4.0
+
+    def poll_delay(self, attempt: int) -> float:
+        return min(self.FIRST_DELAY * self.BACKOFF ** attempt, self.MAX_DELAY)
+
+    def waited(self, attempt: int) -> float:
+        """Shu urinishgacha sahifa taxminan qancha kutgan"""
+        return sum(self.poll_delay(i) for i in range(attempt))
+
+    def find_result(self):
+        return SpeedTestResult.objects.filter(
+            ingest_id=self.kwargs['ingest_id']
+        ).values_list('pk', flat=True).first()
+
+    def get(self, request, *args, **kwargs):
+        try:
+            self.attempt = max(0, int(request.GET.get('attempt', 0)))
+        except ValueError:
+            self.attempt = 0
+        self.expired = self.waited(self.attempt) >= getattr(settings, 'INGEST_PENDING_MAX_WAIT', 15)
+        if self.expired:
+            # Oxirgi urinish: natija shu jarayon navbatida bo'lsa - yozilishini kutamiz
+            ingestor.flush(timeout=1.0)
+
+        pk = self.find_result()
+        if pk is not None:
+            return redirect('test_result', pk=pk)
+        return super().get(request, *args, **kwargs)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page_title'] = 'Natija Saqlanmoqda'
+        context['expired'] = self.expired
+        context['next_attempt'] = self.attempt + 1
+        context['poll_delay_ms'] = int(self.poll_delay(self.attempt) * 1000)
+        return context
+
+
+# ============================================
+# O'LCHOV ENDPOINTLARI
+# ============================================
+def _measurement_params(request):
+    """Token va oqim raqamini tekshirish: (token, stream) yoki None"""
+    token = request.GET.get('token')
+    if not token or token != request.session.get(measurement.SESSION_KEY):
+        return None
+    try:
+        stream = int(request.GET.get('stream', 0))
+    except ValueError:
+        return None
+    if not 0 <= stream < measurement.max_streams():
+        return None
+    return token, stream
+
+
+@method_decorator(never_cache, name='dispatch')
+class DownloadTestView(View):
+    """Download o'lchovi - siqilmaydigan payload oqimi"""
+
+    def get(self, request):
+        params = _measurement_params(request)
+        if params is None:
+            return HttpResponseBadRequest('Noto\'g\'ri token')
+        token, stream = params
+
+        try:
+            size = int(request.GET.get('size', 0))
+        except ValueError:
+            size = 0
+        if not 0 < size <= measurement.max_transfer_bytes():
+            return HttpResponseBadRequest('Noto\'g\'ri hajm')
+
+        def on_finish(counter):
+            measurement.record_stream(token, 'download', stream, counter)
+
+        async def aon_finish(counter):
+            await measurement.arecord_stream(token, 'download', stream, counter)
+
+        # ASGI da sync iterator avval to'liq xotiraga o'qiladi - async oqim kerak
+        if isinstance(request, ASGIRequest):
+            payload = measurement.astream_payload(size, aon_finish)
+        else:
+            payload = measurement.stream_payload(size, on_finish)
+
+        response = StreamingHttpResponse(payload, content_type='application/octet-stream')
+        response['Content-Length'] = str(size)
+        response['Content-Encoding'] = 'identity'
+        return response
+
+
+@method_decorator(never_cache, name='dispatch')
+class UploadTestView(View):
+    """
+    Upload o'lchovi (WSGI) - so'rov tanasi bo'laklab o'qiladi va tashlanadi.
+    ASGI da bu yo'l root/asgi.py da measurement.upload_app ga yo'naltiriladi
+    """
+
+    def post(self, request):
+        params = _measurement_params(request)
+        if params is None:
+            return HttpResponseBadRequest('Noto\'g\'ri token')
+        token, stream = params
+
+        counter = measurement.consume_upload(request, measurement.max_transfer_bytes())
+        measurement.record_stream(token, 'upload', stream, counter)
+        return JsonResponse({'bytes': counter.bytes, 'seconds': counter.finished - counter.started})
+
+
+@method_decorator(never_cache, name='dispatch')
+class LatencyPingView(View):
+    """
+    Ping/jitter - HTTP zaxira yo'li (WebSocket probe ishlamaganda, masalan WSGI da).
+    Klient seq=0..LATENCY_PROBE_COUNT ni ketma-ket so'raydi, oxirgisida natija qaytadi
+    """
+
+    def get(self, request):
+        params = _measurement_params(request)
+        if params is None:
+            return HttpResponseBadRequest('Noto\'g\'ri token')
+        token, _ = params
+        try:
+            seq = int(request.GET.get('seq', ''))
+        except ValueError:
+            return HttpResponseBadRequest('Noto\'g\'ri seq')
+        if not 0 <= seq <= latency.probe_count():
+            return HttpResponseBadRequest('Noto\'g\'ri seq')
+
+        summary = latency.record_http_probe(token, seq)
+        if summary is None:
+            return JsonResponse({'seq': seq})
+        return JsonResponse({'type': 'result', **summary})
 
 
 # ============================================
@@ -233,22 +460,32 @@ class TestResultView(DetailView):
     template_name = 'speedtest/result.html'
     context_object_name = 'result'
 
-    def get_queryset(self):
+    def get_queryset(self, model=SpeedTestResult):
         # Login qilgan - faqat o'z testlarini
         if self.request.user.is_authenticated:
-            return SpeedTestResult.objects.filter(user=self.request.user)
+            return model.objects.filter(user=self.request.user)
 
         # Anonim - session bo'yicha
         session_id = self.request.session.session_key
         if session_id:
-            return SpeedTestResult.objects.filter(session_id=session_id)
+            return model.objects.filter(session_id=session_id)
 
         # Hech narsa topilmasa
-        return SpeedTestResult.objects.none()
+        return model.objects.none()
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # Arxivga ko'chirilgan natija - faqat ko'rish uchun
+            archived = self.get_queryset(SpeedTestResultArchive).filter(id=self.kwargs['pk']).first()
+            if archived is None:
+                raise
+            return archived
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        result = self.get_object()
+        result = self.object
 
         # O'rtacha statistika
         if self.request.user.is_authenticated:
@@ -271,6 +508,8 @@ class TestResultView(DetailView):
             can_delete = True
         elif not self.request.user.is_authenticated and result.session_id == self.request.session.session_key:
             can_delete = True
+        # Arxivdagi natija faqat o'qiladi
+        can_delete = can_delete and not result.is_archived
 
         context.update({
             'feedback_form': FeedbackForm(),
@@ -317,13 +556,40 @@ class DeleteTestView(DeleteView):
 # ============================================
 # TESTLAR TARIXI - Login KERAK
 # ============================================
+def clean_filters(params) -> dict:
+    """ProviderFilterForm bilan tekshirilgan filtrlar - noto'g'ri maydonlar kirmaydi"""
+    form = ProviderFilterForm(params)
+    form.is_valid()
+    return form.cleaned_data
+
+
+def filter_results(queryset, filters):
+    """Tekshirilgan filtrlar (clean_filters) - tarix va eksport uchun umumiy"""
+    provider = filters.get('provider')
+    date_from = filters.get('date_from')
+    date_to = filters.get('date_to')
+    connection_type = filters.get('connection_type')
+
+    if provider:
+        queryset = queryset.filter(provider_id=provider)
+    # Sanalar butun kun bo'yicha (yig'ma jadval bilan bir xil): [date_from 00:00, date_to+1 00:00)
+    if date_from:
+        queryset = queryset.filter(test_date__gte=day_bounds(date_from)[0])
+    if date_to:
+        queryset = queryset.filter(test_date__lt=day_bounds(date_to)[1])
+    if connection_type:
+        queryset = queryset.filter(connection_type=connection_type)
+
+    return queryset
+
+
 # History View
 @method_decorator(never_cache, name='dispatch')
 class ResultsHistoryView(LoginRequiredMixin, ListView):
     """Tarix - cache qilinmaydi"""
     model = SpeedTestResult
     template_name = 'speedtest/history.html'
-    context_object_name = 'page_obj'
+    context_object_name = 'results'  # page_obj - ListView ning Page obyekti
     paginate_by = 20
     login_url = 'login'
 
@@ -332,30 +598,114 @@ class ResultsHistoryView(LoginRequiredMixin, ListView):
             user=self.request.user
         ).select_related('provider').order_by('-test_date')
 
-        # Filtrlash
-        provider = self.request.GET.get('provider')
-        date_from = self.request.GET.get('date_from')
-        date_to = self.request.GET.get('date_to')
-        connection_type = self.request.GET.get('connection_type')
+        return filter_results(queryset, self.filters)
+
+    @cached_property
+    def filters(self):
+        return clean_filters(self.request.GET)
 
-        if provider:
-            queryset = queryset.filter(provider_id=provider)
-        if date_from:
-            queryset = queryset.filter(test_date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(test_date__lte=date_to)
-        if connection_type:
-            queryset = queryset.filter(connection_type=connection_type)
+    @property
+    def cursor_mode(self) -> bool:
+        return getattr(settings, 'HISTORY_PAGINATION', 'cursor') == 'cursor'
 
-        return queryset
+    def paginate_queryset(self, queryset, page_size):
+        """Cursor rejimida OFFSET va COUNT(*) siz sahifalash"""
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, page_size)
+
+        # Arxivga ko'chirilgan natijalar ham tarixda qoladi
+        archived = filter_results(SpeedTestResultArchive.objects.filter(user=self.request.user), self.filters)
+        page = pagination.paginate(
+            queryset, self.request.GET.get('cursor'), page_size, self.approximate_total(),
+            also=[archived.select_related('provider')],
+        )
+        return page.paginator, page, page.object_list, page.has_other_pages()
+
+    def approximate_total(self):
+        """
+        Ro'yxatdagi (issiq jadval + arxiv) testlar soni yig'ma jadvaldan - kunlar
+        aniqligida. UserDailyStats faylga ko'chirilganlarni ham sanaydi, ular
+        ro'yxatda yo'q - shuning uchun FileArchivedDailyStats ayiriladi
+        """
+        if not getattr(settings, 'HISTORY_APPROX_TOTAL', True):
+            return None
+        # Ulanish turi yig'ma jadvalda yo'q
+        if self.filters.get('connection_type'):
+            return None
+
+        total = 0
+        for model, sign in ((UserDailyStats, 1), (FileArchivedDailyStats, -1)):
+            totals = model.objects.filter(user=self.request.user)
+            if self.filters.get('provider'):
+                totals = totals.filter(provider_id=self.filters['provider'])
+            if self.filters.get('date_from'):
+                totals = totals.filter(date__gte=self.filters['date_from'])
+            if self.filters.get('date_to'):
+                totals = totals.filter(date__lte=self.filters['date_to'])
+            total += sign * (totals.aggregate(total=Sum('test_count'))['total'] or 0)
+        return max(total, 0)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['filter_form'] = ProviderFilterForm(self.request.GET)
         context['page_title'] = 'Mening Testlarim'
+        context['cursor_mode'] = self.cursor_mode
+        # Sahifa havolalari uchun filtrlar (cursor/page siz)
+        filters = self.request.GET.copy()
+        filters.pop('cursor', None)
+        filters.pop('page', None)
+        context['filter_query'] = filters.urlencode()
         return context
 
 
+@method_decorator(never_cache, name='dispatch')
+class ExportResultsView(LoginRequiredMixin, View):
+    """
+    Tarixni CSV / NDJSON qilib oqim bilan eksport qilish.
+    ?format=csv|ndjson, ?gzip=1, xodimlar uchun ?all=1 (barcha foydalanuvchilar)
+    """
+    login_url = 'login'
+
+    def get(self, request):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in export.FORMATS:
+            return HttpResponseBadRequest('Noto\'g\'ri format')
+        content_type, extension = export.FORMATS[fmt]
+
+        queryset = SpeedTestResult.objects.all()
+        archived = SpeedTestResultArchive.objects.all()
+        fields = export.FIELDS
+        if request.user.is_staff and request.GET.get('all'):
+            fields = export.FIELDS + export.STAFF_FIELDS
+        else:
+            queryset = queryset.filter(user=request.user)
+            archived = archived.filter(user=request.user)
+        # Noto'g'ri filtr qiymatlari oqim boshlanishidan oldin aniqlanadi
+        filter_form = ProviderFilterForm(request.GET)
+        if not filter_form.is_valid():
+            return HttpResponseBadRequest('Noto\'g\'ri filtr')
+        rows = export.export_rows(filter_results(queryset, filter_form.cleaned_data), fields)
+        archived = filter_results(archived, filter_form.cleaned_data)
+        # Arxivda mos natija bo'lsagina UNION ALL
+        if archived.exists():
+            rows = archive.with_archive(rows, export.export_rows(archived, fields))
+
+        compress = bool(request.GET.get('gzip'))
+        encoder = export.Encoder(fmt, fields, compress=compress)
+        # ASGI da sync iterator avval to'liq xotiraga o'qiladi - async oqim kerak
+        if isinstance(request, ASGIRequest):
+            body = export.astream(rows, encoder)
+        else:
+            body = export.stream(rows, encoder)
+
+        filename = f'netspeed-{timezone.localdate():%Y%m%d}.{extension}'
+        if compress:
+            content_type, filename = 'application/gzip', filename + '.gz'
+        response = StreamingHttpResponse(body, content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
 # ============================================
 # STATISTIKA - Login KERAK
 # ============================================
@@ -369,48 +719,127 @@ class StatisticsView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         user = self.request.user
 
-        total_tests = SpeedTestResult.objects.filter(user=user).count()
-
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        recent_stats = SpeedTestResult.objects.filter(
-            user=user,
-            test_date__gte=thirty_days_ago
-        ).aggregate(
-            avg_download=Avg('download_speed'),
-            avg_upload=Avg('upload_speed'),
-            avg_ping=Avg('ping'),
-            max_download=Max('download_speed'),
-            max_upload=Max('upload_speed'),
-            min_ping=Min('ping')
+        # Hammasi yig'ma jadvaldan (UserDailyStats) - tarix hajmiga bog'liq emas
+        today = timezone.localdate()
+        thirty_days_ago = today - timedelta(days=30)
+        recent = Q(date__gte=thirty_days_ago)
+        rollups = UserDailyStats.objects.filter(user=user)
+
+        totals = rollups.aggregate(
+            total_tests=Sum('test_count'),
+            recent_count=Sum('test_count', filter=recent),
+            recent_download=Sum('sum_download', filter=recent),
+            recent_upload=Sum('sum_upload', filter=recent),
+            recent_ping=Sum('sum_ping', filter=recent),
+            max_download=Max('max_download', filter=recent),
+            max_upload=Max('max_upload', filter=recent),
+            min_ping=Min('min_ping', filter=recent),
         )
+        total_tests = totals['total_tests'] or 0
+
+        recent_count = totals['recent_count']
+        recent_stats = {
+            'avg_download': totals['recent_download'] / recent_count if recent_count else None,
+            'avg_upload': totals['recent_upload'] / recent_count if recent_count else None,
+            'avg_ping': totals['recent_ping'] / recent_count if recent_count else None,
+            'max_download': totals['max_download'],
+            'max_upload': totals['max_upload'],
+            'min_ping': totals['min_ping'],
+        }
 
-        provider_stats = InternetProvider.objects.annotate(
-            test_count=Count('speedtestresult', filter=Q(speedtestresult__user=user)),
-            avg_download=Avg('speedtestresult__download_speed', filter=Q(speedtestresult__user=user)),
-            avg_upload=Avg('speedtestresult__upload_speed', filter=Q(speedtestresult__user=user)),
-            avg_ping=Avg('speedtestresult__ping', filter=Q(speedtestresult__user=user))
-        ).filter(test_count__gt=0)
-
-        from django.db.models.functions import TruncDate
-        daily_tests = SpeedTestResult.objects.filter(
-            user=user,
-            test_date__gte=timezone.now() - timedelta(days=7)
+        count = Cast(Sum('test_count'), FloatField())
+        provider_stats = rollups.filter(provider__isnull=False).values('provider_id').annotate(
+            name=F('provider__name'),
+            location=F('provider__location'),
+            avg_download=Sum('sum_download') / count,
+            avg_upload=Sum('sum_upload') / count,
+            avg_ping=Sum('sum_ping') / count,
         ).annotate(
-            date=TruncDate('test_date')
+            # test_count nomi ustunni yashiradi - shuning uchun eng oxirida
+            test_count=Sum('test_count'),
+        ).order_by('-test_count')
+
+        # Solishtirish uchun: provayderning barcha foydalanuvchilar bo'yicha
+        # 30 kunlik mediani - kunlik eskizlardan, O(kunlar)
+        provider_stats = list(provider_stats)
+        since, until = sketches.last_days(30)
+        overall = sketches.merged(since, until, provider_ids=[row['provider_id'] for row in provider_stats])
+        for row in provider_stats:
+            merged = overall.get(row['provider_id'])
+            row['overall_median_download'] = merged and merged['download_speed'].quantile(0.5)
+
+        daily_tests = rollups.filter(
+            date__gte=today - timedelta(days=7)
         ).values('date').annotate(
-            count=Count('id')
+            count=Sum('test_count')
         ).order_by('date')
 
+        # Taqsimot va persentillar - issiq jadval + arxiv, yig'ma jami bilan bir xil to'plam
+        distribution = speed_distribution(
+            SpeedTestResult.objects.filter(user=user),
+            SpeedTestResultArchive.objects.filter(user=user),
+        )
+
         context.update({
             'total_tests': total_tests,
             'recent_stats': recent_stats,
             'provider_stats': provider_stats,
             'daily_tests': daily_tests,
+            'distribution': {
+                'labels': distribution['labels'],
+                'download': distribution['download_speed']['counts'],
+                'upload': distribution['upload_speed']['counts'],
+            },
+            'download_percentiles': distribution['download_speed']['percentiles'],
+            'upload_percentiles': distribution['upload_speed']['percentiles'],
             'page_title': 'Mening Statistikam'
         })
         return context
 
 
+# ============================================
+# PROVAYDERLAR REYTINGI
+# ============================================
+class LeaderboardView(TemplateView):
+    """Provayderlar reytingi - hamma ko'ra oladi, tayyor agregatdan o'qiladi"""
+    template_name = 'speedtest/leaderboard.html'
+    SORTS = {
+        'download': '-download_median',
+        'upload': '-upload_median',
+        'ping': 'ping_median',
+    }
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        hours = dict(leaderboard.get_windows())
+        windows = list(hours)
+
+        window = self.request.GET.get('window')
+        if window not in windows:
+            window = '7d' if '7d' in windows else windows[0]
+        sort = self.request.GET.get('sort')
+        if sort not in self.SORTS:
+            sort = 'download'
+        location = self.request.GET.get('location', '')
+
+        rows = ProviderLeaderboard.objects.filter(window=window)
+        locations = sorted(set(rows.values_list('location', flat=True)))
+        if location:
+            rows = rows.filter(location=location)
+
+        context.update({
+            'rows': rows.select_related('provider').order_by(self.SORTS[sort], '-test_count'),
+            'windows': windows,
+            'window': window,
+            'window_description': leaderboard.describe(hours[window]),
+            'sort': sort,
+            'locations': locations,
+            'location': location,
+            'page_title': 'Provayderlar Reytingi'
+        })
+        return context
+
+
 # ============================================
 # FEEDBACK
 # ============================================
@@ -433,7 +862,7 @@ class SubmitFeedbackView(CreateView):
 # NETWORK ISSUES
 # ============================================
 class NetworkIssuesView(CreateView):
-    """Tarmoq muammolari"""
+    """Tarmoq muammolari - bir xil xabarlar bitta hodisaga yig'iladi"""
     model = NetworkIssue
     form_class = NetworkIssueReportForm
     template_name = 'speedtest/network_issues.html'
@@ -441,15 +870,28 @@ class NetworkIssuesView(CreateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['issues'] = NetworkIssue.objects.filter(
-            is_resolved=False
-        ).order_by('-reported_at')
+        paginator = Paginator(issues.active_incidents(), getattr(settings, 'NETWORK_ISSUES_PAGE_SIZE', 20))
+        page_obj = paginator.get_page(self.request.GET.get('page'))
+        context['page_obj'] = page_obj
+        context['issues'] = page_obj.object_list
+        context['top_incidents'] = issues.top_incidents()
+        # Jonli oqim (SSE) faqat ASGI (root/asgi.py) ostida mavjud
+        context['live_feed_url'] = issue_feed.PATH if isinstance(self.request, ASGIRequest) else None
         context['page_title'] = 'Tarmoq Muammolari'
         return context
 
     def form_valid(self, form):
-        messages.success(self.request, 'Muammo haqida xabar yuborildi!')
-        return super().form_valid(form)
+        data = form.cleaned_data
+        incident, created = issues.report(data['service_name'], data['issue_type'], data['severity'])
+        if created:
+            messages.success(self.request, 'Muammo haqida xabar yuborildi!')
+        else:
+            messages.success(
+                self.request,
+                f'Bu muammo haqida allaqachon xabar berilgan - sizning xabaringiz ham '
+                f'hisobga olindi (jami {incident.report_count} ta).'
+            )
+        return redirect(self.success_url)
 
 
 # ============================================
@@ -467,6 +909,42 @@ class AboutView(TemplateView):
 
 
 
+# ============================================
+# METRIKALAR
+# ============================================
+def metrics_allowed(request) -> bool:
+    """Metrikalarni ko'rishga ruxsat: staff, token yoki ishonchli IP"""
+    if request.user.is_authenticated and request.user.is_staff:
+        return True
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token and constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ())
+
+
+def metrics_access(view_func):
+    """Metrika view lari uchun dekorator - ruxsat bo'lmasa 403"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not metrics_allowed(request):
+            return HttpResponseForbidden()
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+@metrics_access
+def geo_metrics(request):
+    """Geolokatsiya keshi va HTTP klient hisoblagichlari (Prometheus formatida)"""
+    body = geo_service.metrics() + http_client.metrics()
+    return HttpResponse(body, content_type='text/plain; version=0.0.4')
+
+
+@metrics_access
+def request_metrics(request):
+    """View bo'yicha vaqt / DB / HTTP / shablon gistogrammalari (Prometheus formatida)"""
+    return HttpResponse(instrumentation.registry.render(), content_type='text/plain; version=0.0.4')
+
+
 def custom_404(request, exception):
     """Custom 404 page"""
     return render(request, '404.html', status=404)